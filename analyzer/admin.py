@@ -1,9 +1,79 @@
+from datetime import timedelta
 
 from django.contrib import admin
-from .models import Document
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from .models import AnalysisTrace, Document, DocumentMetric
+from .traces import PERCENTILES, percentile_summary
+
+# Runs listed in each table of the slowest-runs view
+SLOWEST_RUNS = 25
+
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'doc_type', 'uploaded_at')
     search_fields = ('title', 'category')
     list_filter = ('doc_type', 'category', 'uploaded_at')
+    change_list_template = 'admin/analyzer/document/change_list.html'
+
+    def get_urls(self):
+        return [
+            path(
+                'slowest-runs/', self.admin_site.admin_view(self.slowest_runs_view),
+                name='analyzer_document_slowest_runs',
+            ),
+        ] + super().get_urls()
+
+    def slowest_runs_view(self, request):
+        """The slowest and largest analysis runs, and run-time percentiles by category and doc type."""
+        try:
+            days = max(1, int(request.GET.get('days', 30)))
+        except ValueError:
+            days = 30
+        traces = AnalysisTrace.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        runs = traces.select_related('document').only(
+            'document__title', 'source', 'category', 'doc_type', 'analyzer_version', 'seconds', 'stages',
+            'text_length', 'page_count', 'sentence_count', 'entity_count', 'match_count', 'peak_rss_mb', 'created_at',
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Slowest analysis runs',
+            'days': days,
+            'percentiles': PERCENTILES,
+            'summary': percentile_summary(traces),
+            'slowest': runs.order_by('-seconds')[:SLOWEST_RUNS],
+            'largest': runs.order_by('-text_length')[:SLOWEST_RUNS],
+        }
+        return TemplateResponse(request, 'admin/analyzer/document/slowest_runs.html', context)
+
+
+@admin.register(AnalysisTrace)
+class AnalysisTraceAdmin(admin.ModelAdmin):
+    list_display = (
+        'document', 'source', 'category', 'doc_type', 'seconds', 'text_length', 'page_count',
+        'sentence_count', 'entity_count', 'match_count', 'peak_rss_mb', 'created_at',
+    )
+    list_filter = ('source', 'category', 'doc_type', 'analyzer_version', 'created_at')
+    search_fields = ('document__title',)
+    ordering = ('-seconds',)
+    list_select_related = ('document',)
+    readonly_fields = [field.name for field in AnalysisTrace._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DocumentMetric)
+class DocumentMetricAdmin(admin.ModelAdmin):
+    list_display = ('document', 'metric', 'value', 'unit', 'period', 'quarter', 'text')
+    list_filter = ('metric', 'unit', 'period')
+    search_fields = ('document__title',)
+    list_select_related = ('document',)
+    readonly_fields = [field.name for field in DocumentMetric._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
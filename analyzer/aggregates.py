@@ -0,0 +1,153 @@
+"""
+Corpus-level aggregates for the dashboard, maintained as deltas.
+
+Each analyzed document contributes, for its category and upload day, one
+document and its number of highlight matches to every (subcategory, term) it
+has, and one document to CategoryDayCount. When a document is analyzed,
+re-analyzed, moved to another category or deleted, the caller takes a
+snapshot() of it before and/or after and passes them to update(), which adds
+the difference with UPDATE ... SET n = n + delta in one transaction. Reads
+(top_terms, documents_per_category) then only touch the aggregate rows of the
+days asked for, however many documents there are.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import CategoryDayCount, HighlightTermCount
+
+MAX_TERM_CHARS = 100
+# Terms per UPDATE ... WHERE term IN (...)
+UPDATE_CHUNK = 500
+
+
+def _term(text: str) -> str:
+    return " ".join(text.lower().split())[:MAX_TERM_CHARS]
+
+
+def snapshot(document) -> dict:
+    """
+    What `document` contributes to the aggregates as it is now:
+    {"category", "day", "terms": {(subcategory, term): mentions}}. None before
+    it is saved, or if it has no stored highlight matches.
+    """
+    if document.pk is None or document.highlight_spans is None or document.uploaded_at is None:
+        return None
+    text = document.raw_text or ""
+    terms = Counter()
+    for start, end, subcategory in document.highlight_spans:
+        term = _term(text[start:end])
+        if term:
+            terms[subcategory, term] += 1
+    return {
+        "category": document.category,
+        "day": timezone.localdate(document.uploaded_at),
+        "terms": terms,
+    }
+
+
+def record(documents):
+    """Add newly analyzed, saved documents to the aggregates."""
+    update(added=[snapshot(doc) for doc in documents])
+
+
+def update(removed=(), added=()):
+    """Subtract the `removed` snapshots from the aggregates and add the `added` ones (None entries are skipped)."""
+    terms = defaultdict(lambda: [0, 0])  # (category, day, subcategory, term) -> [documents, mentions]
+    days = Counter()  # (category, day) -> documents
+    for sign, snapshots in ((-1, removed), (1, added)):
+        for snap in snapshots:
+            if snap is None:
+                continue
+            days[snap["category"], snap["day"]] += sign
+            for (subcategory, term), mentions in snap["terms"].items():
+                delta = terms[snap["category"], snap["day"], subcategory, term]
+                delta[0] += sign
+                delta[1] += sign * mentions
+    terms = {key: delta for key, delta in terms.items() if delta != [0, 0]}
+    days = {key: delta for key, delta in days.items() if delta}
+    if not terms and not days:
+        return
+
+    with transaction.atomic():
+        # Rows that do not exist yet start at zero; the increments below are then plain UPDATEs
+        HighlightTermCount.objects.bulk_create([
+            HighlightTermCount(category=category, day=day, subcategory=subcategory, term=term)
+            for category, day, subcategory, term in terms
+        ], ignore_conflicts=True, batch_size=UPDATE_CHUNK)
+        CategoryDayCount.objects.bulk_create([
+            CategoryDayCount(category=category, day=day) for category, day in days
+        ], ignore_conflicts=True)
+
+        # One UPDATE per group of terms with the same deltas, mostly (+1 document, +1 mention)
+        groups = defaultdict(list)
+        for (category, day, subcategory, term), (documents, mentions) in terms.items():
+            groups[category, day, subcategory, documents, mentions].append(term)
+        for (category, day, subcategory, documents, mentions), group in groups.items():
+            for i in range(0, len(group), UPDATE_CHUNK):
+                HighlightTermCount.objects.filter(
+                    category=category, day=day, subcategory=subcategory, term__in=group[i:i + UPDATE_CHUNK],
+                ).update(documents=F('documents') + documents, mentions=F('mentions') + mentions)
+        for (category, day), documents in days.items():
+            CategoryDayCount.objects.filter(category=category, day=day).update(documents=F('documents') + documents)
+
+        # Drop what no document contributes to any more
+        touched = {(category, day) for category, day, _, _ in terms} | set(days)
+        for category, day in touched:
+            HighlightTermCount.objects.filter(category=category, day=day, documents__lte=0).delete()
+            CategoryDayCount.objects.filter(category=category, day=day, documents__lte=0).delete()
+
+
+def rebuild(documents, batch_size=200):
+    """Recompute the aggregates from `documents` (a queryset), replacing what is stored; returns the count."""
+    total = 0
+    with transaction.atomic():
+        HighlightTermCount.objects.all().delete()
+        CategoryDayCount.objects.all().delete()
+        batch = []
+        for doc in documents.only('id', 'category', 'uploaded_at', 'raw_text', 'highlight_spans').iterator(
+            chunk_size=batch_size,
+        ):
+            batch.append(snapshot(doc))
+            if len(batch) >= batch_size:
+                update(added=batch)
+                total += len(batch)
+                batch = []
+        update(added=batch)
+        total += len(batch)
+    return total
+
+
+# ---------- Reads ----------
+
+def since(days: int):
+    """First day of a window of `days` days ending today."""
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def documents_per_category(first_day):
+    """{category: documents uploaded since first_day}."""
+    rows = (
+        CategoryDayCount.objects.filter(day__gte=first_day)
+        .values('category').annotate(total=Sum('documents')).order_by('category')
+    )
+    return {row['category']: row['total'] for row in rows}
+
+
+def top_terms(category: str, first_day, limit: int = 10) -> dict:
+    """{subcategory: [(term, documents, mentions), ...]} with the `limit` terms in most documents since first_day."""
+    rows = (
+        HighlightTermCount.objects.filter(category=category, day__gte=first_day)
+        .values('subcategory', 'term')
+        .annotate(total_documents=Sum('documents'), total_mentions=Sum('mentions'))
+        .order_by('subcategory', '-total_documents', '-total_mentions', 'term')
+    )
+    top = {}
+    for row in rows:
+        terms = top.setdefault(row['subcategory'], [])
+        if len(terms) < limit:
+            terms.append((row['term'], row['total_documents'], row['total_mentions']))
+    return top
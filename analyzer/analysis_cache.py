@@ -0,0 +1,59 @@
+"""
+Result cache for ad-hoc text analyses (analyze_text and its streaming variant).
+
+Entries go through the "analysis" alias of Django's cache framework, so the
+backend (local memory, file-based, Redis, ...) and its size bound (MAX_ENTRIES)
+and TTL (TIMEOUT) come from settings.CACHES. Keys are a hash of the text plus
+the category; analyzer_version() is passed as the cache key version, so results
+of an older analyzer, or of lexicons since recompiled, are never served.
+"""
+import hashlib
+import os
+import threading
+
+from django.core.cache import caches
+
+from .nlp_utils.pipeline import analyzer_version
+
+CACHE_ALIAS = "analysis"
+
+_STATS = {"hits": 0, "misses": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _key(text, category):
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    return f"analysis:{category}:{digest}"
+
+
+def _count(name):
+    with _STATS_LOCK:
+        _STATS[name] += 1
+
+
+def get(text, category):
+    """The cached analysis of `text` in `category`, or None."""
+    result = caches[CACHE_ALIAS].get(_key(text, category), version=analyzer_version())
+    _count("misses" if result is None else "hits")
+    return result
+
+
+def put(text, category, result):
+    caches[CACHE_ALIAS].set(_key(text, category), result, version=analyzer_version())
+
+
+def stats():
+    """Hit/miss counters of this worker process, plus evictions if the backend reports them."""
+    cache = caches[CACHE_ALIAS]
+    with _STATS_LOCK:
+        counters = dict(_STATS)
+    lookups = counters["hits"] + counters["misses"]
+    evictions = getattr(cache, "evictions", None)
+    return {
+        "backend": f"{type(cache).__module__}.{type(cache).__name__}",
+        "pid": os.getpid(),
+        **counters,
+        "hit_rate": counters["hits"] / lookups if lookups else None,
+        "evictions": evictions() if evictions else None,
+        "analyzer_version": analyzer_version(),
+    }
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analyzer'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the receivers)
+        from django.conf import settings
+        if settings.DOCMAGE_WARM_UP_ON_START:
+            # Servers without gunicorn.conf.py's hooks; there, /ready/ would otherwise start it on the first probe
+            from .nlp_utils.warmup import start_in_background
+            start_in_background(models=not settings.DOCMAGE_NLP_SOCKET)
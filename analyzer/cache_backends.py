@@ -0,0 +1,28 @@
+from collections import Counter
+
+from django.core.cache.backends.locmem import LocMemCache
+
+# Entries culled to stay under MAX_ENTRIES, per cache LOCATION (this process only)
+_EVICTIONS = Counter()
+
+
+class CountingLocMemCache(LocMemCache):
+    """
+    Django's local-memory cache, counting evictions.
+
+    LocMemCache already evicts least-recently-used entries first (reads move a
+    key to the front, culling pops from the back); this only records how many.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._location = name
+
+    def _cull(self):
+        # Called with the cache lock held
+        before = len(self._cache)
+        super()._cull()
+        _EVICTIONS[self._location] += before - len(self._cache)
+
+    def evictions(self):
+        return _EVICTIONS[self._location]
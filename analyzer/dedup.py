@@ -0,0 +1,46 @@
+from django.db.models import Q
+
+from .models import Document, MinHashBand
+from .nlp_utils.minhash import band_buckets, estimate_jaccard
+
+# Estimated Jaccard similarity (of word 5-gram sets) above which a document is a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Upper bound on LSH candidates verified per lookup
+MAX_CANDIDATES = 50
+
+
+def index_minhash(documents):
+    """Add saved documents' MinHash signatures to the LSH band index."""
+    MinHashBand.objects.bulk_create([
+        MinHashBand(document_id=doc.pk, band=band, bucket=bucket)
+        for doc in documents if doc.minhash
+        for band, bucket in enumerate(band_buckets(doc.minhash))
+    ])
+
+
+def find_near_duplicates(minhash, exclude_id=None, threshold=NEAR_DUPLICATE_THRESHOLD, limit=5):
+    """
+    [(document, similarity), ...] best first, for documents whose estimated
+    similarity to `minhash` is at least `threshold`.
+
+    Candidates come from indexed (band, bucket) lookups, so the cost depends on
+    the number of colliding documents, not on the size of the corpus.
+    """
+    if not minhash:
+        return []
+    buckets = Q()
+    for band, bucket in enumerate(band_buckets(minhash)):
+        buckets |= Q(band=band, bucket=bucket)
+    candidate_ids = (
+        MinHashBand.objects.filter(buckets)
+        .exclude(document_id=exclude_id)
+        .values_list('document_id', flat=True)
+        .distinct()[:MAX_CANDIDATES]
+    )
+    scored = [
+        (doc, estimate_jaccard(minhash, doc.minhash))
+        for doc in Document.objects.filter(id__in=list(candidate_ids)).only('id', 'title', 'category', 'minhash')
+    ]
+    scored = [pair for pair in scored if pair[1] >= threshold]
+    scored.sort(key=lambda pair: pair[1], reverse=True)
+    return scored[:limit]
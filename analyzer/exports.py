@@ -0,0 +1,275 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.text import get_valid_filename
+
+from .models import Document
+from .nlp_utils.extract_text import extract_text
+from .nlp_utils.pipeline import analyzer_version
+
+# Bytes copied from a rendered PDF into the archive per read
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def summary_dir():
+    return os.path.join(settings.MEDIA_ROOT, "summaries")
+
+
+def summary_digest(doc) -> str:
+    """
+    Hash of everything a document's summary PDF shows. It changes whenever the
+    stored analysis does (re-analysis, category change); a document without a
+    stored summary is summarized at render time, so the analyzer_version() of
+    that render counts too.
+    """
+    content = [doc.title, doc.category, doc.summary, doc.key_points or [], doc.highlights or {}]
+    if doc.summary is None:
+        content.append(analyzer_version())
+    encoded = json.dumps(content, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def summary_pdf_path(doc):
+    """media/summaries/<id>-<summary_digest>.pdf: a PDF is only reused for the analysis it was rendered from."""
+    return os.path.join(summary_dir(), f"{doc.id}-{summary_digest(doc)}.pdf")
+
+
+def summary_pdfs_by_document(doc_ids=None):
+    """{doc_id: [path, ...]} of the summary PDFs under media/summaries, from one directory listing."""
+    doc_ids = None if doc_ids is None else {str(doc_id) for doc_id in doc_ids}
+    found = {}
+    try:
+        entries = list(os.scandir(summary_dir()))
+    except FileNotFoundError:
+        return found
+    for entry in entries:
+        doc_id, dash, _ = entry.name.partition("-")
+        if dash and entry.name.endswith(".pdf") and (doc_ids is None or doc_id in doc_ids):
+            found.setdefault(doc_id, []).append(entry.path)
+    return found
+
+
+def remove_summary_pdfs(doc_ids, keep=None, rendered=None):
+    """
+    Delete the summary PDFs rendered for the documents `doc_ids`, except the
+    path `keep`. `rendered` is a summary_pdfs_by_document() listing to use
+    instead of listing the directory again.
+    """
+    if rendered is None:
+        rendered = summary_pdfs_by_document(doc_ids)
+    for doc_id in doc_ids:
+        for path in rendered.get(str(doc_id), ()):
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # removed by a concurrent export
+
+
+# The columns summary_job() reads; raw_text is only loaded for documents without a stored summary
+SUMMARY_JOB_FIELDS = ("id", "title", "category", "summary", "key_points", "highlights", "file", "doc_type")
+
+
+def summary_job(doc, reuse=False):
+    """Plain-dict description of a document's summary PDF (see render_summary_job)."""
+    # A summary stored at upload is reused; documents without one are summarized by the worker.
+    # With raw_text deferred (filter_documents), reading it is one query for that document.
+    has_summary = doc.summary is not None
+    return {
+        "title": doc.title,
+        "category": doc.category,
+        "raw_text": None if has_summary else (doc.raw_text or extract_text(doc.file.path, doc.doc_type)),
+        "overview": doc.summary if has_summary else None,
+        "key_points": doc.key_points or [],
+        "highlights": doc.highlights or {},
+        "output_path": summary_pdf_path(doc),
+        "reuse": reuse,
+    }
+
+
+def filter_documents(category=None, date_from=None, date_to=None, ids=None):
+    """
+    Documents matching an export filter; every argument is optional. Only the
+    SUMMARY_JOB_FIELDS columns are loaded, not the text or the stored analyses.
+    """
+    documents = Document.objects.only(*SUMMARY_JOB_FIELDS)
+    if category:
+        documents = documents.filter(category=category)
+    if date_from:
+        documents = documents.filter(uploaded_at__date__gte=date_from)
+    if date_to:
+        documents = documents.filter(uploaded_at__date__lte=date_to)
+    if ids:
+        documents = documents.filter(id__in=ids)
+    return documents.order_by("id")
+
+
+class _ZipStream:
+    """Write-only, non-seekable sink for ZipFile; the generator drains it after each write.
+
+    Without seek() ZipFile writes data descriptors after each member, so the
+    archive can be produced front to back without buffering it.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_summary_zip(documents, workers=None):
+    """
+    Yield a ZIP archive of summary PDFs for `documents` chunk by chunk.
+
+    PDFs already rendered under media/summaries for the documents' current
+    analysis are reused (see summary_pdf_path); the rest are rendered in a
+    process pool and added to the archive as they finish. At most
+    `2 * workers` renders are in flight, files are copied in COPY_CHUNK_SIZE
+    pieces and each row holds only SUMMARY_JOB_FIELDS, so memory stays
+    constant regardless of how many documents match.
+    """
+    from .nlp_utils.pdf_generator import render_summary_job  # ReportLab, imported on first export
+
+    workers = workers or getattr(settings, "DOCMAGE_EXPORT_WORKERS", 2)
+    sink = _ZipStream()
+    # forkserver: safe to start from threaded web workers, and children import
+    # only nlp_utils (no Django) to render.
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+    in_flight = {}
+    # Listed once: the PDFs of earlier analyses to delete as documents are re-rendered
+    rendered = summary_pdfs_by_document()
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+
+            def add_to_archive(doc_id, title, path):
+                with open(path, "rb") as src, archive.open(get_valid_filename(f"{doc_id}-{title}_summary.pdf"), "w") as dst:
+                    while True:
+                        block = src.read(COPY_CHUNK_SIZE)
+                        if not block:
+                            break
+                        dst.write(block)
+                        yield sink.drain()
+
+            def add_rendered(doc_id, title, path):
+                # PDFs of an earlier analysis of the document are never served again
+                remove_summary_pdfs([doc_id], keep=path, rendered=rendered)
+                yield from add_to_archive(doc_id, title, path)
+
+            for doc in documents.iterator(chunk_size=200):
+                job = summary_job(doc, reuse=True)
+                if os.path.exists(job["output_path"]):
+                    yield from add_to_archive(doc.id, doc.title, job["output_path"])
+                    continue
+                in_flight[pool.submit(render_summary_job, job)] = (doc.id, doc.title)
+                while len(in_flight) >= 2 * workers:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        doc_id, title = in_flight.pop(future)
+                        yield from add_rendered(doc_id, title, future.result()[0])
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    doc_id, title = in_flight.pop(future)
+                    yield from add_rendered(doc_id, title, future.result()[0])
+        # Closing the archive wrote the central directory into the sink
+        yield sink.drain()
+    finally:
+        # Client went away (GeneratorExit) or we are done: drop queued renders
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------- Analytical export (NDJSON / Parquet) ----------
+
+ANALYSIS_EXPORT_FIELDS = ("id", "title", "doc_type", "category", "uploaded_at", "summary", "key_points", "highlights")
+
+
+def iter_analysis_batches(since=None, batch_size=500):
+    """
+    Yield lists of at most `batch_size` analysis rows (dicts), oldest first.
+
+    Rows come from `.values().iterator(chunk_size=...)`, i.e. a server-side
+    cursor on PostgreSQL and chunked fetches elsewhere, so only one batch is
+    held in memory. `since` is a watermark as returned by `watermark_of`:
+    only documents uploaded after it are exported.
+    """
+    documents = Document.objects.order_by("uploaded_at", "id")
+    if since:
+        since_at, since_id = since
+        documents = documents.filter(
+            Q(uploaded_at__gt=since_at) | Q(uploaded_at=since_at, id__gt=since_id)
+        )
+    batch = []
+    for row in documents.values(*ANALYSIS_EXPORT_FIELDS).iterator(chunk_size=batch_size):
+        row["key_points"] = row["key_points"] or []
+        row["highlights"] = row["highlights"] or {}
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def watermark_of(row):
+    """(uploaded_at, id) of an exported row; ids break ties between equal timestamps."""
+    return row["uploaded_at"], row["id"]
+
+
+def ndjson_lines(batch):
+    for row in batch:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class ParquetBatchWriter:
+    """One Parquet row group per batch. Requires the optional `pyarrow` package."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from exc
+        self._pa = pa
+        self.schema = pa.schema([
+            ("id", pa.int64()),
+            ("title", pa.string()),
+            ("doc_type", pa.string()),
+            ("category", pa.string()),
+            ("uploaded_at", pa.timestamp("us", tz="UTC")),
+            ("summary", pa.string()),
+            ("key_points", pa.list_(pa.string())),
+            ("highlights", pa.map_(pa.string(), pa.string())),
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write_batch(self, batch):
+        columns = {name: [row[name] for row in batch] for name in self.schema.names}
+        columns["highlights"] = [[(k, str(v)) for k, v in h.items()] for h in columns["highlights"]]
+        self._writer.write_table(self._pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
@@ -1,10 +1,32 @@
 from django import forms
 from .models import Document
+from .nlp_utils.pipeline import AUTO_CATEGORY, FAST_TIER, FULL_TIER
 
 class DocumentForm(forms.ModelForm):
+    category = forms.ChoiceField(
+        choices=[(AUTO_CATEGORY, 'Detect automatically')] + Document.CATEGORY_CHOICES,
+        initial=AUTO_CATEGORY,
+    )
+    reuse_near_duplicate = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="If this is a near-duplicate of an existing document, reuse its analysis and only re-analyze the changed parts",
+    )
+
     class Meta:
         model = Document
-        fields = ['title', 'file', 'doc_type', 'category']
+        fields = ['title', 'file', 'doc_type', 'category', 'previous_version']
+        labels = {'previous_version': "New version of"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['previous_version'].queryset = Document.objects.only('id', 'title').order_by('-uploaded_at')
+
+    def clean_category(self):
+        # "auto" is not a model choice: save as general until the analysis picks the category
+        category = self.cleaned_data['category']
+        self.detect_category = category == AUTO_CATEGORY
+        return 'general' if self.detect_category else category
 
 class TextAnalysisForm(forms.Form):
     CATEGORY_CHOICES = [
@@ -21,3 +43,15 @@ class TextAnalysisForm(forms.Form):
         choices=CATEGORY_CHOICES,
         label="Document Category"
     )
+    tier = forms.ChoiceField(
+        choices=[
+            (FULL_TIER, 'Full analysis'),
+            (FAST_TIER, 'Fast (keywords and rules only)'),
+        ],
+        initial=FULL_TIER,
+        required=False,
+        label="Analysis"
+    )
+
+    def clean_tier(self):
+        return self.cleaned_data['tier'] or FULL_TIER
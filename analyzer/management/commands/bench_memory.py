@@ -0,0 +1,273 @@
+import gc
+import json
+import os
+import random
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.memory import rss_bytes
+from analyzer.nlp_utils import doc_store
+from analyzer.nlp_utils.highlighter import (
+    CATEGORIES, collect_duration_hits, collect_entity_hits, collect_rule_hits, lexicon_matches, merge_highlights,
+)
+from analyzer.nlp_utils.spacy_model import MODEL_NAME, memory_zone
+from analyzer.nlp_utils.summarizer import (
+    entity_scores, generate_narrative_overview_spacy, rank_key_points_by_category, split_sentences,
+)
+from analyzer.sample_documents import generate_document
+
+STAGES = ("extract", "parse", "lexicons", "regex", "summaries", "summary_pdf")
+# Committed with the code, so a regression fails wherever the command runs (e.g. in CI)
+DEFAULT_BASELINE = Path(__file__).resolve().with_name("memory_baseline.json")
+# Characters of text per page of the generated PDFs
+PAGE_CHARS = 2000
+MB = 1024 * 1024
+
+
+class _RssSampler:
+    """Highest RSS seen by a background thread while a stage runs (catches C allocations tracemalloc misses)."""
+
+    def __init__(self, interval):
+        self.interval, self.peak = interval, 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def _slope(sizes, values):
+    """Least-squares bytes per character of `values` over `sizes`."""
+    mean_x, mean_y = sum(sizes) / len(sizes), sum(values) / len(values)
+    variance = sum((x - mean_x) ** 2 for x in sizes)
+    if not variance:
+        return mean_y / mean_x if mean_x else 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(sizes, values)) / variance
+
+
+class Command(BaseCommand):
+    help = (
+        "Run each stage of the upload path (PDF extraction, parse, lexicons, regexes, summaries, "
+        "summary PDF) on documents of growing size under tracemalloc and RSS sampling; report peak "
+        "and retained bytes per stage and bytes per character, and fail on a regression past the baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="20000,80000,320000",
+            help="Comma-separated document sizes in characters (default: 20000,80000,320000).",
+        )
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help=f"Baseline JSON (default: {DEFAULT_BASELINE}).")
+        parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="Fail if a stage's peak exceeds the baseline by more than this fraction (default: 0.2).",
+        )
+        parser.add_argument(
+            "--slack-mb", type=float, default=2.0,
+            help="Differences below this many MB never fail, as RSS moves by whole pages and arenas (default: 2).",
+        )
+        parser.add_argument("--sample-interval", type=float, default=0.002, help="Seconds between RSS samples.")
+        parser.add_argument("--output", help="Also write the results to this JSON file.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options["sizes"].split(",") if s.strip())
+        if not sizes:
+            raise CommandError("--sizes needs at least one size.")
+        # Measure the parse itself, not a Doc loaded from the store
+        doc_store.DOC_STORE = ""
+        rng = random.Random(options["seed"])
+        self.interval = options["sample_interval"]
+
+        # {stage: {size: {"peak", "retained", "rss_peak"}}}
+        results = {stage: {} for stage in STAGES}
+        with tempfile.TemporaryDirectory() as tmp:
+            # One small run first, so imports (PyMuPDF, ReportLab) and one-off caches are not charged to a stage
+            self._write_pdf(self._text(rng, 2000), os.path.join(tmp, "warm-up.pdf"))
+            for _ in self._run_upload_path(os.path.join(tmp, "warm-up.pdf"), os.path.join(tmp, "warm-up-summary.pdf")):
+                pass
+            for size in sizes:
+                pdf_path = os.path.join(tmp, f"{size}.pdf")
+                self._write_pdf(self._text(rng, size), pdf_path)
+                for stage, measured in self._run_upload_path(pdf_path, os.path.join(tmp, f"{size}-summary.pdf")):
+                    results[stage][size] = measured
+
+        report = {
+            "model": MODEL_NAME,
+            "sizes": sizes,
+            "stages": {
+                stage: {
+                    "peak_bytes": {str(size): m["peak"] for size, m in by_size.items()},
+                    "retained_bytes": {str(size): m["retained"] for size, m in by_size.items()},
+                    "rss_peak_bytes": {str(size): m["rss_peak"] for size, m in by_size.items()},
+                    "peak_bytes_per_char": _slope(sizes, [by_size[s]["peak"] for s in sizes]),
+                    "rss_bytes_per_char": _slope(sizes, [by_size[s]["rss_peak"] for s in sizes]),
+                }
+                for stage, by_size in results.items()
+            },
+        }
+        self._write_table(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+        baseline_path = Path(options["baseline"])
+        if options["update_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(baseline_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}."))
+            return
+        if not baseline_path.exists():
+            raise CommandError(f"No baseline at {baseline_path}; run with --update-baseline to record one.")
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = self._regressions(report, baseline, options["tolerance"], options["slack_mb"] * MB)
+        if regressions:
+            raise CommandError("Memory regressions past the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"Within {options['tolerance']:.0%} of the baseline."))
+
+    # ---------- Stages ----------
+
+    def _run_upload_path(self, pdf_path, summary_path):
+        """Yield (stage, {"peak", "retained", "rss_peak"}) for each stage, in upload order; results stay alive."""
+        from analyzer.nlp_utils.extract_text import extract_pdf_pages
+        from analyzer.nlp_utils.pdf_generator import generate_summary_pdf
+
+        with memory_zone() as nlp:
+            pages, measured = self._measure(lambda: extract_pdf_pages(pdf_path))
+            yield "extract", measured
+            text = "".join(page for _, page in pages)
+            doc, measured = self._measure(lambda: nlp(text))
+            yield "parse", measured
+            lexicon, measured = self._measure(lambda: lexicon_matches(doc))
+            yield "lexicons", measured
+
+            def regexes():
+                durations = collect_duration_hits(text)
+                entities = collect_entity_hits(doc)
+                return {
+                    cat: merge_highlights(text, [
+                        entities, durations, collect_rule_hits(text, cat, doc, matches=lexicon[cat]),
+                    ])
+                    for cat in CATEGORIES
+                }
+            highlights, measured = self._measure(regexes)
+            yield "regex", measured
+
+            def summaries():
+                sentences = split_sentences(text)
+                key_points = rank_key_points_by_category({cat: sentences for cat in CATEGORIES}, entity_scores(text, doc, sentences))
+                return {
+                    cat: (generate_narrative_overview_spacy(text, cat, doc=doc), key_points[cat])
+                    for cat in CATEGORIES
+                }
+            summarized, measured = self._measure(summaries)
+            yield "summaries", measured
+
+            overview, key_points = summarized["medical"]
+            _, measured = self._measure(lambda: generate_summary_pdf(
+                title="Memory benchmark", summary=overview, output_path=summary_path, category="medical",
+                highlights={k.replace("_", " "): v for k, v in highlights["medical"].items()},
+                paragraphs=[overview], bullets=key_points,
+            ))
+            yield "summary_pdf", measured
+
+    def _measure(self, func):
+        """Run func under tracemalloc and RSS sampling: (result, {"peak", "retained", "rss_peak"})."""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            rss_before = rss_bytes()
+            with _RssSampler(self.interval) as sampler:
+                result = func()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, {
+            "peak": peak - before,
+            # Still allocated while the result is alive, as the upload view keeps it until it responds
+            "retained": current - before,
+            "rss_peak": max(0, sampler.peak - rss_before),
+        }
+
+    # ---------- Inputs ----------
+
+    @staticmethod
+    def _text(rng, size):
+        parts, length = [], 0
+        while length < size:
+            parts.append(generate_document(rng))
+            length += len(parts[-1]) + 2
+        return "\n\n".join(parts)[:size]
+
+    @staticmethod
+    def _write_pdf(text, path):
+        import fitz  # PyMuPDF
+
+        with fitz.open() as pdf:
+            for start in range(0, len(text), PAGE_CHARS):
+                page = pdf.new_page()
+                # A negative result means the text did not fit and nothing was written
+                if page.insert_textbox(page.rect + (36, 36, -36, -36), text[start:start + PAGE_CHARS], fontsize=6) < 0:
+                    raise CommandError(f"{PAGE_CHARS} characters do not fit on a generated PDF page.")
+            pdf.save(path)
+
+    # ---------- Report ----------
+
+    def _write_table(self, report):
+        sizes = report["sizes"]
+        self.stdout.write(
+            f"{'stage':<12} {'chars':>8} {'peak MB':>9} {'retained MB':>12} {'RSS peak MB':>12}"
+        )
+        for stage, measured in report["stages"].items():
+            for size in sizes:
+                key = str(size)
+                self.stdout.write(
+                    f"{stage:<12} {size:>8} {measured['peak_bytes'][key] / MB:>9.2f} "
+                    f"{measured['retained_bytes'][key] / MB:>12.2f} {measured['rss_peak_bytes'][key] / MB:>12.2f}"
+                )
+        self.stdout.write(f"\n{'stage':<12} {'peak bytes/char':>16} {'RSS bytes/char':>15}")
+        for stage, measured in report["stages"].items():
+            self.stdout.write(
+                f"{stage:<12} {measured['peak_bytes_per_char']:>16.1f} {measured['rss_bytes_per_char']:>15.1f}"
+            )
+
+    @staticmethod
+    def _regressions(report, baseline, tolerance, slack):
+        if baseline.get("model") != report["model"]:
+            raise CommandError(
+                f"The baseline was recorded with {baseline.get('model')}, not {report['model']}; "
+                "record a new one with --update-baseline."
+            )
+        regressions = []
+        for stage, measured in report["stages"].items():
+            recorded = baseline["stages"].get(stage)
+            if recorded is None:
+                continue
+            for metric in ("peak_bytes", "rss_peak_bytes"):
+                for size, value in measured[metric].items():
+                    limit = recorded[metric].get(size)
+                    if limit is not None and value > max(limit * (1 + tolerance), limit + slack):
+                        regressions.append(
+                            f"{stage} {metric} at {size} chars: {value / MB:.2f} MB, baseline {limit / MB:.2f} MB"
+                        )
+        return regressions
@@ -0,0 +1,93 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from analyzer.nlp_utils.field_index import FieldIndex
+from analyzer.nlp_utils.summarizer import generate_narrative_overview_spacy
+
+# The per-field searches the overview builders ran before nlp_utils.field_index,
+# kept here as the baseline.
+LEGACY_PATTERNS = {
+    "medical": [
+        (r"Patient Name:\s*(.+)", 0),
+        (r"DOB:\s*(\d{4}-\d{2}-\d{2})", 0),
+        (r"Age:\s*(\d{1,3})", 0),
+        (r"Clinical Summary\s*(.*?)Impressions", re.DOTALL),
+        (r"Impressions\s*(.*?)Parameter", re.DOTALL),
+    ],
+    "legal": [
+        (r"Case Title:\s*(.+)", 0),
+        (r"Case Number:\s*(.+)", 0),
+        (r"Jurisdiction:\s*(.+)", 0),
+        (r"Plaintiff:\s*(.+)", 0),
+        (r"Defendant:\s*(.+)", 0),
+        (r"Case Summary:\s*([\s\S]*?)\n[A-Z]", 0),
+    ],
+    "financial": [
+        (r"Company:\s*(.+)", 0),
+        (r"Fiscal Period:\s*(.+)", 0),
+        (r"Revenue\s*\n\s*([\d.]+ Cr)", 0),
+        (r"Net Income\s*\n\s*([\d.]+ Cr)", 0),
+        (r"ARR:\s*([\d.]+ Cr)", 0),
+        (r"Gross Margin:\s*([\d.%]+)", 0),
+    ],
+}
+
+
+def _repeat(unit, size):
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+# Inputs that are cheap to index but make the lazy or nested-quantifier
+# searches rescan the text: start markers whose end marker never comes.
+ADVERSARIAL_INPUTS = {
+    "medical": lambda size: _repeat("Clinical Summary\nchest discomfort, no impressions recorded\n", size),
+    "legal": lambda size: _repeat("see Case Summary:\nthe parties dispute the clause\nand the hearing is pending\n", size),
+    "financial": lambda size: "Revenue" + "\n" * size,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the narrative overview on adversarial inputs of growing size, against the "
+        "per-field regex searches it replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="10000,20000,40000",
+            help="Comma-separated input sizes in characters (default: 10000,20000,40000).",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported.")
+        parser.add_argument(
+            "--skip-legacy", action="store_true",
+            help="Only time the indexed builders (the legacy searches are quadratic on these inputs).",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        repeat = max(1, options["repeat"])
+
+        self.stdout.write(f"{'category':<10} {'chars':>9} {'index ms':>10} {'overview ms':>12} {'legacy ms':>11}")
+        for category, build in ADVERSARIAL_INPUTS.items():
+            for size in sizes:
+                text = build(size)
+                index_ms = self._best(lambda: FieldIndex(text), repeat)
+                # No entities: the spaCy parse is not what is measured here
+                overview_ms = self._best(lambda: generate_narrative_overview_spacy(text, category, entities=[]), repeat)
+                legacy = "-"
+                if not options["skip_legacy"]:
+                    patterns = [re.compile(p, flags) for p, flags in LEGACY_PATTERNS[category]]
+                    legacy = f"{self._best(lambda: [p.search(text) for p in patterns], repeat):.1f}"
+                self.stdout.write(f"{category:<10} {size:>9} {index_ms:>10.1f} {overview_ms:>12.1f} {legacy:>11}")
+
+    @staticmethod
+    def _best(func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
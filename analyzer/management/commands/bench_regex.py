@@ -0,0 +1,114 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from analyzer.nlp_utils import highlighter, lexicons, regex_guard, summarizer
+from analyzer.nlp_utils.pipeline import analyze_raw_text
+
+# The two patterns this budget came with fixes for, as they were before
+LEGACY_PATTERNS = {
+    "Clauses": lambda clauses: re.compile(rf"^\s*(?:{'|'.join(map(re.escape, clauses))})\b.*$", re.I | re.M),
+    "LDL": lambda clauses: re.compile(r"LDL[- ]?C.*?(\d+)"),
+}
+
+FUZZ_TOKENS = [
+    "1", "42", "1,200", "3.5", "$", "₹", "USD", "Cr", "mg", "%", "revenue", "expenses", "LDL-C",
+    "Effective Date:", "2024-01-02", "Termination", "BP", "120/80", "days", " ", "  ", "\n", "\n\n", ",", ":",
+]
+
+
+def _repeat(unit, size):
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+# Inputs that make the patterns backtrack: long runs of what they may match but never complete
+ADVERSARIAL_INPUTS = {
+    "blank lines": lambda size: "\n" * size,
+    "LDL-C labels": lambda size: _repeat("LDL-C ", size),
+    "digit runs": lambda size: _repeat("1,234,567", size),
+    "revenue spacing": lambda size: _repeat("revenue  -  ", size),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every regex extractor on fuzzed and adversarial inputs of growing size, "
+        "and show the per-document budget cutting a slow analysis short."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="2000,10000,40000,160000",
+            help="Comma-separated input sizes in characters (default: 2000,10000,40000,160000).",
+        )
+        parser.add_argument(
+            "--legacy-max", type=int, default=2000,
+            help="Largest input the legacy patterns are timed on (they are quadratic on some; default: 2000).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        clauses = lexicons.current().labels["legal"].get("Clauses", [])
+        patterns = {
+            "Duration": highlighter.DURATION_RE,
+            "Dosage": highlighter.DOSAGE_RE,
+            "Vitals": highlighter.VITALS_RE,
+            "Effective_Date": highlighter.EFFECTIVE_RE,
+            "Expiry_Date": highlighter.EXPIRY_RE,
+            "Clauses": highlighter._clause_line_re(lexicons.current()),
+            "Revenue": highlighter.REVENUE_RE,
+            "Expenditure": highlighter.EXPENDITURE_RE,
+            "Money": highlighter.MONEY_RE,
+            "Percentages": highlighter.PERCENT_RE,
+            "LDL": summarizer.LDL_VALUE,
+            "Next_Hearing": summarizer.NEXT_HEARING,
+        }
+        rng = random.Random(options["seed"])
+        inputs = {"fuzz": lambda size: self._fuzz(rng, size), **ADVERSARIAL_INPUTS}
+
+        self.stdout.write(f"{'input':<16} {'chars':>8} {'slowest pattern':<16} {'ms':>8} {'legacy ms':>24}")
+        for name, build in inputs.items():
+            for size in sizes:
+                text = build(size)
+                timings = {key: self._time(lambda: list(regex_guard.finditer(p, text, key))) for key, p in patterns.items()}
+                slowest = max(timings, key=timings.get)
+                legacy = []
+                if size <= options["legacy_max"]:
+                    for key, make in LEGACY_PATTERNS.items():
+                        pattern = make(clauses)
+                        legacy.append(f"{key} {self._time(lambda: list(pattern.finditer(text))):.1f}")
+                self.stdout.write(
+                    f"{name:<16} {size:>8} {slowest:<16} {timings[slowest]:>8.1f} {', '.join(legacy) or '-':>24}"
+                )
+
+        # A large legal text under a budget far below what its scans need
+        text = self._fuzz(rng, max(sizes)) + ADVERSARIAL_INPUTS["blank lines"](max(sizes))
+        saved, regex_guard.BUDGET_SECONDS = regex_guard.BUDGET_SECONDS, 0.001
+        try:
+            started = time.perf_counter()
+            analysis = analyze_raw_text(text, "legal")
+            elapsed = time.perf_counter() - started
+        finally:
+            regex_guard.BUDGET_SECONDS = saved
+        self.stdout.write(
+            f"\nlegal analysis of {len(text):,} characters with a 1 ms budget: {elapsed:.2f}s, "
+            f"incomplete scans: {', '.join(analysis['incomplete_scans']) or 'none'}"
+        )
+
+    @staticmethod
+    def _fuzz(rng, size):
+        parts, length = [], 0
+        while length < size:
+            token = rng.choice(FUZZ_TOKENS)
+            parts.append(token + (" " if rng.random() < 0.7 else ""))
+            length += len(parts[-1])
+        return "".join(parts)[:size]
+
+    @staticmethod
+    def _time(func):
+        started = time.perf_counter()
+        func()
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,97 @@
+import random
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.nlp_utils.summary_pool import SummaryModelError, SummaryPool
+from analyzer.sample_documents import generate_document
+from analyzer.traces import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent requests to the summarization worker pool at several maximum batch sizes and "
+        "report throughput, latency percentiles, mean batch size and timeouts. Defaults to the stub model, "
+        "so it runs without a checkpoint or network access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", default="stub:0.05",
+            help='Model spec: "stub", "stub:<seconds per batch>" or a local checkpoint directory (default: stub:0.05).',
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=16, help="Client threads, each one request at a time.")
+        parser.add_argument("--max-batch", default="1,4,8", help="Comma-separated maximum batch sizes (default: 1,4,8).")
+        parser.add_argument("--max-wait-ms", type=float, default=20.0)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--timeout", type=float, default=10.0, help="Seconds a request waits before giving up.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["max_batch"].split(",") if s.strip()]
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--max-batch needs positive sizes.")
+        rng = random.Random(options["seed"])
+        texts = [generate_document(rng) for _ in range(options["requests"])]
+
+        self.stdout.write(
+            f"{'max batch':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean batch':>11} {'timeouts':>9} {'errors':>7}"
+        )
+        for max_batch in sizes:
+            pool = SummaryPool(
+                options["model"], workers=options["workers"], max_batch=max_batch,
+                max_wait=options["max_wait_ms"] / 1000,
+            )
+            try:
+                # Not timed: the first request waits for the workers to load the model
+                pool.summarize("Warm-up. The model loads here.", timeout=pool.load_timeout)
+                before = dict(pool.stats)
+                latencies, timeouts, errors, elapsed = self._run(pool, texts, options["concurrency"], options["timeout"])
+                stats = pool.stats
+            finally:
+                pool.close()
+            batches = stats["batches"] - before["batches"]
+            batched = stats["batched_requests"] - before["batched_requests"]
+            latencies.sort()
+            self.stdout.write(
+                f"{max_batch:>9} {len(latencies) / elapsed:>8.1f} "
+                + " ".join(f"{(percentile(latencies, p) or 0) * 1000:>8.0f}" for p in (50, 95, 99))
+                + f" {batched / batches if batches else 0:>11.2f} {timeouts:>9} {errors:>7}"
+            )
+
+    @staticmethod
+    def _run(pool, texts, concurrency, timeout):
+        latencies, lock = [], threading.Lock()
+        counts = {"timeouts": 0, "errors": 0}
+        pending = iter(texts)
+
+        def client():
+            while True:
+                with lock:
+                    text = next(pending, None)
+                if text is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    pool.summarize(text, timeout)
+                except FutureTimeout:
+                    with lock:
+                        counts["timeouts"] += 1
+                    continue
+                except SummaryModelError:
+                    with lock:
+                        counts["errors"] += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, counts["timeouts"], counts["errors"], time.perf_counter() - started
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analyzer import aggregates
+from analyzer.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the dashboard's corpus aggregates (highlight terms and documents per category and day) "
+        "from the stored highlight matches, e.g. for documents analyzed before they existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        total = aggregates.rebuild(Document.objects.order_by("id"), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Aggregated {total} documents."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analyzer.metrics import index_metrics
+from analyzer.models import Document, DocumentMetric
+
+
+class Command(BaseCommand):
+    help = "Extract typed metrics (revenue, margins, vitals, dosages) of documents into the metrics table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Re-extract every document's metrics.")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        documents = Document.objects.exclude(raw_text=None).order_by("id")
+        if options["rebuild"]:
+            DocumentMetric.objects.all().delete()
+        else:
+            documents = documents.filter(metrics__isnull=True)
+
+        batch, total = [], 0
+        for doc in documents.only("id", "raw_text").iterator(chunk_size=options["batch_size"]):
+            batch.append(doc)
+            if len(batch) >= options["batch_size"]:
+                total += self._save(batch)
+                batch = []
+        total += self._save(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} documents; the table has {DocumentMetric.objects.count()} metrics."
+        ))
+
+    def _save(self, batch):
+        with transaction.atomic():
+            index_metrics(batch)
+        return len(batch)
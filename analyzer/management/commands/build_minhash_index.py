@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analyzer.dedup import index_minhash
+from analyzer.models import Document, MinHashBand
+from analyzer.nlp_utils.minhash import signature
+
+
+class Command(BaseCommand):
+    help = "Compute MinHash signatures and LSH bands for documents that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute every document's signature.")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        documents = Document.objects.order_by("id")
+        if options["rebuild"]:
+            MinHashBand.objects.all().delete()
+        else:
+            documents = documents.filter(minhash__isnull=True)
+
+        batch, total = [], 0
+        for doc in documents.only("id", "raw_text").iterator(chunk_size=options["batch_size"]):
+            doc.minhash = signature(doc.raw_text or "")
+            batch.append(doc)
+            if len(batch) >= options["batch_size"]:
+                total += self._save(batch)
+                batch = []
+        total += self._save(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents."))
+
+    def _save(self, batch):
+        with transaction.atomic():
+            Document.objects.bulk_update(batch, ["minhash"])
+            index_minhash(batch)
+        return len(batch)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from analyzer import similarity
+from analyzer.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the related-documents matrix with current IDF weights, dropping deleted and "
+        "superseded rows. Run periodically (e.g. nightly from cron)."
+    )
+
+    def handle(self, *args, **options):
+        def documents():
+            rows = Document.objects.exclude(term_counts__isnull=True).order_by("id")
+            return rows.values_list("id", "term_counts").iterator(chunk_size=500)
+
+        total = similarity.rebuild(documents)
+        self.stdout.write(self.style.SUCCESS(f"Compacted similarity matrix: {total} documents."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.nlp_utils import lexicons
+from analyzer.nlp_utils.spacy_model import get_nlp
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the category lexicons into match artifacts and publish them; running "
+        "workers pick up the changed categories within DOCMAGE_LEXICON_RELOAD_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source", default=None,
+            help=f"Directory of the <category>.json sources (default: {lexicons.LEXICON_DIR}).",
+        )
+        parser.add_argument(
+            "--output", default=None,
+            help=f"Directory for the artifacts and manifest (default: {lexicons.ARTIFACT_DIR}).",
+        )
+        parser.add_argument("--force", action="store_true", help="Recompile categories whose source is unchanged.")
+
+    def handle(self, *args, **options):
+        try:
+            sources = lexicons.load_sources(options["source"])
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Could not read the lexicon sources: {exc}") from exc
+
+        report = lexicons.write_artifacts(sources, get_nlp(), options["output"], force=options["force"])
+        for category, (status, seconds) in report.items():
+            self.stdout.write(
+                f"{category:<10} v{sources[category]['version']:<4} {status:<10} {seconds * 1000:7.1f} ms"
+            )
+        compiled = sum(status == "compiled" for status, _ in report.values())
+        self.stdout.write(self.style.SUCCESS(f"Published {len(report)} lexicons ({compiled} compiled)."))
@@ -0,0 +1,73 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from analyzer.exports import ParquetBatchWriter, iter_analysis_batches, ndjson_lines, watermark_of
+
+
+def _read_watermark(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return parse_datetime(data["uploaded_at"]), data["id"]
+
+
+def _write_watermark(path, watermark):
+    uploaded_at, doc_id = watermark
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"uploaded_at": uploaded_at.isoformat(), "id": doc_id}, f)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = "Export every document's metadata, highlights and key points as NDJSON or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output")
+        parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Rows fetched per cursor chunk and written per Parquet row group.")
+        parser.add_argument("--since", help="Only documents uploaded after this ISO timestamp.")
+        parser.add_argument("--state",
+                            help="Watermark file for incremental exports: read before, updated after a successful run.")
+
+    def handle(self, *args, **options):
+        since = _read_watermark(options["state"])
+        if options["since"]:
+            since_at = parse_datetime(options["since"])
+            if since_at is None:
+                raise CommandError(f"Invalid --since {options['since']!r}")
+            since = (since_at, 0)
+
+        batches = iter_analysis_batches(since=since, batch_size=max(1, options["batch_size"]))
+        rows = 0
+        last = None
+        tmp_output = f"{options['output']}.partial"
+
+        if options["format"] == "parquet":
+            try:
+                writer = ParquetBatchWriter(tmp_output)
+            except ImportError as exc:
+                raise CommandError(str(exc))
+            try:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    rows += len(batch)
+                    last = watermark_of(batch[-1])
+            finally:
+                writer.close()
+        else:
+            with open(tmp_output, "w", encoding="utf-8") as out:
+                for batch in batches:
+                    out.writelines(ndjson_lines(batch))
+                    rows += len(batch)
+                    last = watermark_of(batch[-1])
+
+        os.replace(tmp_output, options["output"])
+        if options["state"] and last:
+            _write_watermark(options["state"], last)
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows} documents to {options['output']}"))
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.exports import filter_documents, stream_summary_zip
+from analyzer.models import Document
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}; expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Write a ZIP of summary PDFs for the matching documents, rendering missing ones in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the ZIP file to write.")
+        parser.add_argument("--category", choices=[c for c, _ in Document.CATEGORY_CHOICES])
+        parser.add_argument("--from", dest="date_from", type=_parse_date, help="Uploaded on/after YYYY-MM-DD.")
+        parser.add_argument("--to", dest="date_to", type=_parse_date, help="Uploaded on/before YYYY-MM-DD.")
+        parser.add_argument("--ids", type=lambda v: [int(i) for i in v.split(",") if i.strip()],
+                            help="Comma-separated document ids.")
+        parser.add_argument("--workers", type=int, help="Render processes (default: DOCMAGE_EXPORT_WORKERS or 2).")
+
+    def handle(self, *args, **options):
+        documents = filter_documents(options["category"], options["date_from"], options["date_to"], options["ids"])
+        total = documents.count()
+        written = 0
+        with open(options["output"], "wb") as out:
+            for chunk in stream_summary_zip(documents, workers=options["workers"]):
+                out.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {total} summaries ({written / 1024:.0f} KB) to {options['output']}"
+        ))
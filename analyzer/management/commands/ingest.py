@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from analyzer import aggregates, similarity
+from analyzer.dedup import index_minhash
+from analyzer.metrics import index_metrics
+from analyzer.models import AnalysisTrace, Document
+from analyzer.nlp_utils.pipeline import AUTO_CATEGORY
+from analyzer.traces import trace_for
+
+# File extension -> Document.doc_type
+EXTENSION_DOC_TYPES = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".txt": "txt",
+}
+
+
+# ---------- Worker side ----------
+
+def _init_worker():
+    # Load the spaCy model once per worker process, before the first file arrives.
+    from analyzer.nlp_utils.spacy_model import get_nlp
+    get_nlp()
+
+
+def _analyze_path(path, doc_type, category):
+    from analyzer.nlp_utils.pipeline import analyze_file
+    try:
+        return path, analyze_file(path, doc_type, category), None
+    except Exception as exc:  # keep the batch going; report per file
+        return path, None, f"{type(exc).__name__}: {exc}"
+
+
+# ---------- Checkpoint ----------
+
+def _load_checkpoint(path, directory, category):
+    if not path.exists():
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("directory") != directory or data.get("category") != category:
+        raise CommandError(
+            f"Checkpoint {path} belongs to a different ingest "
+            f"({data.get('directory')}, {data.get('category')}). Use --restart to discard it."
+        )
+    return set(data.get("done", []))
+
+
+def _save_checkpoint(path, directory, category, done, failed):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "directory": directory,
+            "category": category,
+            "done": sorted(done),
+            "failed": failed,
+        }, f)
+    os.replace(tmp, path)  # atomic: a crash never leaves a half-written checkpoint
+
+
+def _storage_name(root, rel):
+    """Where a file is copied in storage: the same name on every run, so a resumed ingest reuses its copy."""
+    stat = (root / rel).stat()
+    digest = hashlib.sha1(f"{root}/{rel}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:12]
+    return f"documents/ingest/{digest}-{Path(rel).name}"
+
+
+def _format_eta(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}"
+
+
+class Command(BaseCommand):
+    help = "Bulk-ingest every PDF/DOCX/TXT file under a directory, analyzing them in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument(
+            "--category", default="general",
+            choices=[c for c, _ in Document.CATEGORY_CHOICES] + [AUTO_CATEGORY],
+            help=f'Category of every file, or "{AUTO_CATEGORY}" to detect it per file.',
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=50,
+                            help="Documents saved per bulk_create.")
+        parser.add_argument("--checkpoint",
+                            help="Checkpoint file (default: <directory>/.docmage-ingest.json).")
+        parser.add_argument("--restart", action="store_true",
+                            help="Ignore an existing checkpoint and ingest everything again.")
+
+    def handle(self, *args, **options):
+        root = Path(options["directory"]).resolve()
+        if not root.is_dir():
+            raise CommandError(f"{root} is not a directory")
+        category = options["category"]
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        checkpoint = Path(options["checkpoint"] or root / ".docmage-ingest.json")
+
+        done = set() if options["restart"] else _load_checkpoint(checkpoint, str(root), category)
+        failed = {}
+
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                doc_type = EXTENSION_DOC_TYPES.get(Path(name).suffix.lower())
+                path = Path(dirpath) / name
+                if doc_type and str(path.relative_to(root)) not in done:
+                    files.append((path, doc_type))
+
+        total = len(files)
+        if done:
+            self.stdout.write(f"Resuming: {len(done)} files already ingested, {total} remaining.")
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Nothing to ingest."))
+            return
+
+        # Workers must not inherit open DB connections from the parent.
+        connections.close_all()
+
+        pending_docs = []
+        pending_traces = []
+        pending_paths = []
+        processed = 0
+        started = time.monotonic()
+
+        def flush():
+            if not pending_docs:
+                return
+            # Files are copied just before the batch commits and removed again if it fails.
+            # A copy left by a crash in between has the same name on resume, so it is reused.
+            copied = []
+            try:
+                for doc, rel in zip(pending_docs, pending_paths):
+                    name = _storage_name(root, rel)
+                    if not default_storage.exists(name):
+                        with open(root / rel, "rb") as fh:
+                            name = default_storage.save(name, File(fh))
+                        copied.append(name)
+                    doc.file = name
+                with transaction.atomic():
+                    Document.objects.bulk_create(pending_docs, batch_size=batch_size)
+                    index_minhash(pending_docs)
+                    index_metrics(pending_docs)
+                    aggregates.record(pending_docs)
+                    AnalysisTrace.objects.bulk_create(pending_traces, batch_size=batch_size)
+            except BaseException:
+                for name in copied:
+                    default_storage.delete(name)
+                raise
+            for doc in pending_docs:
+                similarity.add_document(doc.pk, doc.term_counts)
+            done.update(pending_paths)
+            _save_checkpoint(checkpoint, str(root), category, done, failed)
+            pending_docs.clear()
+            pending_traces.clear()
+            pending_paths.clear()
+
+        queue = iter(files)
+        in_flight = {}
+        max_in_flight = workers * 2  # bounded so results never pile up in memory
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            def submit_next():
+                item = next(queue, None)
+                if item is None:
+                    return False
+                path, doc_type = item
+                in_flight[pool.submit(_analyze_path, str(path), doc_type, category)] = doc_type
+                return True
+
+            while len(in_flight) < max_in_flight and submit_next():
+                pass
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    doc_type = in_flight.pop(future)
+                    path, analysis, error = future.result()
+                    rel = str(Path(path).relative_to(root))
+                    processed += 1
+
+                    if error:
+                        failed[rel] = error
+                        self.stderr.write(f"\nFailed {rel}: {error}")
+                    else:
+                        run = analysis.pop("trace")
+                        document = Document(
+                            title=Path(path).stem,
+                            doc_type=doc_type,  # the file is stored by flush()
+                            **analysis,  # includes the (possibly detected) category
+                        )
+                        pending_docs.append(document)
+                        pending_traces.append(trace_for(document, run, analysis, "ingest"))
+                        pending_paths.append(rel)
+                        if len(pending_docs) >= batch_size:
+                            flush()
+
+                    elapsed = time.monotonic() - started
+                    rate = processed / elapsed if elapsed else 0.0
+                    eta = (total - processed) / rate if rate else 0.0
+                    self.stdout.write(
+                        f"\r{processed}/{total} files  {rate:.2f} files/s  ETA {_format_eta(eta)}",
+                        ending="",
+                    )
+                    self.stdout.flush()
+                    submit_next()
+
+        flush()
+        if failed:
+            _save_checkpoint(checkpoint, str(root), category, done, failed)
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {processed - len(failed)} documents in {time.monotonic() - started:.1f}s"
+            f" ({len(failed)} failed)."
+        ))
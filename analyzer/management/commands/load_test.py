@@ -0,0 +1,378 @@
+import http.client
+import json
+import os
+import random
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.management.commands.ingest import EXTENSION_DOC_TYPES
+from analyzer.memory import process_tree_rss_bytes
+from analyzer.nlp_utils.pipeline import AUTO_CATEGORY
+from analyzer.sample_documents import TEMPLATES, generate_document
+from analyzer.traces import percentile
+
+OPERATIONS = ("upload", "analyze_text", "detail", "summary_pdf")
+DEFAULT_MIX = "upload=1,analyze_text=4,detail=4,summary_pdf=1"
+# Statuses that count as success: an accepted upload redirects to the list, a rejected one renders the form again
+EXPECTED_STATUS = {"upload": 302, "analyze_text": 200, "detail": 200, "summary_pdf": 200}
+REPORTED_PERCENTILES = (50, 95, 99)
+DOCUMENT_LINK = re.compile(r'href="/documents/(\d+)/"')
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation {name!r} in --mix; choose from {', '.join(OPERATIONS)}.")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Weight of {name} in --mix must be a number.")
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one operation with a positive weight.")
+    return mix
+
+
+def _latency_summary(latencies):
+    latencies = sorted(round(latency, 1) for latency in latencies)
+    summary = {f"p{p}": percentile(latencies, p) for p in REPORTED_PERCENTILES}
+    summary["max"] = latencies[-1] if latencies else None
+    return summary
+
+
+class _Http:
+    """One connection per request, like independent users; keeps Django's CSRF cookie."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise CommandError("--url must be an http:// URL of a local server.")
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self.csrf_token = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.csrf_token:
+            headers["Cookie"] = f"csrftoken={self.csrf_token}"
+            headers["X-CSRFToken"] = self.csrf_token
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+            return response.status, response, data
+        finally:
+            connection.close()
+
+    def fetch_csrf_token(self):
+        status, response, _ = self.request("GET", "/upload/")
+        cookie = SimpleCookie()
+        for header in response.headers.get_all("Set-Cookie") or ():
+            cookie.load(header)
+        if status != 200 or "csrftoken" not in cookie:
+            raise CommandError(f"GET /upload/ returned {status} without a CSRF cookie; is this DocMage?")
+        self.csrf_token = cookie["csrftoken"].value
+
+    def document_ids(self):
+        status, _, data = self.request("GET", "/documents/")
+        if status != 200:
+            raise CommandError(f"GET /documents/ returned {status}.")
+        return sorted({int(i) for i in DOCUMENT_LINK.findall(data.decode("utf-8", "replace"))})
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of uploads, text analyses, detail pages and summary PDFs against a local "
+        "server at open-loop arrival rates, and write throughput, latency percentiles, error rates "
+        "and server RSS over time to a JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the server under test.")
+        parser.add_argument(
+            "--server",
+            help='Command that starts the server, e.g. "gunicorn smart_doc_analyzer.wsgi -b 127.0.0.1:8000". '
+                 "It is started before and stopped after the run; without it, --url must already be up.",
+        )
+        parser.add_argument("--server-pid", type=int, help="PID of an already running server, for RSS sampling.")
+        parser.add_argument("--server-log", help="File for the started server's output (default: discarded).")
+        parser.add_argument(
+            "--ready-path", default="/ready/",
+            help="Path that returns 200 once the server can take the load (default: /ready/, which "
+                 "reports the NLP warm-up on any server).",
+        )
+        parser.add_argument("--ready-timeout", type=float, default=120.0, help="Seconds to wait for --ready-path.")
+        parser.add_argument(
+            "--rates", default="1",
+            help="Comma-separated arrival rates in requests/s; each is one phase of --duration seconds.",
+        )
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds per phase.")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation=weight,... (default: {DEFAULT_MIX}).")
+        parser.add_argument(
+            "--documents-dir",
+            help="Upload and analyze recorded documents (PDF/DOCX/TXT under this directory) instead of generated ones.",
+        )
+        parser.add_argument(
+            "--max-sections", type=int, default=8,
+            help="Generated documents join 1 to N generated sections of one category (default: 8).",
+        )
+        parser.add_argument("--tier", choices=["full", "fast"], default="full", help="Analyze Text tier.")
+        parser.add_argument(
+            "--seed-documents", type=int, default=3,
+            help="Documents uploaded before the run if the server has none, for detail and PDF requests.",
+        )
+        parser.add_argument("--concurrency", type=int, default=256, help="Most requests in flight.")
+        parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a request counts as failed.")
+        parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between server RSS samples.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="load-test.json", help="JSON report path (default: load-test.json).")
+
+    def handle(self, *args, **options):
+        mix = _parse_mix(options["mix"])
+        try:
+            rates = [float(r) for r in options["rates"].split(",") if r.strip()]
+        except ValueError:
+            raise CommandError("--rates must be comma-separated numbers.")
+        if not rates or min(rates) <= 0:
+            raise CommandError("--rates must be positive.")
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.recorded = self._recorded_documents(options["documents_dir"]) if options["documents_dir"] else None
+        self.client = _Http(options["url"], options["timeout"])
+        started_at = datetime.now(timezone.utc).isoformat()
+
+        server = self._start_server(options) if options["server"] else None
+        server_pid = server.pid if server else options["server_pid"]
+        try:
+            if not server:
+                self._wait_ready(None, options["ready_timeout"])
+            self.client.fetch_csrf_token()
+            self.document_ids = self.client.document_ids()
+            if not self.document_ids and {"detail", "summary_pdf"} & {op for op, w in mix.items() if w}:
+                for _ in range(options["seed_documents"]):
+                    self._send("upload", self._payload("upload"))
+                self.document_ids = self.client.document_ids()
+
+            samples, stop_sampling = [], threading.Event()
+            started = time.perf_counter()
+            sampler = threading.Thread(
+                target=self._sample_rss, daemon=True,
+                args=(server_pid, started, options["sample_interval"], samples, stop_sampling),
+            )
+            sampler.start()
+            phases = []
+            try:
+                for rate in rates:
+                    phases.append(self._run_phase(rate, mix, started))
+                    self._write_phase(phases[-1])
+            finally:
+                stop_sampling.set()
+                sampler.join()
+        finally:
+            if server:
+                self._stop_server(server)
+
+        report = {
+            "started_at": started_at,
+            "url": options["url"],
+            "server": options["server"],
+            "mix": mix,
+            "documents": options["documents_dir"] or f"generated, 1-{options['max_sections']} sections",
+            "tier": options["tier"],
+            "phases": phases,
+            "server_rss_mb": samples,
+        }
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}."))
+
+    # ---------- Server ----------
+
+    def _start_server(self, options):
+        log = open(options["server_log"], "ab") if options["server_log"] else subprocess.DEVNULL
+        # Its own session, so stopping it also stops the workers it forked
+        server = subprocess.Popen(
+            shlex.split(options["server"]), stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+        )
+        try:
+            self._wait_ready(server, options["ready_timeout"])
+        except BaseException:
+            self._stop_server(server)
+            raise
+        return server
+
+    def _wait_ready(self, server, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise CommandError(f"The server exited with status {server.returncode} before it was ready.")
+            try:
+                if self.client.request("GET", self.options["ready_path"])[0] == 200:
+                    return
+            except OSError:
+                pass  # not listening yet
+            time.sleep(0.5)
+        raise CommandError(f"{self.options['ready_path']} did not return 200 within {timeout:.0f}s.")
+
+    @staticmethod
+    def _stop_server(server):
+        try:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+
+    @staticmethod
+    def _sample_rss(pid, started, interval, samples, stop):
+        while pid and not stop.is_set():
+            rss = process_tree_rss_bytes(pid)
+            if rss is None:
+                return  # no /proc
+            samples.append([round(time.perf_counter() - started, 2), round(rss / (1024 * 1024), 1)])
+            stop.wait(interval)
+
+    # ---------- Requests ----------
+
+    def _recorded_documents(self, directory):
+        files = [
+            path for path in sorted(Path(directory).rglob("*"))
+            if path.is_file() and path.suffix.lower() in EXTENSION_DOC_TYPES
+        ]
+        if not files:
+            raise CommandError(f"No PDF, DOCX or TXT files under {directory}.")
+        return files
+
+    def _text(self, category):
+        sections = self.rng.randint(1, max(1, self.options["max_sections"]))
+        return "\n\n".join(generate_document(self.rng, category) for _ in range(sections))
+
+    def _payload(self, op):
+        """(method, path, body, headers) of one request, built in the dispatching thread."""
+        category = self.rng.choice(list(TEMPLATES))
+        if op == "upload":
+            if self.recorded:
+                path = self.rng.choice(self.recorded)
+                name, content = path.name, path.read_bytes()
+                doc_type = EXTENSION_DOC_TYPES[path.suffix.lower()]
+            else:
+                name, content, doc_type = "load-test.txt", self._text(category).encode("utf-8"), "txt"
+            boundary = uuid.uuid4().hex
+            fields = {"title": f"load test {Path(name).stem}", "doc_type": doc_type, "category": AUTO_CATEGORY}
+            body = b"".join(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+                for key, value in fields.items()
+            ) + (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                f"Content-Type: application/octet-stream\r\n\r\n"
+            ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+            return "POST", "/upload/", body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        if op == "analyze_text":
+            if self.recorded:
+                text = self.rng.choice([p for p in self.recorded if p.suffix.lower() == ".txt"] or [None])
+                text = text.read_text(encoding="utf-8", errors="replace") if text else self._text(category)
+            else:
+                text = self._text(category)
+            body = urlencode({"text": text, "category": category, "tier": self.options["tier"]})
+            return "POST", "/analyze-text/", body, {"Content-Type": "application/x-www-form-urlencoded"}
+        doc_id = self.rng.choice(self.document_ids)
+        if op == "detail":
+            return "GET", f"/documents/{doc_id}/", None, {}
+        return "GET", f"/download-summary/{doc_id}/", None, {}
+
+    def _send(self, op, payload):
+        method, path, body, headers = payload
+        return self.client.request(method, path, body, headers)[0]
+
+    def _run_phase(self, rate, mix, started):
+        """Send requests at Poisson arrivals of `rate`/s for --duration seconds, whatever the responses take."""
+        ops = [op for op, weight in mix.items() if weight and (self.document_ids or op not in ("detail", "summary_pdf"))]
+        weights = [mix[op] for op in ops]
+        records, lock = [], threading.Lock()
+
+        def run(op, payload, intended):
+            sent = time.perf_counter()
+            try:
+                status = self._send(op, payload)
+                error = None if status == EXPECTED_STATUS[op] else str(status)
+            except Exception as exc:  # timeouts, refused or reset connections
+                status, error = None, type(exc).__name__
+            # From the scheduled time, not the send time: time spent queued for a free client thread counts
+            latency = (time.perf_counter() - intended) * 1000
+            with lock:
+                records.append((op, latency, error, (sent - intended) * 1000))
+
+        phase_start = time.perf_counter()
+        futures, offset = [], 0.0
+        with ThreadPoolExecutor(max_workers=self.options["concurrency"]) as pool:
+            while True:
+                offset += self.rng.expovariate(rate)
+                if offset >= self.options["duration"]:
+                    break
+                op = self.rng.choices(ops, weights)[0]
+                payload = self._payload(op)
+                intended = phase_start + offset
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(run, op, payload, intended))
+            wait(futures)
+        elapsed = time.perf_counter() - phase_start
+
+        operations = {}
+        for op in ops:
+            mine = [r for r in records if r[0] == op]
+            errors = [r[2] for r in mine if r[2]]
+            operations[op] = {
+                "requests": len(mine),
+                "errors": len(errors),
+                "error_rate": len(errors) / len(mine) if mine else 0.0,
+                "error_kinds": {kind: errors.count(kind) for kind in sorted(set(errors))},
+                "latency_ms": _latency_summary([r[1] for r in mine if not r[2]]),
+            }
+        errors = sum(1 for r in records if r[2])
+        return {
+            "rate": rate,
+            "started_s": round(phase_start - started, 2),
+            "seconds": round(elapsed, 2),
+            "requests": len(records),
+            "errors": errors,
+            "error_rate": errors / len(records) if records else 0.0,
+            "throughput_rps": (len(records) - errors) / elapsed if elapsed else 0.0,
+            "latency_ms": _latency_summary([r[1] for r in records if not r[2]]),
+            # Large values mean the client, not the server, was the bottleneck
+            "max_send_lag_ms": round(max((r[3] for r in records), default=0.0), 1),
+            "operations": operations,
+        }
+
+    def _write_phase(self, phase):
+        def ms(value):
+            return f"{value:.0f}" if value is not None else "-"
+
+        self.stdout.write(
+            f"{phase['rate']:g} req/s: {phase['requests']} requests, {phase['throughput_rps']:.2f} ok/s, "
+            f"{phase['error_rate']:.1%} errors, max send lag {phase['max_send_lag_ms']:.0f} ms"
+        )
+        self.stdout.write(f"  {'operation':<14} {'requests':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for op, stats in phase["operations"].items():
+            latency = stats["latency_ms"]
+            self.stdout.write(
+                f"  {op:<14} {stats['requests']:>8} {stats['errors']:>7} "
+                f"{ms(latency['p50']):>8} {ms(latency['p95']):>8} {ms(latency['p99']):>8}"
+            )
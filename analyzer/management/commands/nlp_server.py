@@ -0,0 +1,51 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analyzer.nlp_server import NLPServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve analysis from a pool of warm spaCy workers over a Unix socket. Point the web "
+        "workers at it with DOCMAGE_NLP_SOCKET so they never load a model. With DOCMAGE_SUMMARIZER=local "
+        "it also runs the summarization pool, whose model is loaded before it listens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket", default=settings.DOCMAGE_NLP_SOCKET or os.path.join(settings.BASE_DIR, "var", "nlp.sock"),
+            help="Unix socket path (default: DOCMAGE_NLP_SOCKET, else var/nlp.sock).",
+        )
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes, each a warm spaCy pipeline.")
+        parser.add_argument(
+            "--max-batch", type=int, default=8,
+            help="Most analyze_raw_text requests parsed together in one nlp.pipe() call.",
+        )
+        parser.add_argument(
+            "--batch-wait-ms", type=float, default=2.0,
+            help="How long the first request of a batch waits for others to join it.",
+        )
+        parser.add_argument(
+            "--max-worker-rss-mb", type=int, default=0,
+            help="Replace a worker once a batch leaves it above this RSS (0 = never).",
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(os.path.dirname(os.path.abspath(options["socket"])), exist_ok=True)
+        server = NLPServer(
+            options["socket"],
+            workers=options["workers"],
+            max_batch=options["max_batch"],
+            batch_wait=options["batch_wait_ms"] / 1000,
+            max_worker_rss_mb=options["max_worker_rss_mb"],
+        )
+        seconds = server.start()
+        summarizer = " and the summarization model" if server.summarizes else ""
+        self.stdout.write(
+            f"NLP server: {options['workers']} workers{summarizer} warmed up in {seconds:.2f}s, "
+            f"listening on {options['socket']}"
+        )
+        server.serve_forever()
+        self.stdout.write("NLP server stopped.")
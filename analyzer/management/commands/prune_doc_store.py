@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from analyzer.models import Document
+from analyzer.nlp_utils import doc_store
+from analyzer.nlp_utils.spacy_model import get_nlp
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete parsed Docs no document uses any more (deleted documents, replaced texts and pages) "
+        "and those of other spaCy pipelines from the doc store. Run periodically (e.g. nightly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age-minutes", type=float, default=60,
+            help="Keep files written more recently than this, e.g. by uploads still being analyzed.",
+        )
+
+    def handle(self, *args, **options):
+        # Whole texts, and the pages of documents analyzed page by page
+        live = set()
+        rows = Document.objects.exclude(raw_text=None).values_list("raw_text", "page_analysis")
+        for raw_text, page_analysis in rows.iterator(chunk_size=200):
+            live.add(doc_store.key(raw_text))
+            live.update(fragment["text_hash"] for fragment in (page_analysis or {}).get("pages", ()))
+
+        removed = doc_store.prune(get_nlp(), live, min_age=options["min_age_minutes"] * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed['files']} files ({removed['bytes'] / 1e6:.1f} MB) from {doc_store.DOC_STORE}; "
+            f"{removed['kept']} stored Docs kept."
+        ))
@@ -0,0 +1,111 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analyzer import aggregates, similarity
+from analyzer.exports import remove_summary_pdfs
+from analyzer.metrics import index_metrics
+from analyzer.models import AnalysisTrace, Document
+from analyzer.nlp_utils import doc_store
+from analyzer.nlp_utils.pipeline import analyze_pages, analyze_raw_text
+from analyzer.traces import trace_for
+
+# Unchanged by a new analysis of the same text
+KEPT_FIELDS = ("raw_text", "minhash")
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyze stored documents again, e.g. after a lexicon, rule or summarizer change. "
+        "Parsed Docs come from the doc store, so only texts it does not have are parsed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", help="Comma-separated document IDs (default: all).")
+        parser.add_argument("--category", choices=[c for c, _ in Document.CATEGORY_CHOICES])
+        parser.add_argument(
+            "--summary-fallbacks", action="store_true",
+            help="Only documents whose overview is the narrative one because the summarizer gave no answer.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Documents saved per bulk_update.")
+        parser.add_argument(
+            "--reparse", action="store_true",
+            help="Ignore the doc store and parse every text again, to compare throughput.",
+        )
+
+    def handle(self, *args, **options):
+        if options["reparse"]:
+            doc_store.DOC_STORE = ""
+        documents = Document.objects.exclude(raw_text=None).order_by("id")
+        if options["ids"]:
+            documents = documents.filter(id__in=[int(i) for i in options["ids"].split(",") if i.strip()])
+        if options["category"]:
+            documents = documents.filter(category=options["category"])
+        if options["summary_fallbacks"]:
+            documents = documents.filter(summary_fallback=True)
+
+        before = dict(doc_store.stats)
+        batch, snapshots, traces, total, characters, analyzing, fields = [], [], [], 0, 0, 0.0, set()
+        reindex = set()  # documents whose term counts changed
+        started = time.perf_counter()
+        for document in documents.iterator(chunk_size=options["batch_size"]):
+            analysis_started = time.perf_counter()
+            analysis = self._analyze(document)
+            analyzing += time.perf_counter() - analysis_started
+            traces.append(trace_for(document, analysis.pop("trace"), analysis, "reanalyze"))
+            for field in KEPT_FIELDS:
+                analysis.pop(field, None)
+            # What the document contributed to the corpus aggregates before this analysis
+            snapshots.append(aggregates.snapshot(document))
+            if analysis.get("term_counts") != document.term_counts:
+                reindex.add(document.pk)
+            for field, value in analysis.items():
+                setattr(document, field, value)
+            fields.update(analysis)
+            batch.append(document)
+            total += 1
+            characters += len(document.raw_text)
+            if len(batch) >= options["batch_size"]:
+                self._save(batch, snapshots, fields, traces, reindex)
+                batch, snapshots, traces = [], [], []
+        self._save(batch, snapshots, fields, traces, reindex)
+
+        loaded = doc_store.stats["loaded"] - before.get("loaded", 0)
+        parsed = doc_store.stats["parsed"] - before.get("parsed", 0)
+        rate = total / analyzing if analyzing else 0.0
+        self.stdout.write(
+            f"Analysis: {analyzing:.1f}s for {characters:,} characters, {rate:.1f} documents/s. "
+            f"Docs loaded from the store: {loaded}, parsed: {parsed}."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-analyzed {total} documents in {time.perf_counter() - started:.1f}s."
+        ))
+
+    @staticmethod
+    def _analyze(document):
+        raw_text = document.raw_text
+        if document.page_analysis and document.page_offsets:
+            # Analyzed page by page: again page by page, without reusing the stored fragments
+            bounds = list(document.page_offsets) + [len(raw_text)]
+            pages = [
+                (fragment["content_hash"], raw_text[bounds[i]:bounds[i + 1]])
+                for i, fragment in enumerate(document.page_analysis["pages"])
+            ]
+            return analyze_pages(pages, document.category, minhash=document.minhash)
+        return analyze_raw_text(raw_text, document.category, minhash=document.minhash)
+
+    @staticmethod
+    def _save(batch, snapshots, fields, traces, reindex):
+        if batch:
+            with transaction.atomic():
+                Document.objects.bulk_update(batch, sorted(fields))
+                index_metrics(batch)
+                aggregates.update(removed=snapshots, added=[aggregates.snapshot(doc) for doc in batch])
+                AnalysisTrace.objects.bulk_create(traces)
+            # Once committed: the row appended for a document replaces its older one in queries
+            for doc in batch:
+                if doc.pk in reindex:
+                    similarity.add_document(doc.pk, doc.term_counts)
+            # Their summary PDFs show the previous analysis
+            remove_summary_pdfs([doc.pk for doc in batch])
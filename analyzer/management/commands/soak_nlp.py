@@ -0,0 +1,62 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.memory import rss_mb
+from analyzer.nlp_utils import doc_store, spacy_model
+from analyzer.nlp_utils.pipeline import AUTO_CATEGORY, analyze_raw_text
+from analyzer.sample_documents import generate_document
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the analysis pipeline over many generated documents, each with words the vocab "
+        "has never seen, and fail if resident memory keeps growing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=10_000)
+        parser.add_argument(
+            "--warmup", type=int, default=None,
+            help="Documents processed before the baseline is taken (default: 10%% of --documents).",
+        )
+        parser.add_argument("--sample-every", type=int, default=1000, help="Report memory every N documents.")
+        parser.add_argument(
+            "--max-growth-mb", type=float, default=10.0,
+            help="Fail if RSS grows by more than this after the warm-up (default: 10).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-memory-zones", action="store_true",
+            help="Parse outside spaCy memory zones, to measure the growth they prevent.",
+        )
+
+    def handle(self, *args, **options):
+        total = options["documents"]
+        warmup = options["warmup"] if options["warmup"] is not None else total // 10
+        if not 0 <= warmup < total:
+            raise CommandError("--warmup must be smaller than --documents.")
+        if options["no_memory_zones"]:
+            spacy_model.USE_MEMORY_ZONES = False
+        # Measure the parses themselves, not 10k one-off Docs written to the store
+        doc_store.DOC_STORE = ""
+        rng = random.Random(options["seed"])
+        strings = spacy_model.get_nlp().vocab.strings
+
+        baseline, started = None, time.perf_counter()
+        for i in range(1, total + 1):
+            analyze_raw_text(generate_document(rng), AUTO_CATEGORY)
+            if i == warmup or (warmup == 0 and i == 1):
+                baseline = rss_mb()
+            if i % options["sample_every"] == 0 or i == total:
+                self.stdout.write(
+                    f"{i:>7} documents  {rss_mb():8.1f} MB RSS  {len(strings):>9} strings  "
+                    f"{time.perf_counter() - started:7.1f}s"
+                )
+
+        growth = rss_mb() - baseline
+        message = f"RSS grew {growth:.1f} MB over the last {total - max(warmup, 1)} documents."
+        if growth > options["max_growth_mb"]:
+            raise CommandError(f"{message} Limit: {options['max_growth_mb']:.0f} MB.")
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,49 @@
+"""Resident memory of the current process, for worker recycling and soak runs."""
+import os
+import resource
+import sys
+
+
+def rss_bytes() -> int:
+    """Current resident set size; the peak instead where /proc is not available (macOS)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def rss_mb() -> float:
+    return rss_bytes() / (1024 * 1024)
+
+
+def process_tree_rss_bytes(pid: int):
+    """
+    Resident set size of process `pid` plus all its descendants (e.g. a
+    gunicorn master and its workers), or None where /proc is not available.
+    Pages the workers share copy-on-write with the master are counted in each.
+    """
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    children = {}
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name, in parentheses, may itself contain spaces
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # exited meanwhile
+        children.setdefault(ppid, []).append(int(entry))
+    total, todo = 0, [pid]
+    while todo:
+        current = todo.pop()
+        try:
+            with open(f"/proc/{current}/statm") as statm:
+                total += int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            continue
+        todo.extend(children.get(current, ()))
+    return total
@@ -0,0 +1,39 @@
+from .models import DocumentMetric
+from .nlp_utils.metrics import extract_metrics, parse_condition
+
+# Rows per INSERT when indexing metrics
+BATCH_SIZE = 500
+
+
+def index_metrics(documents):
+    """Replace saved documents' rows in the metrics table with those extracted from their raw text."""
+    documents = [doc for doc in documents if doc.pk]
+    if not documents:
+        return
+    DocumentMetric.objects.filter(document_id__in=[doc.pk for doc in documents]).delete()
+    DocumentMetric.objects.bulk_create([
+        DocumentMetric(document_id=doc.pk, **metric)
+        for doc in documents
+        for metric in extract_metrics(doc.raw_text)
+    ], batch_size=BATCH_SIZE)
+
+
+def filter_metrics(condition: str, metrics=None):
+    """
+    DocumentMetric rows matching a condition such as "revenue > 100 Cr in
+    FY2024-25" or "bp systolic > 140" (see nlp_utils.metrics.parse_condition).
+
+    The metric and unit, or the metric and fiscal year, are equality filters
+    and the value a range on the same index, so the lookup is an index range
+    scan. Raises ValueError for a condition that does not parse.
+    """
+    parsed = parse_condition(condition)
+    metrics = DocumentMetric.objects.all() if metrics is None else metrics
+    metrics = metrics.filter(metric=parsed["metric"], **{f"value__{parsed['lookup']}": parsed["value"]})
+    if parsed["unit"] is not None:
+        metrics = metrics.filter(unit=parsed["unit"])
+    if parsed["period"]:
+        metrics = metrics.filter(period=parsed["period"])
+    if parsed["quarter"]:
+        metrics = metrics.filter(quarter=parsed["quarter"])
+    return metrics
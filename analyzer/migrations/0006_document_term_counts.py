@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0005_document_minhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='term_counts',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0006_document_term_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='highlight_spans',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='page_offsets',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0007_document_text_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='category_analysis',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='category_scores',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
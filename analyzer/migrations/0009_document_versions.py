@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0008_document_category_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='page_analysis',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='previous_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revisions', to='analyzer.document'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0009_document_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='incomplete_scans',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0010_document_incomplete_scans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisTrace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('source', models.CharField(choices=[('upload', 'Upload'), ('ingest', 'Bulk ingest'), ('reanalyze', 'Re-analysis')], max_length=20)),
+                ('category', models.CharField(max_length=50)),
+                ('doc_type', models.CharField(max_length=10)),
+                ('analyzer_version', models.CharField(max_length=100)),
+                ('seconds', models.FloatField()),
+                ('stages', models.JSONField(default=dict)),
+                ('text_length', models.PositiveIntegerField()),
+                ('page_count', models.PositiveIntegerField(default=1)),
+                ('sentence_count', models.PositiveIntegerField(default=0)),
+                ('entity_count', models.PositiveIntegerField(default=0)),
+                ('match_count', models.PositiveIntegerField(default=0)),
+                ('peak_rss_mb', models.FloatField(blank=True, null=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_traces', to='analyzer.document')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-seconds'], name='analyzer_an_seconds_d29468_idx'), models.Index(fields=['-text_length'], name='analyzer_an_text_le_9f30e1_idx'), models.Index(fields=['category', 'doc_type'], name='analyzer_an_categor_1ddd03_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0011_analysistrace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=40)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(blank=True, max_length=10)),
+                ('period', models.CharField(blank=True, max_length=20)),
+                ('quarter', models.CharField(blank=True, max_length=2)),
+                ('text', models.CharField(blank=True, max_length=100)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='analyzer.document')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'unit', 'value'], name='analyzer_do_metric_5321b8_idx'), models.Index(fields=['metric', 'period', 'value'], name='analyzer_do_metric_6fc371_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0012_documentmetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDayCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('documents', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'day'), name='unique_category_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HighlightTermCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('subcategory', models.CharField(max_length=100)),
+                ('term', models.CharField(max_length=100)),
+                ('documents', models.IntegerField(default=0)),
+                ('mentions', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'day', 'subcategory', 'term'), name='unique_highlight_term_day')],
+            },
+        ),
+    ]
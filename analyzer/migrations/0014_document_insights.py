@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0013_corpus_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='insights',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0014_document_insights'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='summary_fallback',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -24,6 +24,123 @@ class Document(models.Model):
     key_points = models.JSONField(blank=True, null=True)  # ✅ New field
     raw_text = models.TextField(blank=True, null=True)
     highlights = models.JSONField(blank=True, null=True)
+    minhash = models.JSONField(blank=True, null=True)  # MinHash signature of raw_text (near-duplicate detection)
+    term_counts = models.JSONField(blank=True, null=True)  # Hashed lemma counts {bucket: n} (related documents)
+    page_offsets = models.JSONField(blank=True, null=True)  # Start offset of each PDF page in raw_text
+    highlight_spans = models.JSONField(blank=True, null=True)  # [[start, end, key], ...] highlight matches in raw_text
+    insights = models.JSONField(blank=True, null=True)  # generate_insights() for the document's category
+    category_analysis = models.JSONField(blank=True, null=True)  # {category: {summary, key_points, highlights, highlight_spans, insights}}
+    category_scores = models.JSONField(blank=True, null=True)  # {category: lexicon hits per 1000 tokens} (auto-detection)
+    page_analysis = models.JSONField(blank=True, null=True)  # PDFs: {version, pages: [per-page analysis fragment], reused}
+    incomplete_scans = models.JSONField(blank=True, null=True)  # Regex extractors cut short by the CPU budget
+    summary_fallback = models.BooleanField(default=False)  # Narrative overview in place of a summarizer that gave no answer
+    previous_version = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, blank=True, null=True, related_name='revisions',
+    )  # Earlier version this upload revises; its unchanged pages are not re-extracted or re-analyzed
 
     def __str__(self):
         return self.title
+
+
+class MinHashBand(models.Model):
+    """LSH band index: documents sharing a (band, bucket) pair are near-duplicate candidates."""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='minhash_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['band', 'bucket'])]
+
+    def __str__(self):
+        return f"{self.document_id}: band {self.band}"
+
+
+class AnalysisTrace(models.Model):
+    """Where one analysis of a document spent its time (see nlp_utils.trace), for the slowest-runs admin view."""
+    SOURCES = [
+        ('upload', 'Upload'),
+        ('ingest', 'Bulk ingest'),
+        ('reanalyze', 'Re-analysis'),
+    ]
+
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='analysis_traces')
+    created_at = models.DateTimeField(auto_now_add=True)
+    source = models.CharField(max_length=20, choices=SOURCES)
+    category = models.CharField(max_length=50)  # As analyzed (detected, if auto)
+    doc_type = models.CharField(max_length=10)
+    analyzer_version = models.CharField(max_length=100)
+    seconds = models.FloatField()  # Whole run, extraction included where the caller traced it
+    stages = models.JSONField(default=dict)  # {stage: seconds}, e.g. extract, parse, highlights, overview
+    text_length = models.PositiveIntegerField()
+    page_count = models.PositiveIntegerField(default=1)
+    sentence_count = models.PositiveIntegerField(default=0)  # Sentences scored for key points
+    entity_count = models.PositiveIntegerField(default=0)
+    match_count = models.PositiveIntegerField(default=0)  # Highlight spans of the document's category
+    peak_rss_mb = models.FloatField(null=True, blank=True)  # Highest resident memory sampled between stages
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-seconds']),
+            models.Index(fields=['-text_length']),
+            models.Index(fields=['category', 'doc_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id}: {self.seconds:.2f}s"
+
+
+class DocumentMetric(models.Model):
+    """A normalized metric of a document (see nlp_utils.metrics), indexed for range queries such as revenue > 100 Cr."""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='metrics')
+    metric = models.CharField(max_length=40)  # e.g. revenue, gross_margin, bp_systolic, dosage
+    value = models.FloatField()  # Absolute amount (45.2 Cr is 452000000), °C, mg, ...
+    unit = models.CharField(max_length=10, blank=True)  # Currency code ("" if unknown), %, mmHg, bpm, °C, mg, ml, units
+    period = models.CharField(max_length=20, blank=True)  # Fiscal year of financial metrics, e.g. FY2024-25
+    quarter = models.CharField(max_length=2, blank=True)  # Q1-Q4 if the period names one
+    text = models.CharField(max_length=100, blank=True)  # As written in the document
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['metric', 'unit', 'value']),
+            models.Index(fields=['metric', 'period', 'value']),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id}: {self.metric} {self.value:g} {self.unit}".rstrip()
+
+
+class HighlightTermCount(models.Model):
+    """
+    Corpus aggregate: documents (and highlight matches) with a term, per
+    category, subcategory and upload day. Kept up to date as deltas by
+    analyzer.aggregates, so the dashboard never reads Document rows.
+    """
+    category = models.CharField(max_length=50)
+    day = models.DateField()  # The document's upload day
+    subcategory = models.CharField(max_length=100)  # Highlight key, e.g. Conditions, Clauses
+    term = models.CharField(max_length=100)  # Matched text, lower-cased with spaces collapsed
+    documents = models.IntegerField(default=0)
+    mentions = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'day', 'subcategory', 'term'], name='unique_highlight_term_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.category}/{self.subcategory} {self.term!r} on {self.day}: {self.documents}"
+
+
+class CategoryDayCount(models.Model):
+    """Corpus aggregate: documents per category and upload day (see analyzer.aggregates)."""
+    category = models.CharField(max_length=50)
+    day = models.DateField()
+    documents = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'day'], name='unique_category_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} on {self.day}: {self.documents}"
@@ -0,0 +1,144 @@
+"""
+Thin client for the NLP server (analyzer/nlp_server.py, `manage.py nlp_server`).
+
+With settings.DOCMAGE_NLP_SOCKET set, the functions below send the work to the
+server over its Unix socket and the calling process never loads spaCy; when it
+is empty they run the local pipeline. Either way they take and return the same
+values as their namesakes in nlp_utils.
+"""
+import socket
+import struct
+
+from django.conf import settings
+
+from .nlp_utils import highlighter, pipeline, summarizer
+
+HEADER = struct.Struct("!I")  # frame length, big-endian
+MAX_FRAME = 256 * 1024 * 1024
+
+
+class NLPServerError(RuntimeError):
+    """The NLP server could not be reached, or failed the request."""
+
+
+def encode_frame(message) -> bytes:
+    import srsly  # msgpack; imported on first use like the other NLP dependencies
+    body = srsly.msgpack_dumps(message)
+    return HEADER.pack(len(body)) + body
+
+
+def decode(body: bytes):
+    import srsly
+    return srsly.msgpack_loads(body)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise NLPServerError("NLP server closed the connection.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _frames(op, args):
+    """Send one request and yield the server's frames up to and including its reply."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(settings.DOCMAGE_NLP_TIMEOUT)
+    try:
+        try:
+            sock.connect(settings.DOCMAGE_NLP_SOCKET)
+            sock.sendall(encode_frame({"id": 1, "op": op, "args": args}))
+        except OSError as exc:
+            raise NLPServerError(f"NLP server at {settings.DOCMAGE_NLP_SOCKET} unreachable: {exc}") from exc
+        while True:
+            try:
+                (length,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+                if length > MAX_FRAME:
+                    raise NLPServerError(f"NLP server frame of {length} bytes exceeds {MAX_FRAME}.")
+                frame = decode(_recv_exactly(sock, length))
+            except OSError as exc:  # includes socket.timeout
+                raise NLPServerError(f"NLP server request {op!r} failed: {exc}") from exc
+            if "error" in frame:
+                raise NLPServerError(frame["error"])
+            yield frame
+            if "result" in frame:
+                return
+    finally:
+        # Closing mid-stream tells the server to drop the rest of the work
+        sock.close()
+
+
+def call(op: str, **args):
+    """Run `op` on the NLP server and return its result."""
+    frames = _frames(op, args)
+    try:
+        for frame in frames:
+            if "result" in frame:
+                return frame["result"]
+    finally:
+        frames.close()
+
+
+def remote() -> bool:
+    return bool(settings.DOCMAGE_NLP_SOCKET)
+
+
+# ---------- Pipeline entry points ----------
+
+def analyze_raw_text(raw_text: str, category: str = "general", minhash=None) -> dict:
+    if not remote():
+        return pipeline.analyze_raw_text(raw_text, category, minhash=minhash)
+    return call("analyze_raw_text", raw_text=raw_text, category=category, minhash=minhash)
+
+
+def analyze_changed_regions(raw_text: str, category: str, source: dict, minhash=None) -> dict:
+    if not remote():
+        return pipeline.analyze_changed_regions(raw_text, category, source, minhash=minhash)
+    return call("analyze_changed_regions", raw_text=raw_text, category=category, source=source, minhash=minhash)
+
+
+def analyze_pages(pages, category: str = "general", previous=None, minhash=None) -> dict:
+    if not remote():
+        return pipeline.analyze_pages(pages, category, previous=previous, minhash=minhash)
+    return call("analyze_pages", pages=pages, category=category, previous=previous, minhash=minhash)
+
+
+def analyze_sections(text: str, category: str = "general") -> dict:
+    if not remote():
+        return pipeline.analyze_sections(text, category)
+    return call("analyze_sections", text=text, category=category)
+
+
+def analyze_fast(text: str, category: str = "general") -> dict:
+    if not remote():
+        return pipeline.analyze_fast(text, category)
+    return call("analyze_fast", text=text, category=category)
+
+
+def iter_analysis_sections(text: str, category: str = "general"):
+    """(section, value) pairs as the server computes them; closing the generator cancels the rest."""
+    if not remote():
+        yield from pipeline.iter_analysis_sections(text, category)
+        return
+    frames = _frames("iter_analysis_sections", {"text": text, "category": category})
+    try:
+        for frame in frames:
+            if "section" in frame:
+                yield frame["section"], frame["value"]
+    finally:
+        frames.close()
+
+
+def extract_highlights(text: str, category: str = "general") -> dict:
+    if not remote():
+        return highlighter.extract_highlights(text, category)
+    return call("extract_highlights", text=text, category=category)
+
+
+def summarize_structured_with_insights(text: str, category: str = None) -> dict:
+    if not remote():
+        return summarizer.summarize_structured_with_insights(text, category)
+    return call("summarize_structured_with_insights", text=text, category=category)
@@ -0,0 +1,405 @@
+"""
+Optional NLP server (`manage.py nlp_server`): one process that owns a fixed
+pool of warm spaCy workers and serves analysis over a Unix domain socket, so
+web workers (see nlp_client.py) never load a model.
+
+The parent loads the pipeline and matchers once and forks the workers, which
+share those pages copy-on-write. It accepts connections with asyncio and
+groups analyze_raw_text requests that arrive within `batch_wait` seconds of
+each other, up to `max_batch`, into one batch: the worker parses the batch's
+texts with a single nlp.pipe() call, loading those already in the doc store
+instead. Other operations run one per batch.
+
+With DOCMAGE_SUMMARIZER=local the parent also runs the one summarization
+pool of the deployment (see summary_backends) and loads its model in
+start(). "summarize" requests, from the workers and from any other process
+pointed at the socket, are queued on that pool without occupying a worker.
+
+Frames are a 4-byte big-endian length followed by a msgpack map:
+
+  request   {"id": int, "op": str, "args": {...}}
+  reply     {"id": int, "result": ...}   or   {"id": int, "error": str}
+  streamed  {"id": int, "section": str, "value": ...} for each section of
+            iter_analysis_sections, then the reply with "result": None
+
+A client that disconnects mid-stream cancels the rest of its analysis.
+"""
+import asyncio
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+
+from .memory import rss_mb
+from .nlp_client import HEADER, MAX_FRAME, decode, encode_frame
+
+logger = logging.getLogger(__name__)
+
+BATCHED_OPS = {"analyze_raw_text"}
+STREAMED_OPS = {"iter_analysis_sections"}
+
+
+def _operations():
+    # Imported in the parent before forking, never in the web workers
+    from .nlp_utils import highlighter, pipeline, summarizer
+    return {
+        "analyze_raw_text": pipeline.analyze_raw_text,
+        "analyze_changed_regions": pipeline.analyze_changed_regions,
+        "analyze_pages": pipeline.analyze_pages,
+        "analyze_sections": pipeline.analyze_sections,
+        "analyze_fast": pipeline.analyze_fast,
+        "iter_analysis_sections": pipeline.iter_analysis_sections,
+        "extract_highlights": highlighter.extract_highlights,
+        "summarize_structured_with_insights": summarizer.summarize_structured_with_insights,
+    }
+
+
+# ---------- Worker processes ----------
+
+def _worker_main(conn, parent_ends, max_rss_mb, socket_path):
+    """Run batches sent by the parent until it goes away (or RSS passes max_rss_mb)."""
+    # Inherited copies of the parent's pipe ends (this worker's and the other
+    # workers') would keep them from seeing EOF when the parent closes its own
+    for parent_end in parent_ends:
+        parent_end.close()
+    # Forked from the parent's event loop: drop its signal wake-up fd and handlers
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from .nlp_utils import summary_backends
+    summary_backends.use_server(socket_path)  # the parent's pool, not one per worker
+    operations = _operations()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message[0] != "batch":
+            continue  # a cancel for a job that already finished
+        _run_batch(conn, operations, message[1])
+        conn.send(("idle",))
+        if max_rss_mb and rss_mb() > max_rss_mb:
+            return  # the parent forks a fresh worker
+
+
+def _run_batch(conn, operations, jobs):
+    done = set()
+    batched = [job for job in jobs if job[1] in BATCHED_OPS]
+    if len(batched) > 1:
+        from .nlp_utils import doc_store
+        from .nlp_utils.spacy_model import memory_zone
+        try:
+            with memory_zone() as nlp:
+                docs = doc_store.parse(nlp, [args["raw_text"] for _, _, args in batched])
+                for (job_id, op, args), doc in zip(batched, docs):
+                    conn.send(("result", job_id, operations[op](**args, doc=doc)))
+                    done.add(job_id)
+        except Exception:
+            # One bad text fails the whole pipe() call; the rest are retried one by one below
+            logger.warning("NLP server batch of %d failed; retrying one by one", len(batched), exc_info=True)
+    for job_id, op, args in jobs:
+        if job_id in done:
+            continue
+        try:
+            if op in STREAMED_OPS:
+                _stream(conn, job_id, operations[op](**args))
+                conn.send(("result", job_id, None))
+            else:
+                conn.send(("result", job_id, operations[op](**args)))
+        except _Cancelled:
+            conn.send(("result", job_id, None))
+        except Exception as exc:
+            logger.exception("NLP server job %s (%s) failed", job_id, op)
+            conn.send(("error", job_id, f"{type(exc).__name__}: {exc}"))
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _stream(conn, job_id, sections):
+    try:
+        for section, value in sections:
+            # The parent only writes cancels while a batch runs
+            while conn.poll():
+                kind, cancelled_id = conn.recv()
+                if kind == "cancel" and cancelled_id == job_id:
+                    raise _Cancelled()
+            conn.send(("part", job_id, section, value))
+    finally:
+        sections.close()
+
+
+# ---------- Parent process ----------
+
+@dataclass
+class _Job:
+    id: int
+    op: str
+    args: dict
+    client_id: object
+    writer: asyncio.StreamWriter
+    cancelled: bool = False
+
+    def reply(self, frame):
+        if not self.cancelled and not self.writer.is_closing():
+            self.writer.write(encode_frame({"id": self.client_id, **frame}))
+
+
+@dataclass
+class _Worker:
+    process: multiprocessing.Process
+    conn: object
+    jobs: dict = field(default_factory=dict)
+    alive: bool = True
+
+
+class NLPServer:
+    def __init__(self, socket_path, workers=2, max_batch=8, batch_wait=0.002, max_worker_rss_mb=0):
+        self.socket_path = socket_path
+        self.worker_count = workers
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self.stats = {
+            "requests": 0, "batches": 0, "batched_requests": 0, "errors": 0, "worker_restarts": 0, "summaries": 0,
+        }
+        self._context = multiprocessing.get_context("fork")
+        self._workers = []
+        self._next_id = 0
+        self._summaries = None  # the summarization pool's backend, with DOCMAGE_SUMMARIZER=local
+
+    def start(self) -> float:
+        """Load the models (and the summarization model) and fork the workers; returns the seconds it took."""
+        from .nlp_utils import summary_backends
+        from .nlp_utils.warmup import load_models
+
+        started = time.perf_counter()
+        nlp = load_models()
+        nlp("Warm-up: Patient Name: Jane Doe, BP 120/80 mmHg, Revenue of 10 Cr.")
+        # Before any request: the first ones would otherwise wait for the model and fall back
+        self._summaries = summary_backends.serve_pool()
+        self._operation_names = set(_operations())
+        gc.collect()
+        gc.freeze()  # keep the workers' collections off the shared pages
+        for _ in range(self.worker_count):
+            self._workers.append(self._spawn())
+        return time.perf_counter() - started
+
+    @property
+    def summarizes(self) -> bool:
+        """Whether this server runs the summarization pool (DOCMAGE_SUMMARIZER=local)."""
+        return self._summaries is not None
+
+    def serve_forever(self):
+        """Serve on the socket until SIGTERM or SIGINT, then stop the workers."""
+        try:
+            asyncio.run(self._serve())
+        finally:
+            for worker in self._workers:
+                worker.conn.close()
+            for worker in self._workers:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        parent_ends = [parent_conn] + [w.conn for w in self._workers]
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, parent_ends, self.max_worker_rss_mb, self.socket_path),
+            name="docmage-nlp-worker", daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._idle = asyncio.Queue()
+        for worker in self._workers:
+            self._attach(worker)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # left behind by a server that was killed
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        stop = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            dispatcher.cancel()
+            for worker in self._workers:
+                loop.remove_reader(worker.conn.fileno())
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    # ----- Clients -----
+
+    async def _handle_client(self, reader, writer):
+        jobs, summaries = [], []
+        try:
+            while True:
+                (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if length > MAX_FRAME:
+                    break
+                request = decode(await reader.readexactly(length))
+                if request.get("op") == "summarize" and self._summaries:
+                    summaries.append(self._summarize(request, writer))
+                    continue
+                job = self._submit(request, writer)
+                if job:
+                    jobs.append(job)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # Gone (or done): drop unfinished work, and stop streams the worker is still producing
+            for job in jobs:
+                if not job.cancelled:
+                    job.cancelled = True
+                    self._cancel(job)
+            for future in summaries:
+                future.cancel()  # still queued: dropped; already running: its result is discarded
+            writer.close()
+
+    def _summarize(self, request, writer):
+        """Queue a "summarize" request on the summarization pool; the reply is written once it is done."""
+        client_id = request.get("id")
+        self.stats["summaries"] += 1
+        future = self._summaries.pool.submit((request.get("args") or {}).get("text") or "")
+
+        def reply(done):
+            if done.cancelled() or writer.is_closing():
+                return
+            error = done.exception()
+            if error:
+                self.stats["errors"] += 1
+            frame = {"error": f"{type(error).__name__}: {error}"} if error else {"result": done.result()}
+            writer.write(encode_frame({"id": client_id, **frame}))
+
+        asyncio.wrap_future(future).add_done_callback(reply)
+        return future
+
+    def _submit(self, request, writer):
+        client_id = request.get("id")
+        op = request.get("op")
+        if op == "stats":
+            writer.write(encode_frame({"id": client_id, "result": self.server_stats()}))
+            return None
+        if op not in self._operation_names:
+            writer.write(encode_frame({"id": client_id, "error": f"Unknown operation {op!r}."}))
+            return None
+        self._next_id += 1
+        job = _Job(self._next_id, op, request.get("args") or {}, client_id, writer)
+        self.stats["requests"] += 1
+        self._queue.put_nowait(job)
+        return job
+
+    def _cancel(self, job):
+        for worker in self._workers:
+            if job.id in worker.jobs and worker.alive:
+                try:
+                    worker.conn.send(("cancel", job.id))
+                except OSError:
+                    pass
+
+    def server_stats(self):
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "workers": sum(w.alive for w in self._workers),
+            "queued": self._queue.qsize(),
+            "mean_batch_size": round(self.stats["batched_requests"] / batches, 2) if batches else 0.0,
+            "summarizer": self._summaries.stats() if self._summaries else None,
+        }
+
+    # ----- Batching -----
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        held = None
+        while True:
+            job = held or await self._queue.get()
+            held = None
+            batch = [job]
+            if job.op in BATCHED_OPS:
+                deadline = loop.time() + self.batch_wait
+                while len(batch) < self.max_batch:
+                    try:
+                        remaining = deadline - loop.time()
+                        if remaining > 0:
+                            nxt = await asyncio.wait_for(self._queue.get(), remaining)
+                        else:
+                            nxt = self._queue.get_nowait()
+                    except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                        break
+                    if nxt.op != job.op:
+                        held = nxt
+                        break
+                    batch.append(nxt)
+
+            worker = await self._idle.get()
+            while not worker.alive:
+                worker = await self._idle.get()
+            batch = [job for job in batch if not job.cancelled]
+            if not batch:
+                self._idle.put_nowait(worker)
+                continue
+            for job in batch:
+                worker.jobs[job.id] = job
+            worker.conn.send(("batch", [(job.id, job.op, job.args) for job in batch]))
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += len(batch)
+
+    # ----- Worker messages -----
+
+    def _attach(self, worker):
+        asyncio.get_running_loop().add_reader(worker.conn.fileno(), self._on_worker_message, worker)
+        self._idle.put_nowait(worker)
+
+    def _on_worker_message(self, worker):
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            return
+        kind = message[0]
+        if kind == "idle":
+            self._idle.put_nowait(worker)
+        elif kind == "part":
+            _, job_id, section, value = message
+            job = worker.jobs.get(job_id)
+            if job:
+                job.reply({"section": section, "value": value})
+        else:
+            _, job_id, value = message
+            job = worker.jobs.pop(job_id, None)
+            if job:
+                if kind == "error":
+                    self.stats["errors"] += 1
+                job.reply({"error": value} if kind == "error" else {"result": value})
+
+    def _replace(self, worker):
+        """A worker exited (recycled for memory, or killed): fail its jobs and fork a new one."""
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.conn.fileno())
+        worker.alive = False
+        worker.conn.close()
+        worker.process.join(timeout=1)
+        for job in worker.jobs.values():
+            self.stats["errors"] += 1
+            job.reply({"error": f"NLP worker exited (code {worker.process.exitcode}) during the request."})
+        worker.jobs.clear()
+        replacement = self._spawn()
+        self._workers[self._workers.index(worker)] = replacement
+        self.stats["worker_restarts"] += 1
+        self._attach(replacement)
+
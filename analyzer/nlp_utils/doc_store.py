@@ -0,0 +1,158 @@
+# nlp_utils/doc_store.py
+"""
+Parsed Docs on disk, so documents can be analyzed again without running the
+spaCy pipeline.
+
+The parse is the bulk of an analysis; matching lexicons and regexes, scoring
+sentences and building overviews from a parsed Doc are cheap. Each Doc parsed
+for a document (the whole text, or one PDF page) is written as a DocBin to
+DOC_STORE (var/docs/, or DOCMAGE_DOC_STORE; empty turns the store off):
+
+    <model>/<sha1 of the text, 2 chars>/<sha1 of the text>.spacy
+
+DocBin keeps tokens, lemmas, tags, dependencies, sentence starts and entities
+and compresses them with zlib. The key is the text alone, so identical texts
+and unchanged pages of new versions share one file; the directory is the
+pipeline's name and version, so a new model never reads Docs it did not make.
+
+Loading adds the Doc's strings to the vocab: call parse() inside a memory zone.
+
+Files are never removed by an analysis, since other documents may share them.
+prune() (`manage.py prune_doc_store`) deletes those of texts no document has
+any more (deleted documents, replaced texts and pages) and every file of
+other pipelines.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_default = Path(__file__).resolve().parents[2] / "var" / "docs"
+DOC_STORE = os.environ.get("DOCMAGE_DOC_STORE", str(_default))
+
+# Docs loaded from the store, parsed by the pipeline, and written (this process)
+stats = Counter()
+
+
+def enabled() -> bool:
+    return bool(DOC_STORE)
+
+
+def key(text: str) -> str:
+    """The store key of `text`; the same as the text_hash of a page fragment (see pipeline)."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def model_dir(nlp) -> str:
+    return f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+
+
+def _path(nlp, text: str) -> Path:
+    text_key = key(text)
+    return Path(DOC_STORE) / model_dir(nlp) / text_key[:2] / f"{text_key}.spacy"
+
+
+def load(nlp, text: str):
+    """The stored Doc of `text`, or None if there is none (or it is unreadable)."""
+    from spacy.tokens import DocBin
+
+    path = _path(nlp, text)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        docs = list(DocBin().from_bytes(data).get_docs(nlp.vocab))
+    except Exception:
+        logger.warning("Unreadable stored Doc %s; parsing again", path, exc_info=True)
+        return None
+    if len(docs) != 1 or docs[0].text != text:
+        return None
+    return docs[0]
+
+
+def save(nlp, text: str, doc):
+    """Write `doc` (the parse of `text`) unless the store already has it."""
+    from spacy.tokens import DocBin
+
+    path = _path(nlp, text)
+    if path.exists():
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # mkstemp: unique per write, also between threads of one process
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        with os.fdopen(fd, "wb") as out:
+            out.write(DocBin(docs=[doc], store_user_data=False).to_bytes())
+        os.replace(tmp, path)
+    except OSError:
+        # The analysis does not depend on it: the next one parses again
+        logger.warning("Could not store the parsed Doc at %s", path, exc_info=True)
+        return
+    stats["saved"] += 1
+
+
+def parse(nlp, texts, docs=None) -> list:
+    """
+    Docs of `texts`: stored ones are loaded, the rest parsed in one nlp.pipe()
+    call and stored. `docs` are parses the caller already has (None for the
+    texts it has not parsed); they are stored but not parsed again.
+    """
+    docs = list(docs) if docs is not None else [None] * len(texts)
+    if enabled():
+        for i, text in enumerate(texts):
+            if docs[i] is not None:
+                save(nlp, text, docs[i])
+            else:
+                docs[i] = load(nlp, text)
+                stats["loaded"] += docs[i] is not None
+    todo = [i for i, doc in enumerate(docs) if doc is None]
+    for i, doc in zip(todo, nlp.pipe([texts[i] for i in todo])):
+        docs[i] = doc
+        stats["parsed"] += 1
+        if enabled():
+            save(nlp, texts[i], doc)
+    return docs
+
+
+def prune(nlp, live_keys, min_age: float = 3600) -> dict:
+    """
+    Delete stored Docs whose key is not in `live_keys`, those of pipelines
+    other than `nlp`'s, and abandoned temp files, then empty directories.
+    Files modified in the last `min_age` seconds are kept: they may belong
+    to an analysis whose document is not saved yet.
+
+    Returns {"files": deleted, "bytes": freed, "kept": stored Docs left}.
+    """
+    removed = {"files": 0, "bytes": 0, "kept": 0}
+    root = Path(DOC_STORE)
+    if not enabled() or not root.is_dir():
+        return removed
+    current, cutoff = model_dir(nlp), time.time() - min_age
+    for directory, _, names in os.walk(root, topdown=False):
+        directory = Path(directory)
+        in_use = directory.parent.name == current
+        for name in names:
+            path = directory / name
+            live = in_use and name.endswith(".spacy") and name[:-len(".spacy")] in live_keys
+            try:
+                stat = path.stat()
+                if live or stat.st_mtime > cutoff:
+                    removed["kept"] += name.endswith(".spacy")
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed["files"] += 1
+            removed["bytes"] += stat.st_size
+        if directory != root:
+            try:
+                directory.rmdir()  # only if now empty
+            except OSError:
+                pass
+    return removed
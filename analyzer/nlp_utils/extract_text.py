@@ -1,15 +1,36 @@
-import fitz  # PyMuPDF
-import docx
+import hashlib
 import os
 
-def extract_text_from_pdf(file_path):
-    text = ""
+# PyMuPDF and python-docx are imported inside the readers so that importing this
+# module (e.g. via the views at URLconf load) stays cheap.
+
+def extract_pages_from_pdf(file_path):
+    import fitz  # PyMuPDF
+    with fitz.open(file_path) as doc:
+        return [page.get_text() for page in doc]
+
+def extract_pdf_pages(file_path, known=None):
+    """
+    [(content_hash, text), ...] for every page of a PDF. content_hash is a
+    SHA-1 of the page's content streams, which are read without laying out any
+    text; a page whose hash is a key of `known` ({content_hash: text}, e.g. the
+    pages of a previous version of the document) is not extracted again.
+    """
+    import fitz  # PyMuPDF
+    known = known or {}
+    pages = []
     with fitz.open(file_path) as doc:
         for page in doc:
-            text += page.get_text()
-    return text
+            content_hash = hashlib.sha1(page.read_contents()).hexdigest()
+            text = known.get(content_hash)
+            pages.append((content_hash, page.get_text() if text is None else text))
+    return pages
+
+def extract_text_from_pdf(file_path):
+    return "".join(extract_pages_from_pdf(file_path))
 
 def extract_text_from_docx(file_path):
+    import docx
     doc = docx.Document(file_path)
     return "\n".join([para.text for para in doc.paragraphs])
 
@@ -27,3 +48,13 @@ def extract_text(file_path, doc_type):
             return extract_text_from_txt(file_path)
     return ""
 
+def extract_text_pages(file_path, doc_type):
+    """(text, page_offsets): for PDFs, the character offset at which each page starts; None otherwise."""
+    if doc_type == 'pdf' and os.path.exists(file_path):
+        pages = extract_pages_from_pdf(file_path)
+        offsets, position = [], 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page)
+        return "".join(pages), offsets
+    return extract_text(file_path, doc_type), None
@@ -0,0 +1,168 @@
+# nlp_utils/field_index.py
+"""
+One-pass index of "Key: value" fields and heading lines, for the overview builders.
+
+The builders used to run a separate regex over the whole text for every field,
+plus lazy DOTALL searches such as `Clinical Summary\\s*(.*?)Impressions`, which
+rescan to the end of the text for every start marker when the end marker is
+missing. FieldIndex walks the text once, line by line, and records offsets:
+
+- fields:   every "Key:" on a line, under its last one to MAX_LABEL_WORDS words
+            ("Patient Name:" is found under "Patient Name" and "Name"). The value
+            is the rest of the line, or the next non-blank line if that is empty.
+- headings: every short line (up to MAX_HEADING_CHARS, trailing colon dropped),
+            with the next non-blank line as its value ("Revenue" / "45.0 Cr").
+- the start of every line beginning with a capital letter, which ends a block.
+
+Lookups are dictionary gets plus a bisect, so the cost of building an overview
+no longer grows with the number of markers in the text. Sections (between) and
+values after a line ending in a marker (after_line_ending) are found with
+str.find instead: they match what the old searches matched, anywhere in a
+line, but look at every character at most a fixed number of times.
+"""
+import bisect
+import re
+
+MAX_LABEL_WORDS = 4
+MAX_LABEL_CHARS = 60  # look-back from a colon when collecting its label
+MAX_HEADING_CHARS = 60
+WHITESPACE = re.compile(r"\s*")
+
+
+class FieldIndex:
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.fields = {}      # label -> [(value_start, value_end), ...] in text order
+        self.headings = {}    # heading -> [(line_start, line_end, value_start, value_end), ...]
+        self.block_ends = []  # start offset of every line that begins with A-Z
+        self._index()
+
+    def _index(self):
+        text = self.text
+        # Values still waiting for the next non-blank line: (list, position, record-prefix)
+        pending = []
+        start, length = 0, len(text)
+        while start <= length:
+            end = text.find("\n", start)
+            if end == -1:
+                end = length
+            line = text[start:end]
+            stripped = line.strip()
+
+            if stripped:
+                if "A" <= line[:1] <= "Z":
+                    self.block_ends.append(start)
+                if pending:
+                    value_start = start + len(line) - len(line.lstrip())
+                    for records, position, prefix in pending:
+                        records[position] = prefix + (value_start, end)
+                    pending = []
+
+                colon = line.find(":")
+                while colon != -1:
+                    self._add_field(line, start, end, colon, pending)
+                    colon = line.find(":", colon + 1)
+
+                if len(stripped) <= MAX_HEADING_CHARS:
+                    heading = stripped[:-1].rstrip() if stripped.endswith(":") else stripped
+                    records = self.headings.setdefault(heading, [])
+                    records.append((start, end, end, end))
+                    pending.append((records, len(records) - 1, (start, end)))
+                start = end + 1
+            else:
+                # Skip a run of blank lines in one step, to the start of the next non-blank line
+                after = WHITESPACE.match(text, end).end()
+                start = text.rfind("\n", end, after) + 1 if after < length else length + 1
+
+    def _add_field(self, line, line_start, line_end, colon, pending):
+        words = line[max(0, colon - MAX_LABEL_CHARS):colon].split()[-MAX_LABEL_WORDS:]
+        if not words:
+            return
+        rest = line[colon + 1:]
+        value_start = line_start + colon + 1 + len(rest) - len(rest.lstrip())
+        for i in range(len(words)):
+            records = self.fields.setdefault(" ".join(words[i:]), [])
+            records.append((value_start, line_end))
+            if value_start == line_end:  # "Key:" alone: the value is on the next non-blank line
+                pending.append((records, len(records) - 1, ()))
+
+    # ---------- Lookups ----------
+
+    def field(self, label: str, pattern=None):
+        """
+        Value of the first "label:" in the text (None if there is none). With
+        `pattern`, the first value it matches at its start; the result is then
+        the pattern's group 1, or the whole match if it has no groups.
+        """
+        return self._first(self.fields.get(label, ()), pattern)
+
+    def after_heading(self, heading: str, pattern=None):
+        """Like field(), for the non-blank line that follows a line reading `heading`."""
+        records = self.headings.get(heading, ())
+        return self._first(((r[2], r[3]) for r in records), pattern)
+
+    def after_line_ending(self, marker: str, pattern):
+        """
+        `pattern`'s match (as in field()) at the start of the first non-blank line
+        after a line that ends with `marker`, such as "Total Revenue" for
+        "Revenue"; lines are tried in text order. Same result as searching
+        `marker\\s*\\n\\s*(pattern)`, without its backtracking over blank lines.
+        """
+        if not hasattr(pattern, "match"):
+            pattern = re.compile(pattern)
+        text = self.text
+        found = text.find(marker)
+        while found != -1:
+            after = found + len(marker)
+            value_start = WHITESPACE.match(text, after).end()
+            if text.find("\n", after, value_start) != -1:
+                match = pattern.match(text, value_start)
+                if match:
+                    return match.group(1) if pattern.groups else match.group(0)
+            found = text.find(marker, found + 1)
+        return None
+
+    def between(self, start_marker: str, end_marker: str):
+        """
+        Text after the first `start_marker` (and the whitespace following it) up
+        to the next `end_marker`, or None. Markers can be anywhere in a line:
+        "Clinical Summary: chest pain" starts a section too. Same result as
+        searching `start_marker\\s*(.*?)end_marker` with DOTALL, in linear time.
+        """
+        text = self.text
+        found = text.find(start_marker)
+        if found == -1:
+            return None
+        body_start = WHITESPACE.match(text, found + len(start_marker)).end()
+        end = text.find(end_marker, body_start)
+        if end == -1:
+            return None
+        return text[body_start:end]
+
+    def block(self, label: str):
+        """
+        The value of the first "label:" field and the lines after it, up to the
+        next line that begins with a capital letter; None if no such line follows.
+        """
+        records = self.fields.get(label)
+        if not records:
+            return None
+        value_start, value_end = records[0]
+        i = bisect.bisect_right(self.block_ends, value_start)
+        if i == len(self.block_ends):
+            return None
+        return self.text[value_start:max(self.block_ends[i] - 1, value_end)]
+
+    def _first(self, spans, pattern):
+        if pattern is not None and not hasattr(pattern, "match"):
+            pattern = re.compile(pattern)
+        for value_start, value_end in spans:
+            value = self.text[value_start:value_end]
+            if not value:
+                continue
+            if pattern is None:
+                return value
+            match = pattern.match(value)
+            if match:
+                return match.group(1) if pattern.groups else match.group(0)
+        return None
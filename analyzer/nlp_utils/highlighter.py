@@ -1,302 +1,8 @@
 # nlp_utils/highlighter.py
 import re
 from collections import defaultdict, Counter
-import spacy
-from spacy.matcher import PhraseMatcher
-
-# Load spaCy model globally
-nlp = spacy.load("en_core_web_sm")
-
-CATEGORY_LABELS = {
-    "medical": {
-        "Conditions": [
-            "diabetes", "type 1 diabetes", "type i diabetes", "type 2 diabetes", "type ii diabetes",
-            "gestational diabetes", "prediabetes",
-            "hypertension", "high blood pressure",
-            "cancer", "carcinoma", "sarcoma", "leukemia", "lymphoma", "melanoma",
-            "stroke", "cerebrovascular accident", "cva", "tia", "transient ischemic attack",
-            "asthma", "copd", "chronic obstructive pulmonary disease", "emphysema", "chronic bronchitis",
-            "pneumonia", "tuberculosis", "tb", "influenza", "flu",
-            "arthritis", "osteoarthritis", "rheumatoid arthritis", "gout", "psoriatic arthritis",
-            "heart attack", "myocardial infarction", "mi", "coronary artery disease", "cad", "angina",
-            "heart failure", "congestive heart failure", "chf",
-            "kidney failure", "renal failure", "ckd", "chronic kidney disease", "aki", "acute kidney injury",
-            "liver disease", "cirrhosis", "hepatitis", "fatty liver", "nafld", "nash",
-            "hiv", "aids", "viral load suppression",
-            "covid-19", "covid", "sars-cov-2", "long covid", "post-acute sequelae",
-            "thyroid disorder", "hypothyroidism", "hyperthyroidism", "graves disease", "hashimoto thyroiditis",
-            "dyslipidemia", "hyperlipidemia", "high cholesterol", "hypertriglyceridemia",
-            "anemia", "iron deficiency", "b12 deficiency", "folate deficiency",
-            "depression", "major depressive disorder", "mdd", "anxiety", "panic disorder", "bipolar disorder",
-            "schizophrenia", "adhd", "autism spectrum disorder",
-            "migraine", "tension headache", "cluster headache",
-            "peptic ulcer", "gerd", "gastroesophageal reflux disease", "gastritis", "ibs", "inflammatory bowel disease", "crohn disease", "ulcerative colitis",
-            "osteoporosis", "osteopenia",
-            "dermatitis", "eczema", "psoriasis", "urticaria", "hives",
-            "sepsis", "bacteremia", "cellulitis",
-            "pregnancy", "preeclampsia", "gestational hypertension",
-            "obesity", "overweight", "malnutrition",
-            "sleep apnea", "osa",
-            "arrhythmia", "atrial fibrillation", "afib", "ventricular tachycardia",
-            "pulmonary embolism", "pe", "deep vein thrombosis", "dvt",
-            "cystic fibrosis", "sickle cell disease", "thalassemia",
-            "parkinson disease", "alzheimer disease", "dementia", "epilepsy", "seizure disorder"
-        ],
-        "Medications": [
-            # Analgesics/antipyretics/NSAIDs
-            "paracetamol", "acetaminophen", "ibuprofen", "naproxen", "diclofenac", "aspirin",
-            "tramadol", "morphine", "oxycodone", "codeine",
-            # Antidiabetics
-            "insulin", "metformin", "glipizide", "glyburide", "gliclazide", "glimepiride",
-            "sitagliptin", "linagliptin", "empagliflozin", "dapagliflozin", "canagliflozin",
-            "liraglutide", "semaglutide", "dulaglutide",
-            # Antihypertensives
-            "lisinopril", "enalapril", "ramipril", "perindopril",
-            "losartan", "valsartan", "telmisartan", "olmesartan",
-            "amlodipine", "nifedipine", "diltiazem", "verapamil",
-            "atenolol", "metoprolol", "propranolol", "bisoprolol",
-            "hydrochlorothiazide", "hctz", "chlorthalidone", "furosemide", "spironolactone",
-            # Lipids
-            "atorvastatin", "simvastatin", "rosuvastatin", "pravastatin", "ezetimibe",
-            # GI
-            "omeprazole", "pantoprazole", "esomeprazole", "rabeprazole", "lansoprazole",
-            "ranitidine", "famotidine", "ondansetron", "domperidone", "metoclopramide",
-            # Respiratory
-            "albuterol", "salbutamol", "levalbuterol", "ipratropium", "tiotropium",
-            "budesonide", "fluticasone", "formoterol", "salmeterol", "montelukast",
-            # Anti-infectives
-            "amoxicillin", "amoxicillin-clavulanate", "augmentin", "ampicillin",
-            "azithromycin", "clarithromycin", "erythromycin",
-            "ciprofloxacin", "levofloxacin", "moxifloxacin",
-            "doxycycline", "tetracycline",
-            "ceftriaxone", "cefixime", "cephalexin",
-            "piperacillin-tazobactam", "vancomycin", "linezolid", "meropenem",
-            "oseltamivir", "acyclovir", "valacyclovir", "remdesivir",
-            # Anticoagulants/antiplatelets
-            "warfarin", "heparin", "enoxaparin", "apixaban", "rivaroxaban", "dabigatran",
-            "clopidogrel", "prasugrel", "ticagrelor",
-            # Steroids/immunomodulators
-            "prednisone", "prednisolone", "methylprednisolone", "dexamethasone",
-            "methotrexate", "azathioprine", "hydroxychloroquine",
-            # Others
-            "levothyroxine", "calcitriol", "vitamin d", "cyanocobalamin", "folic acid",
-            "sertraline", "fluoxetine", "escitalopram", "venlafaxine", "amitriptyline"
-        ],
-        "Procedures": [
-            "surgery", "minor surgery", "major surgery",
-            "angioplasty", "stent placement", "catheterization", "cabg", "bypass surgery",
-            "mri", "magnetic resonance imaging",
-            "ct scan", "computed tomography", "pet scan", "pet-ct",
-            "x-ray", "x ray", "ultrasound", "sonography", "echo", "echocardiogram", "ecg", "ekg",
-            "biopsy", "fine needle aspiration", "fna", "core biopsy",
-            "chemotherapy", "radiation therapy", "radiotherapy", "immunotherapy",
-            "dialysis", "hemodialysis", "peritoneal dialysis",
-            "endoscopy", "colonoscopy", "sigmoidoscopy", "egd", "gastroscopy", "bronchoscopy",
-            "laparoscopy", "arthroscopy", "hysteroscopy",
-            "transplant", "kidney transplant", "liver transplant", "bone marrow transplant",
-            "lumbar puncture", "spinal tap", "thoracentesis", "paracentesis",
-            "cesarean section", "c-section", "hysterectomy", "appendectomy", "cholecystectomy",
-            "vaccination", "immunization", "wound debridement", "suturing", "intubation", "ventilation"
-        ],
-        "Lab Terms": [
-            "hemoglobin", "hgb", "hba1c", "a1c", "hematocrit", "hct",
-            "cholesterol", "ldl", "hdl", "triglycerides",
-            "blood sugar", "fasting glucose", "random glucose", "ogtt",
-            "platelet count", "platelets", "wbc", "white blood cell", "rbc", "red blood cell",
-            "creatinine", "bun", "urea", "egfr", "gfr",
-            "alt", "sgpt", "ast", "sgot", "alp", "ggt", "bilirubin", "albumin",
-            "crp", "esr", "d-dimer", "ferritin", "procalcitonin", "lactate",
-            "inr", "pt", "prothrombin time", "aptt", "tsh", "t3", "t4",
-            "troponin", "bnp", "nt-probnp",
-            "urinalysis", "urine culture", "blood culture",
-            "chest x-ray", "ct chest", "mri brain"
-        ],
-        "Document Types": [
-            "prescription", "rx", "medication order",
-            "discharge summary", "discharge note",
-            "lab report", "pathology report", "imaging report", "radiology report",
-            "medical certificate", "fitness certificate",
-            "operative report", "procedure note",
-            "admission note", "progress note", "nursing note", "consultation note",
-            "referral letter", "consent form",
-            "vaccination record", "immunization card",
-            "case sheet", "clinical summary",
-            "death summary", "autopsy report",
-            "billing statement", "insurance claim", "prior authorization"
-        ],
-        "Symptoms": [
-            "fever", "pyrexia", "chills", "rigors",
-            "cough", "sputum", "shortness of breath", "dyspnea", "wheezing",
-            "chest pain", "palpitation",
-            "headache", "dizziness", "syncope",
-            "nausea", "vomiting", "diarrhea", "constipation", "abdominal pain",
-            "fatigue", "weakness", "malaise", "myalgia", "arthralgia",
-            "rash", "itching", "pruritus", "swelling", "edema",
-            "dysuria", "frequency", "urgency", "hematuria",
-            "weight loss", "loss of appetite", "anorexia"
-        ],
-        "Vitals": [
-            "blood pressure", "bp", "heart rate", "pulse",
-            "respiratory rate", "rr", "temperature", "oxygen saturation", "spo2",
-            "height", "weight", "bmi", "body mass index"
-        ],
-        "Devices": [
-            "pacemaker", "defibrillator", "ventilator", "nebulizer", "cpap", "bipap",
-            "insulin pump", "glucometer", "oxygen concentrator", "catheter", "stent"
-        ]
-    },
-
-    "legal": {
-        "Document Types": [
-            "contract", "agreement", "master services agreement", "msa",
-            "statement of work", "sow", "purchase agreement", "sale agreement",
-            "affidavit", "deposition transcript",
-            "lease", "rental agreement", "tenancy agreement",
-            "nda", "non-disclosure agreement", "confidentiality agreement",
-            "mou", "memorandum of understanding", "term sheet", "letter of intent", "loi",
-            "power of attorney", "poa",
-            "will", "last will and testament", "codicil", "trust deed",
-            "deed", "sale deed", "gift deed", "mortgage deed", "assignment deed",
-            "settlement", "settlement agreement", "release", "waiver",
-            "memorandum", "minutes of meeting", "board resolution", "bylaws",
-            "articles of association", "articles of incorporation", "certificate of incorporation",
-            "employment agreement", "offer letter", "separation agreement",
-            "privacy policy", "terms of service", "cookie policy",
-            "license", "licence", "sub-licence", "franchise agreement",
-            "service level agreement", "sla", "data processing agreement", "dpa",
-            "notice", "legal notice", "cease and desist",
-            "complaint", "petition", "plaint", "summons", "subpoena", "writ",
-            "motion", "brief", "reply", "rejoinder",
-            "order", "interim order", "injunction", "judgment", "decree", "consent order",
-            "legal opinion", "due diligence report", "opinion letter",
-            "addendum", "amendment", "appendix", "annexure", "schedule", "rider"
-        ],
-        "Parties": [
-            "plaintiff", "defendant", "claimant", "respondent", "petitioner", "appellant", "appellee",
-            "lessor", "lessee", "landlord", "tenant",
-            "licensor", "licensee", "assignor", "assignee",
-            "buyer", "purchaser", "seller", "vendor", "supplier", "customer", "client",
-            "guarantor", "surety", "indemnitor", "indemnitee",
-            "witness", "counsel", "attorney", "advocate", "barrister", "solicitor",
-            "agent", "principal", "shareholder", "director", "officer", "trustee", "beneficiary"
-        ],
-        "Clauses": [
-            "termination", "termination for convenience", "termination for cause",
-            "confidentiality", "non-disclosure",
-            "liability", "limitation of liability", "cap on liability",
-            "arbitration", "mediation", "dispute resolution",
-            "indemnity", "indemnification", "defense and hold harmless",
-            "force majeure",
-            "jurisdiction", "venue", "governing law", "choice of law",
-            "assignment", "subcontracting", "change of control",
-            "notice", "notices",
-            "payment terms", "fees", "invoicing", "taxes",
-            "warranty", "representations and warranties",
-            "intellectual property", "ip ownership", "license grant",
-            "privacy", "data protection", "data security", "conflict of interest",
-            "non-compete", "non-solicitation", "non-poaching",
-            "audit rights", "records retention",
-            "severability", "waiver", "entire agreement", "amendment", "counterparts",
-            "injunctive relief", "specific performance",
-            "compliance with laws", "anti-bribery", "anti-corruption", "sanctions"
-        ],
-        "Deadlines": [
-            "effective date", "commencement date", "start date",
-            "closing date", "completion date", "delivery date",
-            "expiry date", "expiration date", "end date", "renewal date", "auto-renewal",
-            "termination date",
-            "notice period", "cure period", "grace period", "response deadline",
-            "statute of limitations", "hearing date", "filing deadline"
-        ],
-        "Court & Procedure": [
-            "case number", "docket", "cause of action", "prayer", "relief sought",
-            "precedent", "ratio decidendi", "obiter dicta",
-            "burden of proof", "standard of proof",
-            "evidence", "exhibit", "discovery", "interrogatories", "subpoena duces tecum",
-            "decree", "order", "judgment", "consent decree", "appeal", "remand"
-        ],
-        "Remedies & Damages": [
-            "damages", "compensatory damages", "consequential damages", "liquidated damages",
-            "punitive damages", "statutory damages",
-            "injunction", "specific performance", "rescission", "restitution"
-        ],
-        "IP & Tech": [
-            "patent", "trademark", "copyright", "trade secret",
-            "infringement", "license", "royalty", "assignment", "field of use",
-            "open source", "oss", "copyleft", "gpl", "mit license"
-        ]
-    },
-
-    "financial": {
-        "Transaction Terms": [
-            "investment", "loan", "credit", "debit", "payment", "payout", "remittance",
-            "invoice", "bill", "purchase order", "po", "sales order", "so",
-            "receipt", "voucher", "credit note", "debit note",
-            "wire transfer", "swift", "neft", "rtgs", "ach", "sepa", "upi",
-            "direct debit", "standing order", "escrow", "lien", "collateral",
-            "equity", "debt", "bond", "note", "commercial paper", "t-bill",
-            "dividend", "coupon", "interest", "principal", "amortization",
-            "hedge", "forward", "future", "option", "swap", "derivative",
-            "ipo", "follow-on offering", "buyback", "rights issue", "bonus issue",
-            "reconciliation", "chargeback", "write-off", "provision", "impairment"
-        ],
-        "Metrics": [
-            "revenue", "sales", "turnover", "expenditure", "operating expense", "opex",
-            "capital expenditure", "capex", "profit", "loss",
-            "gross margin", "operating margin", "net margin",
-            "ebit", "ebitda", "ebita", "net income", "net profit",
-            "roi", "roa", "roe", "roc", "roce",
-            "eps", "pe ratio", "price to earnings", "book value", "market cap",
-            "free cash flow", "fcf", "cash flow", "operating cash flow",
-            "working capital", "current ratio", "quick ratio",
-            "inventory turnover", "days sales outstanding", "dso",
-            "days payables outstanding", "dpo", "days inventory outstanding", "dio",
-            "arr", "mrr", "ltv", "cac", "burn rate", "runway"
-        ],
-        "Compliance": [
-            "audit", "internal audit", "external audit", "statutory audit",
-            "tax", "withholding tax", "sales tax", "vat", "gst",
-            "regulation", "compliance", "kyc", "aml", "cft", "sanctions screening",
-            "ifrs", "gaap", "ias", "asc 606", "asc 842",
-            "sarbanes-oxley", "sox", "basel iii", "mifid ii",
-            "pci dss", "gdpr", "fatca", "ccpa"
-        ],
-        "Statements & Ledgers": [
-            "balance sheet", "statement of financial position",
-            "income statement", "profit and loss", "p&l",
-            "cash flow statement", "statement of cash flows",
-            "statement of changes in equity",
-            "trial balance", "general ledger", "gl", "subledger", "journal entry", "chart of accounts"
-        ],
-        "Instruments": [
-            "equity", "preference shares", "preferred stock", "common stock",
-            "bond", "debenture", "convertible note", "safe", "warrant",
-            "etf", "mutual fund", "reit", "certificate of deposit", "cd",
-            "fx", "foreign exchange", "currency swap"
-        ],
-        "Currencies & Units": [
-            "usd", "eur", "gbp", "inr", "jpy", "cny", "cad", "aud", "chf", "sgd",
-            "$", "€", "£", "₹", "¥",
-            "percent", "%", "basis points", "bps"
-        ],
-        "Accounting Terms": [
-            "accrual", "deferral", "depreciation", "amortization",
-            "goodwill", "impairment", "intangible asset", "ppe", "inventory",
-            "revenue recognition", "matching principle", "materiality", "conservatism",
-            "contingent liability", "provision", "lease liability", "right-of-use asset",
-            "prepaid expense", "accounts receivable", "accounts payable", "deferred revenue"
-        ],
-        "Tax Documents": [
-            "tax invoice", "credit memo", "debit memo",
-            "form w-9", "form 1099", "form w-8ben", "form 1040",
-            "pan", "tan", "gstin", "hsn code", "sac code"
-        ],
-        "Payment Details": [
-            "iban", "swift bic", "routing number", "ifsc", "upi id", "bank account number",
-            "check", "cheque", "draft", "neft utr", "rtgs utr", "ach trace"
-        ]
-    }
-}
+from . import lexicons, regex_guard
+from .spacy_model import memory_zone
 
 
 # ---------- Helpers ----------
@@ -328,30 +34,6 @@ def clean_highlights(highlights: dict) -> dict:
     # Drop empties
     return {k: v for k, v in cleaned.items() if v}
 
-# ---------- Build PhraseMatchers per category (global) ----------
-
-_MATCHERS = {}
-
-def _build_matcher(category: str):
-    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-    labels = CATEGORY_LABELS.get(category, {})
-    for subcat, keywords in labels.items():
-        # Make robust to hyphen vs space (e.g., x-ray / x ray)
-        patterns = []
-        for kw in keywords:
-            patterns.append(nlp.make_doc(kw))
-            if "-" in kw:
-                patterns.append(nlp.make_doc(kw.replace("-", " ")))
-            if " " in kw:
-                patterns.append(nlp.make_doc(kw.replace(" ", "-")))
-        matcher.add(subcat, patterns)
-    return matcher
-
-def _get_matcher(category: str):
-    if category not in _MATCHERS and category in CATEGORY_LABELS:
-        _MATCHERS[category] = _build_matcher(category)
-    return _MATCHERS.get(category)
-
 # ---------- Main extraction ----------
 
 # Pre-compiled regexes
@@ -372,44 +54,96 @@ EFFECTIVE_RE = re.compile(rf"(Effective|Commencement)\s+Date[:\s]+{DATE_VALUE_RE
 EXPIRY_RE = re.compile(rf"(Expiry|Expiration|Termination)\s+Date[:\s]+{DATE_VALUE_RE}", re.I)
 
 MONEY_RE = re.compile(
+    # The lookahead only admits characters a match can start with, so most
+    # positions fail after one class check instead of trying every prefix.
+    r"(?=[\s$₹€£\dUIEGAC])"
     r"(?:(?:USD|INR|EUR|GBP|AUD|CAD)\s*)?[$₹€£]?\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?\s?(?:million|billion|mn|bn|cr|crore|lakh|k|m|b)?",
     re.I,
 )
 PERCENT_RE = re.compile(r"\b\d+(?:\.\d+)?\s?%\b")
+REVENUE_RE = re.compile(rf"\brevenue\b[:\s\-]*({MONEY_RE.pattern})", re.I)
+EXPENDITURE_RE = re.compile(rf"\b(?:expenditure|expenses)\b[:\s\-]*({MONEY_RE.pattern})", re.I)
 
-def extract_highlights(text: str, category: str = "general") -> dict:
-    doc = nlp(text)
-    highlights = defaultdict(list)
+# Lines starting with a legal clause name, per version of the legal lexicon
+_CLAUSE_LINE_RES = {}
+
+
+def _clause_line_re(lexicon):
+    key = lexicon.hashes["legal"]
+    if key not in _CLAUSE_LINE_RES:
+        clauses = lexicon.labels["legal"].get("Clauses", [])
+        # [ \t]*, not \s*: from every line start, \s* ran over all following blank lines and retried
+        # each clause name there, quadratic in the number of blank lines
+        _CLAUSE_LINE_RES[key] = re.compile(rf"^[ \t]*(?:{'|'.join(map(re.escape, clauses))})\b.*$", re.I | re.M)
+    return _CLAUSE_LINE_RES[key]
 
-    # ---- Named Entities (broaden coverage) ----
+ENTITY_KEYS = {
+    "ORG": "Company",
+    "PERSON": "Person",
+    "GPE": "Location",
+    "LOC": "Location",
+    "LAW": "Law_Reference",
+    "NORP": "Groups",
+    "MONEY": "Money",
+    "DATE": "Dates",
+    "PERCENT": "Percentages",
+}
+
+
+def _find(pattern, text, key, spans, group=0):
+    """
+    Like pattern.findall for one group, also recording [start, end, key] of
+    each match in `spans`. Scans within the document's regex budget (see
+    regex_guard), under the name `key`.
+    """
+    values = []
+    for m in regex_guard.finditer(pattern, text, key):
+        values.append(m.group(group))
+        if spans is not None:
+            spans.append([m.start(group), m.end(group), key])
+    return values
+
+
+def collect_entity_hits(doc):
+    """Highlights from named entities; needs a fully parsed Doc. Returns (highlights, hits)."""
+    highlights, hits = defaultdict(list), []
     for ent in doc.ents:
-        if ent.label_ in {"ORG"}:
-            highlights["Company"].append(ent.text)
-        elif ent.label_ in {"PERSON"}:
-            highlights["Person"].append(ent.text)
-        elif ent.label_ in {"GPE", "LOC"}:
-            highlights["Location"].append(ent.text)
-        elif ent.label_ in {"LAW"}:
-            highlights["Law_Reference"].append(ent.text)
-        elif ent.label_ in {"NORP"}:
-            highlights["Groups"].append(ent.text)
-        elif ent.label_ in {"MONEY"}:
-            highlights["Money"].append(ent.text)
-        elif ent.label_ in {"DATE"}:
-            highlights["Dates"].append(ent.text)
-        elif ent.label_ in {"PERCENT"}:
-            highlights["Percentages"].append(ent.text)
-
-    # ---- Duration ----
-    highlights["Duration"].extend(DURATION_RE.findall(text))
-
-    # ---- Category-specific PhraseMatcher ----
-    matcher = _get_matcher(category)
-    if matcher:
+        key = ENTITY_KEYS.get(ent.label_)
+        if key:
+            highlights[key].append(ent.text)
+            hits.append([ent.start_char, ent.end_char, key])
+    return highlights, hits
+
+
+def collect_duration_hits(text: str):
+    """Durations ("3 weeks"), highlighted in every category. Returns (highlights, hits)."""
+    highlights, hits = defaultdict(list), []
+    highlights["Duration"].extend(_find(DURATION_RE, text, "Duration", hits))
+    return highlights, hits
+
+
+def collect_rule_hits(text: str, category: str, doc, matches=None):
+    """
+    Highlights from the category lexicon and regexes. Only needs tokens, so
+    `doc` may come from nlp.make_doc(text). `matches` are (subcategory, start,
+    end) token matches if the lexicon already ran over `doc`; otherwise it is
+    run for this category. Returns (highlights, hits).
+    """
+    highlights, hits = defaultdict(list), []
+    lexicon = lexicons.current()
+
+    # ---- Category lexicon ----
+    if matches is None:
+        matches = lexicon.matches(doc, category).get(category, [])
+    if matches:
         seen_spans = defaultdict(set)
-        for match_id, start, end in matcher(doc):
-            subcat = nlp.vocab.strings[match_id]
-            span_text = doc[start:end].text
+        doc_text = doc.text
+        for subcat, start, end in matches:
+            # Offsets from the first and last token: cheaper than a Span per match
+            last = doc[end - 1]
+            start_char, end_char = doc[start].idx, last.idx + len(last)
+            span_text = doc_text[start_char:end_char]
+            hits.append([start_char, end_char, subcat])
             if span_text.lower() not in seen_spans[subcat]:
                 highlights[subcat].append(span_text)
                 seen_spans[subcat].add(span_text.lower())
@@ -417,9 +151,9 @@ def extract_highlights(text: str, category: str = "general") -> dict:
     # ---- Category extras ----
     if category == "medical":
         # Dosage
-        highlights["Dosage"].extend(DOSAGE_RE.findall(text))
+        highlights["Dosage"].extend(_find(DOSAGE_RE, text, "Dosage", hits))
         # Vitals
-        vitals = VITALS_RE.findall(text)
+        vitals = _find(VITALS_RE, text, "Vitals", hits)
         if vitals:
             # regex returns tuples because of groups; flatten to strings
             flat_vitals = []
@@ -434,55 +168,183 @@ def extract_highlights(text: str, category: str = "general") -> dict:
             highlights["Vitals"].extend(_unique_preserve_order(flat_vitals))
 
     if category == "legal":
-        eff = EFFECTIVE_RE.findall(text)
-        exp = EXPIRY_RE.findall(text)
+        # Group 2 is the date value
+        eff = _find(EFFECTIVE_RE, text, "Effective_Date", hits, group=2)
+        exp = _find(EXPIRY_RE, text, "Expiry_Date", hits, group=2)
         if eff:
-            # eff is list of tuples like [('Effective', 'Jan 2, 2024')]
-            highlights["Effective_Date"].extend(_unique_preserve_order([e[-1] for e in eff]))
+            highlights["Effective_Date"].extend(_unique_preserve_order(eff))
         if exp:
-            highlights["Expiry_Date"].extend(_unique_preserve_order([e[-1] for e in exp]))
+            highlights["Expiry_Date"].extend(_unique_preserve_order(exp))
         # Clause headings heuristic (captures lines with clause names)
-        clause_keywords = CATEGORY_LABELS["legal"].get("Clauses", [])
-        clause_re = re.compile(rf"^\s*(?:{'|'.join(map(re.escape, clause_keywords))})\b.*$", re.I | re.M)
-        clauses_found = clause_re.findall(text)
+        clauses_found = _find(_clause_line_re(lexicon), text, "Clauses", hits)
         if clauses_found:
             highlights["Clauses"].extend(_unique_preserve_order(clauses_found))
 
     if category == "financial":
         # Revenue/Expenditure lines with amounts
-        revenue_lines = re.findall(rf"\b(revenue)\b[:\s\-]*{MONEY_RE.pattern}", text, re.I)
-        expenditure_lines = re.findall(rf"\b(expenditure|expenses)\b[:\s\-]*{MONEY_RE.pattern}", text, re.I)
-        # Raw money and percents
-        money_vals = MONEY_RE.findall(text)
-        percent_vals = PERCENT_RE.findall(text)
-
-        if revenue_lines:
-            # revenue_lines is list of tuples from the group; reconstruct line values separately
-            revenues = re.findall(rf"\brevenue\b[:\s\-]*({MONEY_RE.pattern})", text, re.I)
-            if revenues:
-                highlights["Revenue"].extend(_unique_preserve_order(revenues))
-        if expenditure_lines:
-            expenses = re.findall(rf"\b(?:expenditure|expenses)\b[:\s\-]*({MONEY_RE.pattern})", text, re.I)
-            if expenses:
-                highlights["Expenditure"].extend(_unique_preserve_order(expenses))
-        if money_vals:
-            # MONEY_RE with groups may return the unit part; capture full money via a second pass
-            money_full = re.findall(rf"({MONEY_RE.pattern})", text, re.I)
+        revenues = _find(REVENUE_RE, text, "Revenue", hits, group=1)
+        if revenues:
+            highlights["Revenue"].extend(_unique_preserve_order(revenues))
+        expenses = _find(EXPENDITURE_RE, text, "Expenditure", hits, group=1)
+        if expenses:
+            highlights["Expenditure"].extend(_unique_preserve_order(expenses))
+        # Raw money and percents (MONEY_RE/PERCENT_RE have no groups: the full match is the value)
+        money_full = _find(MONEY_RE, text, "Money", hits)
+        if money_full:
             highlights["Money"].extend(_unique_preserve_order(money_full))
-        if percent_vals:
-            percent_full = re.findall(r"(\b\d+(?:\.\d+)?\s?%\b)", text)
+        percent_full = _find(PERCENT_RE, text, "Percentages", hits)
+        if percent_full:
             highlights["Percentages"].extend(_unique_preserve_order(percent_full))
 
-    # ---- General fallback keywords (noun chunks + tokens) ----
+    return highlights, hits
+
+
+def keyword_counts(doc) -> Counter:
+    """Counts of content lemmas and noun chunks in a parsed Doc, from which Top_Keywords are picked."""
+    tokens = [t.lemma_.lower() for t in doc if t.is_alpha and not t.is_stop]
+    # Noun chunks need the dependency parse; pipelines without a parser contribute lemmas only
+    chunks = [nc.text.lower() for nc in doc.noun_chunks if nc.text.strip()] if doc.has_annotation("DEP") else []
+    return Counter(tokens + chunks)
+
+
+def collect_keyword_hits(doc, category: str, counts=None):
+    """
+    Top keywords (noun chunks + lemmas) for the general category; needs a
+    parsed Doc, or `counts` from keyword_counts (e.g. summed over pages).
+    """
+    highlights = defaultdict(list)
     if category == "general":
-        tokens = [t.lemma_.lower() for t in doc if t.is_alpha and not t.is_stop]
-        chunks = [nc.text.lower() for nc in doc.noun_chunks if nc.text.strip()]
-        counts = Counter(tokens + chunks)
+        counts = keyword_counts(doc) if counts is None else counts
         top_keywords = [w for w, _ in counts.most_common(10)]
         highlights["Top_Keywords"].extend(top_keywords)
+    return highlights, []
+
+
+def merge_highlights(text: str, parts, spans=None) -> dict:
+    """
+    Merge (highlights, hits) pairs from the collect_* functions, in order, into
+    the cleaned dict extract_highlights returns; hit offsets go into `spans`.
+    """
+    highlights, found = defaultdict(list), []
+    for part_highlights, part_hits in parts:
+        for key, values in part_highlights.items():
+            highlights[key].extend(values)
+        found.extend(part_hits)
 
     # De-duplicate and clean
     for k in list(highlights.keys()):
         highlights[k] = _unique_preserve_order(highlights[k])
 
-    return clean_highlights(dict(highlights))
+    cleaned = clean_highlights(dict(highlights))
+    if spans is not None:
+        # Keys are normalized like clean_highlights does; matches of dropped keys and blank matches are
+        # skipped, and surrounding whitespace (e.g. MONEY_RE's optional spaces) is trimmed off.
+        keys = {}
+        for start, end, key in found:
+            if key not in keys:
+                keys[key] = _normalize_key(key)
+            key = keys[key]
+            value = text[start:end]
+            if key not in cleaned or not value.strip():
+                continue
+            start += len(value) - len(value.lstrip())
+            end -= len(value) - len(value.rstrip())
+            spans.append([start, end, key])
+        spans.sort(key=lambda s: (s[0], -s[1], s[2]))
+    return cleaned
+
+
+def extract_highlights(text: str, category: str = "general", doc=None, spans=None) -> dict:
+    """
+    Category highlights for `text`; pass `doc` if it was already parsed with get_nlp().
+
+    If `spans` is a list, the character offsets of every match are appended to
+    it as [start, end, key] (sorted by start, keys as in the returned dict), so
+    callers can mark the text up later without scanning it again.
+    """
+    if doc is None:
+        with memory_zone() as nlp:
+            return extract_highlights(text, category, nlp(text), spans)
+    return merge_highlights(text, [
+        collect_entity_hits(doc),
+        collect_duration_hits(text),
+        collect_rule_hits(text, category, doc),
+        collect_keyword_hits(doc, category),
+    ], spans=spans)
+
+
+# ---------- All categories in one pass ----------
+
+# Every lexicon has the same categories after a reload; their labels come from lexicons.labels()
+CATEGORIES = ("general",) + lexicons.LEXICON_CATEGORIES
+
+# Below this many lexicon hits per 1000 tokens no category is detected ("general")
+MIN_CATEGORY_DENSITY = 15.0
+# Occurrences of one term counted towards a category's density (damps generic words like "check")
+MAX_TERM_HITS = 3
+
+
+def extract_all_highlights(text: str, doc=None) -> dict:
+    """
+    Highlights for every category from one parse and one combined lexicon
+    pass. Entities and durations are collected once and shared.
+
+    Returns {"highlights": {category: dict}, "spans": {category: list},
+    "scores": {category: lexicon hits per 1000 tokens}}; the per-category
+    values equal extract_highlights(text, category, spans=...).
+    """
+    if doc is None:
+        with memory_zone() as nlp:
+            return extract_all_highlights(text, nlp(text))
+    entities = collect_entity_hits(doc)
+    durations = collect_duration_hits(text)
+    lexicon = lexicon_matches(doc)
+
+    result = {"highlights": {}, "spans": {}, "scores": category_scores(doc, lexicon)}
+    for category in CATEGORIES:
+        spans = []
+        result["highlights"][category] = merge_highlights(text, [
+            entities,
+            durations,
+            collect_rule_hits(text, category, doc, matches=lexicon[category]),
+            collect_keyword_hits(doc, category),
+        ], spans=spans)
+        result["spans"][category] = spans
+    return result
+
+
+def lexicon_matches(doc) -> dict:
+    """{category: [(subcategory, start, end), ...]} from one pass of every category's lexicon."""
+    return defaultdict(list, lexicons.current().matches(doc))
+
+
+def lexicon_term_counts(doc, lexicon=None) -> dict:
+    """{category: Counter of the (lowercased) lexicon terms matched in doc}."""
+    if lexicon is None:
+        lexicon = lexicon_matches(doc)
+    return {
+        category: Counter(doc[start:end].text.lower() for _, start, end in lexicon.get(category, ()))
+        for category in lexicons.LEXICON_CATEGORIES
+    }
+
+
+def category_scores(doc, lexicon=None) -> dict:
+    """Lexicon hit density (hits per 1000 tokens, at most MAX_TERM_HITS per term) of each category."""
+    return scores_from_term_counts(lexicon_term_counts(doc, lexicon), len(doc))
+
+
+def scores_from_term_counts(term_counts: dict, token_count: int) -> dict:
+    """category_scores from lexicon_term_counts, which can be summed over pages, and their total tokens."""
+    scores = {}
+    for category in lexicons.LEXICON_CATEGORIES:
+        hits = sum(min(count, MAX_TERM_HITS) for count in term_counts.get(category, {}).values())
+        scores[category] = round(1000 * hits / max(token_count, 1), 2)
+    return scores
+
+
+def detect_category(scores: dict) -> str:
+    """Category with the densest lexicon hits, or "general" if none reaches MIN_CATEGORY_DENSITY."""
+    best = max(scores, key=scores.get, default=None)
+    if best is None or scores[best] < MIN_CATEGORY_DENSITY:
+        return "general"
+    return best
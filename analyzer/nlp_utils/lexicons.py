@@ -0,0 +1,363 @@
+# nlp_utils/lexicons.py
+"""
+Category lexicons: versioned data files, compiled into match automata.
+
+Sources are JSON files in LEXICON_DIR (analyzer/lexicons/, or
+DOCMAGE_LEXICON_DIR), one per category:
+
+    {"category": "medical", "version": 3, "labels": {"Conditions": ["diabetes", ...], ...}}
+
+`manage.py compile_lexicons` tokenizes every keyword, with its hyphen/space
+variants, once. For each category it writes an artifact to ARTIFACT_DIR: the
+lowercase-token hash sequences of its patterns, as msgpack, named after the
+source's content hash. manifest.json names the current artifact of each
+category and is replaced atomically.
+
+Workers build a token trie from the artifacts instead of tokenizing the
+keywords. This creates no Docs and no vocab strings, so it takes
+milliseconds and is safe inside a memory zone. Matches equal those of a
+spaCy PhraseMatcher on LOWER. current() checks the manifest at most every
+RELOAD_SECONDS. Categories whose hash changed are loaded and swapped in
+together with the cached patterns of the others, in one assignment. Without a
+manifest, the sources are compiled in-process as before.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Categories with a lexicon, in display order (the summarizer and forms know them by name)
+LEXICON_CATEGORIES = ("medical", "legal", "financial")
+
+LEXICON_DIR = Path(os.environ.get("DOCMAGE_LEXICON_DIR") or Path(__file__).resolve().parent.parent / "lexicons")
+ARTIFACT_DIR = Path(
+    os.environ.get("DOCMAGE_LEXICON_ARTIFACTS") or Path(__file__).resolve().parents[2] / "var" / "lexicons"
+)
+MANIFEST = "manifest.json"
+# How often workers look for a newly compiled manifest; 0 turns hot reloading off
+RELOAD_SECONDS = float(os.environ.get("DOCMAGE_LEXICON_RELOAD_SECONDS", 5))
+# Bump when the artifact layout changes: artifacts of another format are recompiled
+ARTIFACT_FORMAT = 2
+
+
+# ---------- Sources ----------
+
+def load_sources(directory=None) -> dict:
+    """{category: {"version": int, "labels": {subcategory: [keyword, ...]}}} from the JSON sources."""
+    directory = Path(directory or LEXICON_DIR)
+    sources = {}
+    for category in LEXICON_CATEGORIES:
+        with open(directory / f"{category}.json", encoding="utf-8") as f:
+            data = json.load(f)
+        sources[category] = {"version": data.get("version", 0), "labels": data["labels"]}
+    return sources
+
+
+def content_hash(labels: dict) -> str:
+    """SHA-256 of a category's labels, independent of key order and formatting."""
+    canonical = json.dumps(labels, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def tokenizer_id(nlp) -> str:
+    """What compiled patterns depend on besides the keywords: the pipeline's tokenizer."""
+    import spacy
+    return f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}/spacy-{spacy.__version__}"
+
+
+def compile_category(labels: dict, nlp) -> dict:
+    """
+    {"labels": [subcategory, ...], "patterns": [[label index, [token hash, ...]], ...]}
+    for one category. Keywords are matched on lowercase tokens, also with
+    hyphens as spaces and spaces as hyphens ("x-ray" / "x ray").
+    """
+    patterns = []
+    for index, keywords in enumerate(labels.values()):
+        for keyword in keywords:
+            variants = [keyword]
+            if "-" in keyword:
+                variants.append(keyword.replace("-", " "))
+            if " " in keyword:
+                variants.append(keyword.replace(" ", "-"))
+            for variant in variants:
+                # token.lower, not hash_string(token.lower_): words that are spaCy symbols
+                # ("number") have a small symbol id as their LOWER value, not a string hash
+                tokens = [token.lower for token in nlp.make_doc(variant)]
+                if tokens:
+                    patterns.append([index, tokens])
+    return {"labels": list(labels), "patterns": patterns}
+
+
+# ---------- Matching ----------
+
+_END = -1  # trie key of the labels a pattern ends with (token hashes are unsigned)
+
+
+class LexiconMatcher:
+    """Token trie over every category's patterns; matches like PhraseMatcher(attr="LOWER")."""
+
+    def __init__(self, compiled: dict):
+        self.labels = []  # (category, subcategory) per label id
+        self.trie = {}
+        for category, data in compiled.items():
+            offset = len(self.labels)
+            self.labels.extend((category, label) for label in data["labels"])
+            for index, tokens in data["patterns"]:
+                node = self.trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                ends = node.setdefault(_END, [])
+                if offset + index not in ends:
+                    ends.append(offset + index)
+
+    def __call__(self, doc) -> list:
+        """[(category, subcategory, start, end), ...] token matches, by start then length."""
+        from spacy.attrs import LOWER
+
+        keys = doc.to_array(LOWER).tolist() if len(doc) else []
+        labels, trie, matches = self.labels, self.trie, []
+        for start, key in enumerate(keys):
+            node, end = trie.get(key), start + 1
+            while node is not None:
+                for label in node.get(_END, ()):
+                    matches.append((*labels[label], start, end))
+                if end == len(keys):
+                    break
+                node, end = node.get(keys[end]), end + 1
+        return matches
+
+
+@dataclass(frozen=True)
+class Lexicon:
+    """One consistent generation of every category's lexicon."""
+    versions: dict   # category -> source version
+    hashes: dict     # category -> content hash
+    labels: dict     # category -> {subcategory: [keyword, ...]}
+    compiled: dict   # category -> compile_category() output
+    matcher: LexiconMatcher
+
+    @classmethod
+    def build(cls, categories: dict):
+        """From {category: {"version", "hash", "labels", "compiled"}}."""
+        return cls(
+            versions={c: v["version"] for c, v in categories.items()},
+            hashes={c: v["hash"] for c, v in categories.items()},
+            labels={c: v["labels"] for c, v in categories.items()},
+            compiled={c: v["compiled"] for c, v in categories.items()},
+            matcher=LexiconMatcher({c: v["compiled"] for c, v in categories.items()}),
+        )
+
+    def matches(self, doc, category=None) -> dict:
+        """{category: [(subcategory, start, end), ...]} for every category, or only `category`."""
+        result = {c: [] for c in LEXICON_CATEGORIES}
+        for cat, label, start, end in self.matcher(doc):
+            if category is None or cat == category:
+                result[cat].append((label, start, end))
+        return result
+
+
+# ---------- Artifacts ----------
+
+def write_artifacts(sources: dict, nlp, directory=None, force: bool = False) -> dict:
+    """
+    Compile the categories whose sources changed since the current manifest
+    (all of them with `force`), write their artifacts and then the new manifest.
+    Returns {category: (status, seconds)}, status being "compiled" or "unchanged".
+    """
+    import srsly
+
+    directory = Path(directory or ARTIFACT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    old = _read_manifest(directory) or {}
+    tokenizer = tokenizer_id(nlp)
+    reusable = old.get("categories", {}) if old.get("tokenizer") == tokenizer and old.get("format") == ARTIFACT_FORMAT else {}
+
+    entries, report = {}, {}
+    for category, source in sources.items():
+        started = time.perf_counter()
+        digest = content_hash(source["labels"])
+        entry = reusable.get(category)
+        if not force and entry and entry["hash"] == digest and (directory / entry["file"]).exists():
+            entries[category] = dict(entry, version=source["version"])
+            report[category] = ("unchanged", time.perf_counter() - started)
+            continue
+        artifact = {
+            "category": category, "version": source["version"], "hash": digest, "tokenizer": tokenizer,
+            "source": source["labels"], **compile_category(source["labels"], nlp),
+        }
+        name = f"{category}-{digest[:16]}.msgpack"
+        _write_atomic(directory / name, srsly.msgpack_dumps(artifact))
+        entries[category] = {"version": source["version"], "hash": digest, "file": name}
+        report[category] = ("compiled", time.perf_counter() - started)
+
+    manifest = {"format": ARTIFACT_FORMAT, "tokenizer": tokenizer, "categories": entries}
+    _write_atomic(directory / MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+    # Keep the previous generation for workers that are still loading it
+    keep = {MANIFEST} | {e["file"] for e in entries.values()} | {e["file"] for e in old.get("categories", {}).values()}
+    for path in directory.glob("*.msgpack"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+    return report
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _read_manifest(directory=None):
+    try:
+        with open(Path(directory or ARTIFACT_DIR) / MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _load_artifact(path: Path) -> dict:
+    import srsly
+    return srsly.msgpack_loads(path.read_bytes())
+
+
+# ---------- The live lexicon ----------
+
+_current = None
+_manifest_stamp = None  # (mtime_ns, size) of the manifest the current lexicon came from
+_next_check = 0.0
+_reload_lock = threading.Lock()
+_published = (None, 0.0, None)  # (manifest stamp, monotonic time checked, digest)
+_published_labels = (None, 0.0, None)  # the same, for labels()
+
+
+def current() -> Lexicon:
+    """The lexicon to match with, reloaded when a newer manifest has been published."""
+    global _next_check
+    lexicon = _current
+    if lexicon is not None and (RELOAD_SECONDS <= 0 or time.monotonic() < _next_check):
+        return lexicon
+    # One thread (re)loads; the others keep matching with the lexicon they have
+    if not _reload_lock.acquire(blocking=lexicon is None):
+        return lexicon
+    try:
+        _next_check = time.monotonic() + RELOAD_SECONDS
+        if _current is None or _stamp() != _manifest_stamp:
+            _reload()
+        return _current
+    finally:
+        _reload_lock.release()
+
+
+def digest() -> str:
+    """
+    Short hash of the published lexicons (the manifest's, else the sources'),
+    for keys of stored analysis results. Needs no spaCy, so web workers that
+    leave the parsing to the NLP server can compute it too.
+    """
+    global _published
+    stamp, checked, value = _published
+    if value is not None and (RELOAD_SECONDS <= 0 or time.monotonic() < checked + RELOAD_SECONDS):
+        return value
+    current_stamp = _stamp()
+    if value is None or current_stamp != stamp:
+        manifest = _read_manifest() if current_stamp else None
+        if manifest:
+            hashes = {c: e["hash"] for c, e in manifest["categories"].items()}
+        else:
+            hashes = {c: content_hash(source["labels"]) for c, source in load_sources().items()}
+        combined = ",".join(f"{c}:{hashes[c]}" for c in sorted(hashes))
+        value = hashlib.sha256(combined.encode("utf-8")).hexdigest()[:12]
+    _published = (current_stamp, time.monotonic(), value)
+    return value
+
+
+def labels() -> dict:
+    """
+    {category: {subcategory: [keyword, ...]}} of the published lexicons (the
+    manifest's artifacts, else the sources), for display. Follows a newly
+    compiled manifest like current() does, but needs no spaCy.
+    """
+    global _published_labels
+    stamp, checked, value = _published_labels
+    if value is not None and (RELOAD_SECONDS <= 0 or time.monotonic() < checked + RELOAD_SECONDS):
+        return value
+    current_stamp = _stamp()
+    if value is None or current_stamp != stamp:
+        value = {c: source["labels"] for c, source in load_sources().items()}
+        manifest = _read_manifest() if current_stamp else None
+        for category, entry in ((manifest or {}).get("categories") or {}).items():
+            if category in value:
+                try:
+                    value[category] = _load_artifact(ARTIFACT_DIR / entry["file"])["source"]
+                except (OSError, ValueError, KeyError):
+                    pass  # keep the source's labels, as _reload() does
+    _published_labels = (current_stamp, time.monotonic(), value)
+    return value
+
+
+def _stamp():
+    try:
+        stat = os.stat(ARTIFACT_DIR / MANIFEST)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _reload():
+    global _current, _manifest_stamp
+    from .spacy_model import get_nlp
+
+    started = time.perf_counter()
+    stamp, manifest = _stamp(), _read_manifest()
+    nlp = get_nlp()
+    previous = _current
+    categories = {}
+    if manifest and manifest.get("format") == ARTIFACT_FORMAT and manifest.get("tokenizer") == tokenizer_id(nlp):
+        for category in LEXICON_CATEGORIES:
+            entry = manifest["categories"].get(category)
+            if entry is None:
+                continue
+            if previous and previous.hashes.get(category) == entry["hash"]:
+                # Unchanged: keep the patterns already in memory
+                categories[category] = {
+                    "version": entry["version"], "hash": entry["hash"],
+                    "labels": previous.labels[category], "compiled": previous.compiled[category],
+                }
+                continue
+            try:
+                artifact = _load_artifact(ARTIFACT_DIR / entry["file"])
+            except (OSError, ValueError):
+                logger.warning("Lexicon artifact %s unreadable; keeping the current lexicon", entry["file"], exc_info=True)
+                if previous is not None:
+                    return
+                categories = {}
+                break
+            categories[category] = {
+                "version": artifact["version"], "hash": artifact["hash"], "labels": artifact["source"],
+                "compiled": {"labels": artifact["labels"], "patterns": artifact["patterns"]},
+            }
+    elif manifest:
+        logger.warning("Lexicon artifacts in %s were compiled for another tokenizer or format; ignoring them", ARTIFACT_DIR)
+
+    missing = [c for c in LEXICON_CATEGORIES if c not in categories]
+    if missing:
+        sources = load_sources()
+        for category in missing:
+            labels = sources[category]["labels"]
+            categories[category] = {
+                "version": sources[category]["version"], "hash": content_hash(labels),
+                "labels": labels, "compiled": compile_category(labels, nlp),
+            }
+    _current = Lexicon.build({c: categories[c] for c in LEXICON_CATEGORIES})
+    _manifest_stamp = stamp
+    if previous is not None and previous.hashes != _current.hashes:
+        changed = sorted(c for c in LEXICON_CATEGORIES if previous.hashes.get(c) != _current.hashes[c])
+        logger.info(
+            "Lexicons reloaded in %.1f ms: %s", (time.perf_counter() - started) * 1000,
+            ", ".join(f"{c} v{_current.versions[c]}" for c in changed),
+        )
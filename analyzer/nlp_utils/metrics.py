@@ -0,0 +1,261 @@
+# nlp_utils/metrics.py
+"""
+Typed metrics of a document, normalized so they can be stored as numbers and
+range-queried ("revenue > 100 Cr in FY2024-25", "bp systolic > 140").
+
+- Financial: revenue, net_income, arr (amounts) and gross_margin (%), read
+  through FieldIndex like the financial overview, for the document's fiscal
+  period. Amounts are absolute: "45.2 Cr" is 452,000,000 INR, "$3.1 bn" is
+  3,100,000,000 USD. Cr, crore and lakh imply INR; an amount without a currency
+  symbol or code has unit "" (unknown currency).
+- Vitals, from the highlighter's VITALS_RE matches: bp_systolic and
+  bp_diastolic (mmHg), heart_rate (bpm), temperature (°C; °F is converted) and
+  spo2 (%).
+- Dosages, from DOSAGE_RE matches: mg (mcg, µg and g are converted), ml or units.
+
+Fiscal periods are normalized to "FY2024-25" plus an optional quarter "Q3".
+Single-year labels follow the Indian convention of naming the year by its end:
+"FY2025" and "FY25" are FY2024-25.
+"""
+import re
+
+from . import regex_guard
+from .field_index import FieldIndex
+from .highlighter import DOSAGE_RE, VITALS_RE
+
+MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3,
+    "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5,
+    "m": 1e6, "mn": 1e6, "million": 1e6, "millions": 1e6,
+    "cr": 1e7, "crore": 1e7, "crores": 1e7,
+    "b": 1e9, "bn": 1e9, "billion": 1e9, "billions": 1e9,
+}
+INDIAN_MULTIPLIERS = {"lakh", "lakhs", "lac", "lacs", "cr", "crore", "crores"}
+CURRENCY_SYMBOLS = {"$": "USD", "₹": "INR", "€": "EUR", "£": "GBP"}
+CURRENCY_CODES = {"usd": "USD", "inr": "INR", "rs": "INR", "rs.": "INR", "eur": "EUR", "gbp": "GBP"}
+
+MONEY_VALUE = re.compile(
+    r"(?P<code>USD|INR|EUR|GBP|Rs\.?)?\s*(?P<symbol>[$₹€£])?\s?"
+    r"(?P<number>\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s?"
+    r"(?P<scale>crores?|cr|lakhs?|lacs?|millions?|mn|m|billions?|bn|b|thousand|k)?\b",
+    re.I,
+)
+# FieldIndex lookups return group 1: the whole amount
+AMOUNT_FIELD = re.compile(rf"({MONEY_VALUE.pattern})", re.I)
+PERCENT_VALUE = re.compile(r"(\d+(?:\.\d+)?)\s?%")
+GROSS_MARGIN_RE = re.compile(r"\bgross margin\b[^\d\n]{0,20}(\d+(?:\.\d+)?)\s?%", re.I)
+
+FISCAL_YEAR_RE = re.compile(
+    r"\b(?:(?P<q1>Q[1-4])\s*)?FY\s?'?(?P<start>\d{4}|\d{2})(?:\s?[-–/]\s?(?P<end>\d{4}|\d{2}))?(?:\s*(?P<q2>Q[1-4]))?\b",
+    re.I,
+)
+YEAR_RANGE_RE = re.compile(r"\b(?:(?P<q1>Q[1-4])\s*)?(?P<start>\d{4})\s?[-–/]\s?(?P<end>\d{4}|\d{2})\b", re.I)
+
+VITAL_PARTS = re.compile(
+    r"BP[:\s]?(?P<systolic>\d{2,3})/(?P<diastolic>\d{2,3})|"
+    r"HR[:\s]?(?P<heart_rate>\d{2,3})|"
+    r"Temp(?:erature)?[:\s]?(?P<temperature>\d{2,3}(?:\.\d+)?)\s?°?(?P<scale>[CF])|"
+    r"SpO2[:\s]?(?P<spo2>\d{2,3})",
+    re.I,
+)
+DOSE_PARTS = re.compile(r"(?P<number>\d+(?:\.\d+)?)\s?(?P<unit>mg|mcg|µg|ml|g|units)", re.I)
+DOSE_UNITS = {"mg": ("mg", 1.0), "mcg": ("mg", 1e-3), "µg": ("mg", 1e-3), "g": ("mg", 1e3), "ml": ("ml", 1.0), "units": ("units", 1.0)}
+
+# Financial fields: metric -> (FieldIndex labels, also read after a heading line)
+FINANCIAL_FIELDS = {
+    "revenue": ("Revenue", "Total Revenue"),
+    "net_income": ("Net Income", "Net Profit"),
+    "arr": ("ARR", "Annual Recurring Revenue"),
+}
+PERIOD_LABELS = ("Fiscal Period", "Financial Year", "Fiscal Year", "Period")
+# Query names of each metric (lower case, any run of spaces/underscores as one space)
+METRIC_ALIASES = {
+    "revenue": "revenue",
+    "net income": "net_income", "net profit": "net_income",
+    "arr": "arr",
+    "gross margin": "gross_margin", "margin": "gross_margin",
+    "bp systolic": "bp_systolic", "systolic": "bp_systolic", "systolic bp": "bp_systolic",
+    "bp diastolic": "bp_diastolic", "diastolic": "bp_diastolic", "diastolic bp": "bp_diastolic",
+    "heart rate": "heart_rate", "hr": "heart_rate", "pulse": "heart_rate",
+    "temperature": "temperature", "temp": "temperature",
+    "spo2": "spo2",
+    "dosage": "dosage", "dose": "dosage",
+}
+AMOUNT_METRICS = {"revenue", "net_income", "arr"}
+METRIC_UNITS = {
+    "gross_margin": "%", "bp_systolic": "mmHg", "bp_diastolic": "mmHg",
+    "heart_rate": "bpm", "temperature": "°C", "spo2": "%",
+}
+CONDITION_RE = re.compile(
+    r"^\s*(?P<metric>[a-z][a-z0-9 _]*?)\s*(?P<op>>=|<=|>|<|=)\s*(?P<value>.+?)"
+    r"(?:\s+(?:in|for)\s+(?P<period>.+?))?\s*$",
+    re.I,
+)
+LOOKUPS = {">": "gt", ">=": "gte", "<": "lt", "<=": "lte", "=": "exact"}
+
+
+def parse_amount(value: str):
+    """(amount, currency) of the first amount at the start of `value`, e.g. (452000000.0, "INR"); None if none."""
+    match = MONEY_VALUE.match(value.strip())
+    if not match:
+        return None
+    amount = float(match.group("number").replace(",", ""))
+    scale = (match.group("scale") or "").lower()
+    amount *= MULTIPLIERS.get(scale, 1.0)
+    if match.group("symbol"):
+        currency = CURRENCY_SYMBOLS[match.group("symbol")]
+    elif match.group("code"):
+        currency = CURRENCY_CODES[match.group("code").lower()]
+    elif scale in INDIAN_MULTIPLIERS:
+        currency = "INR"
+    else:
+        currency = ""
+    return amount, currency
+
+
+def parse_period(value: str):
+    """("FY2024-25", "Q3") from a period label such as "Q3 FY2025", "FY 2024-25" or "2024-25"; None if none."""
+    match = FISCAL_YEAR_RE.search(value or "") or YEAR_RANGE_RE.search(value or "")
+    if not match:
+        return None
+    start, end = match.group("start"), match.group("end")
+    if end is None:
+        # A single year names the year the fiscal year ends in
+        end_year = _full_year(start)
+        start_year = end_year - 1
+    else:
+        start_year = _full_year(start)
+        end_year = _full_year(end, century=start_year // 100 * 100)
+    quarter = match.group("q1") or (match.groupdict().get("q2"))
+    return f"FY{start_year}-{end_year % 100:02d}", (quarter or "").upper()
+
+
+def _full_year(year: str, century: int = 2000) -> int:
+    return int(year) if len(year) == 4 else century + int(year)
+
+
+def extract_metrics(text: str) -> list:
+    """
+    [{"metric", "value", "unit", "period", "quarter", "text"}, ...] found in
+    `text`, in the order above. Vitals and dosages have no period.
+    """
+    text = text or ""
+    index = FieldIndex(text)
+    period, quarter = "", ""
+    for label in PERIOD_LABELS:
+        parsed = parse_period(index.field(label) or "")
+        if parsed:
+            period, quarter = parsed
+            break
+
+    metrics = []
+
+    def add(metric, value, unit, matched, financial=False):
+        metrics.append({
+            "metric": metric,
+            "value": value,
+            "unit": unit,
+            "period": period if financial else "",
+            "quarter": quarter if financial else "",
+            "text": matched.strip()[:100],
+        })
+
+    for metric, labels in FINANCIAL_FIELDS.items():
+        for label in labels:
+            value = index.field(label, AMOUNT_FIELD) or index.after_heading(label, AMOUNT_FIELD)
+            parsed = parse_amount(value) if value else None
+            if parsed:
+                add(metric, parsed[0], parsed[1], value, financial=True)
+                break
+
+    margin = index.field("Gross Margin", PERCENT_VALUE) or index.after_heading("Gross Margin", PERCENT_VALUE)
+    if margin is None:
+        match = regex_guard.search(GROSS_MARGIN_RE, text, "metrics:gross_margin")
+        margin = match.group(1) if match else None
+    if margin is not None:
+        add("gross_margin", float(margin), "%", f"{margin}%", financial=True)
+
+    for match in regex_guard.finditer(VITALS_RE, text, "metrics:vitals"):
+        parts = VITAL_PARTS.match(match.group(0))
+        if not parts:
+            continue
+        matched = match.group(0)
+        if parts.group("systolic"):
+            add("bp_systolic", float(parts.group("systolic")), "mmHg", matched)
+            add("bp_diastolic", float(parts.group("diastolic")), "mmHg", matched)
+        elif parts.group("heart_rate"):
+            add("heart_rate", float(parts.group("heart_rate")), "bpm", matched)
+        elif parts.group("temperature"):
+            add("temperature", _celsius(float(parts.group("temperature")), parts.group("scale")), "°C", matched)
+        elif parts.group("spo2"):
+            add("spo2", float(parts.group("spo2")), "%", matched)
+
+    for match in regex_guard.finditer(DOSAGE_RE, text, "metrics:dosage"):
+        parts = DOSE_PARTS.match(match.group(0))
+        if parts:
+            unit, factor = DOSE_UNITS[parts.group("unit").lower()]
+            add("dosage", float(parts.group("number")) * factor, unit, match.group(0))
+    return metrics
+
+
+def _celsius(value: float, scale: str) -> float:
+    return round((value - 32) * 5 / 9, 2) if scale.upper() == "F" else value
+
+
+def parse_condition(condition: str) -> dict:
+    """
+    {"metric", "lookup", "value", "unit", "period", "quarter"} of a condition
+    such as "revenue > 100 Cr in FY2024-25" or "bp systolic >= 140". The value
+    is normalized like extract_metrics() does; "unit" is None when the condition
+    does not fix one (an amount without currency). Raises ValueError.
+    """
+    match = CONDITION_RE.match(condition or "")
+    if not match:
+        raise ValueError(f"Expected '<metric> <op> <value> [in <period>]', got {condition!r}")
+    name = " ".join(match.group("metric").replace("_", " ").lower().split())
+    metric = METRIC_ALIASES.get(name)
+    if metric is None:
+        raise ValueError(f"Unknown metric {match.group('metric')!r}")
+    raw = match.group("value")
+
+    if metric in AMOUNT_METRICS:
+        parsed = parse_amount(raw)
+        if parsed is None:
+            raise ValueError(f"Expected an amount such as '100 Cr' or '$5 million', got {raw!r}")
+        value, unit = parsed[0], parsed[1] or None
+    elif metric == "dosage":
+        parts = DOSE_PARTS.fullmatch(raw.strip())
+        if parts:
+            unit, factor = DOSE_UNITS[parts.group("unit").lower()]
+            value = float(parts.group("number")) * factor
+        else:
+            value, unit = _number(raw), "mg"
+    elif metric == "temperature":
+        temperature = re.fullmatch(r"(\d+(?:\.\d+)?)\s?°?([CF])?", raw.strip(), re.I)
+        if not temperature:
+            raise ValueError(f"Expected a temperature such as '38.5' or '101 F', got {raw!r}")
+        value, unit = _celsius(float(temperature.group(1)), temperature.group(2) or "C"), "°C"
+    else:
+        value, unit = _number(raw), METRIC_UNITS[metric]
+
+    period, quarter = "", ""
+    if match.group("period"):
+        parsed = parse_period(match.group("period"))
+        if parsed is None:
+            raise ValueError(f"Expected a fiscal period such as 'FY2024-25' or 'Q3 FY2025', got {match.group('period')!r}")
+        period, quarter = parsed
+    return {
+        "metric": metric,
+        "lookup": LOOKUPS[match.group("op")],
+        "value": value,
+        "unit": unit,
+        "period": period,
+        "quarter": quarter,
+    }
+
+
+def _number(raw: str) -> float:
+    number = re.match(r"\d+(?:\.\d+)?", raw.strip())
+    if not number:
+        raise ValueError(f"Expected a number, got {raw!r}")
+    return float(number.group(0))
@@ -0,0 +1,75 @@
+# nlp_utils/minhash.py
+import hashlib
+import re
+import zlib
+from functools import lru_cache
+
+# 128 permutations split into 16 bands of 8 rows. Two documents share at least
+# one band bucket with probability 1 - (1 - J^8)^16: ~0.99 at Jaccard 0.85,
+# ~0.6 at 0.7 and ~0.06 at 0.5, so candidates are almost always true near-duplicates.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5  # words per shingle
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_WORD_RE = re.compile(r"\w+")
+# Shingles hashed per numpy block; bounds memory to NUM_PERM * _BLOCK * 8 bytes.
+_BLOCK = 4096
+
+
+@lru_cache(maxsize=None)
+def _permutations():
+    # numpy is imported on first use so importing this module (via the views) stays cheap.
+    import numpy as np
+    # Fixed seed: signatures must be comparable across processes and deploys.
+    rng = np.random.RandomState(20250812)
+    a = rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+    b = rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+    return a, b
+
+
+def _shingle_hashes(text: str):
+    import numpy as np
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def signature(text: str) -> list:
+    """MinHash signature (NUM_PERM 32-bit ints) of the word 5-gram set of `text`; [] for empty text."""
+    import numpy as np
+
+    hashes = _shingle_hashes(text or "")
+    if not len(hashes):
+        return []  # nothing to compare; never reported as a near-duplicate
+    a, b = _permutations()
+    prime, max_hash = np.uint64(_MERSENNE_PRIME), np.uint64(_MAX_HASH)
+    sig = np.full(NUM_PERM, max_hash, dtype=np.uint64)
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK]
+        # a < 2^31 and x < 2^32, so a*x + b stays below 2^64 (no uint64 overflow)
+        permuted = (np.outer(a, block) + b[:, None]) % prime & max_hash
+        np.minimum(sig, permuted.min(axis=1), out=sig)
+    return [int(v) for v in sig]
+
+
+def band_buckets(sig) -> list:
+    """One signed 63-bit bucket key per band (fits a BigIntegerField)."""
+    buckets = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "big") >> 1)
+    return buckets
+
+
+def estimate_jaccard(sig_a, sig_b) -> float:
+    if not sig_a or not sig_b or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
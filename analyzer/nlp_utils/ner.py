@@ -1,8 +1,5 @@
-import spacy
 import re
-
-# Load spaCy's small English model
-nlp = spacy.load("en_core_web_sm")
+from .spacy_model import memory_zone
 
 # Regex patterns for domain-specific entities
 MONEY_RE = re.compile(r"(₹|\$|€|£)?\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?\s?(million|billion|cr|lakh|k|m|bn)?", re.I)
@@ -17,8 +14,8 @@ CONDITION_RE = re.compile(r"\b(?:diabetes|hypertension|cancer|stroke|asthma|arth
 MEDICATION_RE = re.compile(r"\b(?:aspirin|insulin|metformin|statins|antibiotics|beta-blockers|paracetamol|ibuprofen|amoxicillin|atorvastatin|omeprazole|antidepressants|antihypertensives)\b", re.I)
 
 def extract_entities(text: str, category: str = "general"):
-    doc = nlp(text)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
+    with memory_zone() as nlp:
+        entities = [(ent.text, ent.label_) for ent in nlp(text).ents]
 
     # Add regex-based entities
     if category == "financial":
@@ -11,6 +11,9 @@ from reportlab.lib.units import mm
 
 
 ACCENT = colors.HexColor("#007bff")  # Match your site's primary blue
+# Characters of values shown per highlight row: a table cell cannot break across pages,
+# so a longer one makes the build fail (and its layout grows with the document)
+MAX_HIGHLIGHT_CHARS = 1500
 
 
 def _build_styles():
@@ -208,6 +211,11 @@ def generate_summary_pdf(
             # Normalize values to string
             if isinstance(value, (list, tuple)):
                 value = ", ".join([str(v) for v in value])
+            value = str(value)
+            if len(value) > MAX_HIGHLIGHT_CHARS:
+                cut = value.rfind(", ", 0, MAX_HIGHLIGHT_CHARS)
+                shown = value[:cut if cut > 0 else MAX_HIGHLIGHT_CHARS]
+                value = f"{shown} … ({value.count(', ') - shown.count(', ')} more)"
             key_disp = str(key).replace("_", " ")
             rows.append([
                 Paragraph(key_disp, styles["TableCell"]),
@@ -252,3 +260,57 @@ def generate_summary_pdf(
 
     doc.build(elements, onFirstPage=_decorate, onLaterPages=_decorate)
     return output_path
+
+
+def render_summary_job(job):
+    """
+    Render one summary PDF from a plain dict so it can run in a process pool.
+
+    `job` keys: title, category, raw_text, overview, key_points, highlights,
+    output_path, reuse. If `overview` is None the summary is computed from
+    `raw_text`. With `reuse`, an existing file at `output_path` is returned as is.
+
+    Returns: (output_path, rendered: bool)
+    """
+    import os
+    import tempfile
+
+    output_path = job["output_path"]
+    if job.get("reuse") and os.path.exists(output_path):
+        return output_path, False
+
+    overview = job.get("overview")
+    key_points = job.get("key_points")
+    if overview is None:
+        from .summarizer import summarize_structured_with_insights
+        structured_summary = summarize_structured_with_insights(job.get("raw_text") or "", job.get("category"))
+        overview = structured_summary.get("overview", "No overview available.")
+        key_points = structured_summary.get("key_points", [])
+
+    highlights = job.get("highlights") or {}
+    formatted_highlights = {k.replace("_", " "): v for k, v in highlights.items()}
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Render to a temp name and rename so concurrent exports never serve half a file;
+    # mkstemp: unique per render, also between threads of one process
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f"{os.path.basename(output_path)}.", suffix=".tmp", dir=os.path.dirname(output_path)
+    )
+    os.close(fd)
+    try:
+        generate_summary_pdf(
+            title=job["title"],
+            summary=overview,  # narrative overview
+            output_path=tmp_path,
+            category=job.get("category"),
+            highlights=formatted_highlights,
+            tool_name="DocMage - Smart Document Analyzer",
+            paragraphs=[overview],
+            bullets=key_points or [],
+        )
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.chmod(tmp_path, 0o644)  # mkstemp creates it owner-only
+    os.replace(tmp_path, output_path)
+    return output_path, True
@@ -0,0 +1,585 @@
+# nlp_utils/pipeline.py
+import bisect
+import difflib
+import hashlib
+import os
+import time
+from collections import Counter, defaultdict
+
+from .extract_text import extract_pdf_pages, extract_text_pages
+from .summarizer import (
+    generate_narrative_overview_spacy, generate_insights, split_sentences,
+    rank_key_points_by_category, entity_scores, rank_scored_sentences, keyword_score,
+)
+from .highlighter import (
+    CATEGORIES, extract_all_highlights, category_scores, detect_category, clean_highlights, merge_highlights,
+    collect_entity_hits, collect_duration_hits, collect_rule_hits, collect_keyword_hits,
+    keyword_counts, lexicon_matches, lexicon_term_counts, scores_from_term_counts,
+)
+from . import doc_store, lexicons, regex_guard, summary_backends, trace
+from .minhash import signature
+from .spacy_model import MODEL_NAME, memory_zone
+from .tfidf import hashed_term_counts
+
+# Bump when a change alters analysis output: cached results of other versions are ignored.
+ANALYZER_VERSION = f"6-{MODEL_NAME}"
+
+
+def analyzer_version() -> str:
+    """
+    ANALYZER_VERSION plus the published lexicons, which change without a
+    deploy (see lexicons.py), and the summarizer backend if it is not the
+    default heuristic one (see summary_backends.py).
+    """
+    version = f"{ANALYZER_VERSION}+lex.{lexicons.digest()}"
+    backend = summary_backends.get_backend().name
+    return version if backend == "heuristic" else f"{version}+sum.{backend}"
+
+# Pass as `category` to pick the category with the densest lexicon hits
+AUTO_CATEGORY = "auto"
+
+NO_OVERVIEW = "No overview available."
+
+
+def analyze_raw_text(raw_text: str, category: str = "general", minhash=None, doc=None) -> dict:
+    """Run the summarizer and highlighter over already-extracted text, for every category.
+
+    Returns the values stored on a Document: raw_text, category (detected if
+    `category` is AUTO_CATEGORY), summary, key_points, highlights,
+    highlight_spans and insights for that category, category_analysis
+    holding those five for every category, category_scores, term_counts, minhash (pass
+    `minhash` if the signature is already known), incomplete_scans, the
+    regex extractors that ran out of the document's budget (see
+    regex_guard), summary_fallback (the summarizer backend gave no answer
+    and the narrative overview stands in; see summary_backends), and the run's trace (see nlp_utils.trace; not a Document
+    field). The text is parsed once, in a spaCy memory zone, and the Doc
+    shared by every stage and category; pass `doc` if it was already parsed
+    (e.g. by nlp.pipe in the caller's zone). The Doc is kept in the doc
+    store, and a stored one is used instead of parsing again.
+    """
+    with trace.collect() as run, memory_zone() as nlp, regex_guard.budget() as scans:
+        with trace.stage("parse"):
+            doc = doc_store.parse(nlp, [raw_text], [doc])[0]
+        with trace.stage("highlights"):
+            everything = extract_all_highlights(raw_text, doc=doc)
+        if category == AUTO_CATEGORY:
+            category = detect_category(everything["scores"])
+
+        with trace.stage("key_points"):
+            sentences = split_sentences(raw_text)
+            scores = entity_scores(raw_text, doc, sentences)
+            key_points = rank_key_points_by_category({cat: sentences for cat in CATEGORIES}, scores)
+        with trace.stage("overview"):
+            summaries = {
+                cat: generate_narrative_overview_spacy(raw_text, cat, doc=doc) if raw_text.strip() else NO_OVERVIEW
+                for cat in CATEGORIES
+            }
+            insights = {cat: generate_insights(raw_text, cat) if raw_text.strip() else [] for cat in CATEGORIES}
+        summaries[category], fell_back = summary_backends.overview_or_fallback(raw_text, category, summaries[category])
+        category_analysis = {
+            cat: {
+                "summary": summaries[cat],
+                "key_points": key_points[cat],
+                "highlights": everything["highlights"][cat],
+                "highlight_spans": everything["spans"][cat],
+                "insights": insights[cat],
+            }
+            for cat in CATEGORIES
+        }
+        with trace.stage("signatures"):
+            term_counts = hashed_term_counts(doc)
+            minhash = signature(raw_text) if minhash is None else minhash
+        trace.count("tokens", len(doc))
+        trace.count("sentences", len(sentences))
+        trace.count("entities", len(doc.ents))
+        return {
+            "raw_text": raw_text,
+            "category": category,
+            **category_analysis[category],
+            "category_analysis": category_analysis,
+            "category_scores": everything["scores"],
+            "term_counts": term_counts,
+            "minhash": minhash,
+            "incomplete_scans": list(scans.cut_short),
+            "summary_fallback": fell_back,
+            "trace": _trace(run),
+        }
+
+
+def iter_analysis_sections(text: str, category: str = "general", progress_interval: float = 0.5):
+    """
+    Yield (section, value) pairs for `text` as soon as each one is computed:
+
+    - ("highlights", dict): regex and lexicon matches, which only need the tokenizer;
+    - ("highlights", dict): again, complete with entities (replaces the first);
+    - ("overview", str), ("key_points", list), ("insights", list);
+    - ("incomplete_scans", list), only if regex extractors ran out of the
+      text's budget (see regex_guard);
+    - ("summary_fallback", True), only if the summarizer backend gave no
+      answer and the narrative overview stands in (see summary_backends).
+
+    While sentences are scored for key points, ("progress", {"done", "total"})
+    is yielded at most every `progress_interval` seconds. Each yield is a point
+    where a closed generator stops: a streaming response that notices the client
+    went away abandons the remaining work. The values equal those of
+    extract_highlights and summarize_structured_with_insights. No spaCy memory
+    zone is open while the generator is suspended: a slow client must not keep
+    the shared zone from closing (see spacy_model.memory_zone), so everything
+    that needs a Doc is done, and copied out as plain values, in two short
+    zones before the sections that use it are yielded.
+    """
+    scans = regex_guard.Budget()
+    with memory_zone() as nlp, regex_guard.budget(scans):
+        duration_hits = collect_duration_hits(text)
+        rule_hits = collect_rule_hits(text, category, nlp.make_doc(text))
+    yield "highlights", merge_highlights(text, [duration_hits, rule_hits])
+
+    sentences = split_sentences(text)
+    with memory_zone() as nlp:
+        doc = nlp(text)
+        entity_hits, keyword_hits = collect_entity_hits(doc), collect_keyword_hits(doc, category)
+        overview = generate_narrative_overview_spacy(text, category, doc=doc) if text.strip() else NO_OVERVIEW
+        entities = entity_scores(text, doc, sentences)
+    yield "highlights", merge_highlights(text, [entity_hits, duration_hits, rule_hits, keyword_hits])
+
+    if not text.strip():
+        yield "overview", NO_OVERVIEW
+        yield "key_points", []
+        yield "insights", []
+        return
+
+    overview, fell_back = summary_backends.overview_or_fallback(text, category, overview)
+    yield "overview", overview
+
+    scores, next_progress = [], time.monotonic() + progress_interval
+    for sentence in sentences:
+        scores.append(entities[sentence] + keyword_score(sentence, category or "default"))
+        if time.monotonic() >= next_progress:
+            yield "progress", {"done": len(scores), "total": len(sentences)}
+            next_progress = time.monotonic() + progress_interval
+    # Same ordering as rank_key_points: stable sort, best score first
+    ranked = sorted(range(len(sentences)), key=scores.__getitem__, reverse=True)
+    yield "key_points", [sentences[i] for i in ranked[:8]]
+
+    with regex_guard.budget(scans):
+        insights = generate_insights(text, category)
+    yield "insights", insights
+    if scans.cut_short:
+        yield "incomplete_scans", list(scans.cut_short)
+    if fell_back:
+        yield "summary_fallback", True
+
+
+def analyze_sections(text: str, category: str = "general") -> dict:
+    """
+    All of iter_analysis_sections at once: highlights, overview, key_points,
+    insights (and incomplete_scans, summary_fallback).
+    """
+    return {section: value for section, value in iter_analysis_sections(text, category) if section != "progress"}
+
+
+# ---------- Fast tier (tokenizer only) ----------
+
+FAST_TIER, FULL_TIER = "fast", "full"
+
+# What analyze_fast leaves out, by key, as shown to the user
+FAST_SKIPPED = {
+    "entities": "Named-entity highlights (people, organizations, dates, amounts)",
+    "keywords": "Top keywords (need lemmas and noun chunks)",
+    "overview_names": "Names in the overview (doctor, hospital, judge)",
+    "key_point_entities": "Entity weighting of key points",
+}
+
+
+def analyze_fast(text: str, category: str = "general") -> dict:
+    """
+    The fields of analyze_sections from the tokenizer alone: lexicon, regex
+    and duration highlights, the field-based overview, key points ranked by
+    category keywords, and insights. No tagger, parser, lemmatizer or NER
+    runs. "skipped" lists ({key: description}, see FAST_SKIPPED) what this
+    leaves out for `category` compared with analyze_sections.
+    """
+    skipped = ["entities", "key_point_entities"]
+    if category == "general":
+        skipped.insert(1, "keywords")
+    if category in ("medical", "legal"):
+        skipped.insert(-1, "overview_names")
+    with regex_guard.budget() as scans:
+        with memory_zone() as nlp:
+            doc = nlp.make_doc(text)
+            highlights = merge_highlights(text, [collect_duration_hits(text), collect_rule_hits(text, category, doc)])
+        if not text.strip():
+            overview, key_points, insights = NO_OVERVIEW, [], []
+        else:
+            overview = generate_narrative_overview_spacy(text, category, entities=[])
+            key_points = rank_scored_sentences([(sentence, 0) for sentence in split_sentences(text)], category)
+            insights = generate_insights(text, category)
+    result = {
+        "highlights": highlights,
+        "overview": overview,
+        "key_points": key_points,
+        "insights": insights,
+        "skipped": {key: FAST_SKIPPED[key] for key in skipped},
+    }
+    if scans.cut_short:
+        result["incomplete_scans"] = list(scans.cut_short)
+    return result
+
+
+def analyze_file(file_path: str, doc_type: str, category: str = "general") -> dict:
+    """
+    Extract text from a file on disk and analyze it (see analyze_raw_text); adds
+    page_offsets. PDFs are analyzed page by page (see analyze_pages). The
+    trace includes the extraction.
+    """
+    with trace.collect():
+        if doc_type == "pdf" and os.path.exists(file_path):
+            with trace.stage("extract"):
+                pages = extract_pdf_pages(file_path)
+            return analyze_pages(pages, category)
+        with trace.stage("extract"):
+            raw_text, page_offsets = extract_text_pages(file_path, doc_type)
+        analysis = analyze_raw_text(raw_text, category)
+    analysis["page_offsets"] = page_offsets
+    return analysis
+
+
+# ---------- Page by page (PDFs) ----------
+
+def analyze_page(text: str, doc) -> dict:
+    """
+    Analysis fragment of one page, parsed as `doc`: entity, duration and
+    per-category rule hits (offsets relative to the page), keyword, lexicon
+    term and hashed term counts, and the page's candidate key-point sentences
+    with their entity scores. Plain JSON, so it can be stored with the
+    document and merged again when the same page text reappears.
+    """
+    lexicon = lexicon_matches(doc)
+    sentences = split_sentences(text)
+    scores = entity_scores(text, doc, sentences)
+    rules = {}
+    for cat in CATEGORIES:
+        highlights, hits = collect_rule_hits(text, cat, doc, matches=lexicon[cat])
+        if hits:
+            rules[cat] = [dict(highlights), hits]
+    entities, entity_hits = collect_entity_hits(doc)
+    durations, duration_hits = collect_duration_hits(text)
+    return {
+        "text_hash": _text_hash(text),
+        "tokens": len(doc),
+        "entities": [dict(entities), entity_hits],
+        "names": [[ent.text, ent.label_] for ent in doc.ents if ent.label_ in ("PERSON", "ORG")],
+        "durations": [dict(durations), duration_hits],
+        "rules": rules,
+        "keywords": dict(keyword_counts(doc)),
+        "lexicon_terms": {cat: dict(terms) for cat, terms in lexicon_term_counts(doc, lexicon).items() if terms},
+        "term_counts": hashed_term_counts(doc),
+        "sentences": [[sentence, scores[sentence]] for sentence in sentences],
+    }
+
+
+def analyze_pages(pages, category: str = "general", previous=None, minhash=None) -> dict:
+    """Analyze a PDF page by page, reusing the fragments of pages analyzed before.
+
+    `pages` are (content_hash, text) pairs from extract_pdf_pages and
+    `previous` page fragments (see analyze_page), e.g. those of an earlier
+    version of the document from previous_pages(). Pages whose text matches
+    one of them are not analyzed again; the rest are loaded from the doc
+    store or parsed in one nlp.pipe() call. Highlights, spans, key points, category scores and term counts are
+    then merged from the fragments of all pages; overviews are regenerated
+    from the whole text, as their header fields can be on any page.
+
+    Returns the fields of analyze_raw_text plus page_offsets and page_analysis
+    ({"version": analyzer_version(), "pages": [fragment, ...], "reused":
+    number of pages whose fragment was reused}).
+    """
+    with trace.collect() as run:
+        analysis = _analyze_pages(pages, category, previous, minhash)
+    analysis["trace"] = _trace(run)
+    return analysis
+
+
+def _analyze_pages(pages, category, previous, minhash):
+    known = {fragment["text_hash"]: fragment for fragment in previous or ()}
+    texts = [text for _, text in pages]
+    raw_text = "".join(texts)
+    fragments = [known.get(_text_hash(text)) for text in texts]
+    todo = [i for i, fragment in enumerate(fragments) if fragment is None]
+    with regex_guard.budget() as scans, trace.stage("pages"):
+        if todo:
+            with memory_zone() as nlp:
+                for i, doc in zip(todo, doc_store.parse(nlp, [texts[i] for i in todo])):
+                    fragments[i] = analyze_page(texts[i], doc)
+    fragments = [dict(fragment, content_hash=content_hash) for (content_hash, _), fragment in zip(pages, fragments)]
+
+    entities, durations = (defaultdict(list), []), (defaultdict(list), [])
+    rules = {cat: (defaultdict(list), []) for cat in CATEGORIES}
+    keywords, lexicon_terms, term_counts = Counter(), defaultdict(Counter), Counter()
+    names, sentences, tokens, page_offsets, position = [], [], 0, [], 0
+    for text, fragment in zip(texts, fragments):
+        trace.count("entities", len(fragment["entities"][1]))
+        _extend_part(entities, fragment["entities"], position)
+        _extend_part(durations, fragment["durations"], position)
+        for cat, part in fragment["rules"].items():
+            _extend_part(rules[cat], part, position)
+        keywords.update(fragment["keywords"])
+        for cat, terms in fragment["lexicon_terms"].items():
+            lexicon_terms[cat].update(terms)
+        term_counts.update(fragment["term_counts"])
+        names.extend((name, label) for name, label in fragment["names"])
+        sentences.extend(fragment["sentences"])
+        tokens += fragment["tokens"]
+        page_offsets.append(position)
+        position += len(text)
+
+    trace.count("tokens", tokens)
+    trace.count("sentences", len(sentences))
+
+    scores = scores_from_term_counts(lexicon_terms, tokens)
+    if category == AUTO_CATEGORY:
+        category = detect_category(scores)
+    category_analysis = {}
+    for cat in CATEGORIES:
+        spans = []
+        with trace.stage("highlights"):
+            highlights = merge_highlights(raw_text, [
+                entities, durations, rules[cat], collect_keyword_hits(None, cat, counts=keywords),
+            ], spans=spans)
+        with trace.stage("overview"):
+            summary = generate_narrative_overview_spacy(raw_text, cat, entities=names) if raw_text.strip() else NO_OVERVIEW
+            insights = generate_insights(raw_text, cat) if raw_text.strip() else []
+        with trace.stage("key_points"):
+            key_points = rank_scored_sentences(sentences, cat)
+        category_analysis[cat] = {
+            "summary": summary,
+            "key_points": key_points,
+            "highlights": highlights,
+            "highlight_spans": spans,
+            "insights": insights,
+        }
+    category_analysis[category]["summary"], fell_back = summary_backends.overview_or_fallback(
+        raw_text, category, category_analysis[category]["summary"],
+    )
+    with trace.stage("signatures"):
+        minhash = signature(raw_text) if minhash is None else minhash
+    return {
+        "raw_text": raw_text,
+        "category": category,
+        **category_analysis[category],
+        "category_analysis": category_analysis,
+        "category_scores": scores,
+        "term_counts": dict(term_counts),
+        "minhash": minhash,
+        "page_offsets": page_offsets,
+        "page_analysis": {"version": analyzer_version(), "pages": fragments, "reused": len(pages) - len(todo)},
+        "incomplete_scans": list(scans.cut_short),
+        "summary_fallback": fell_back,
+    }
+
+
+def previous_pages(raw_text: str, page_offsets, page_analysis) -> tuple:
+    """
+    What a new version of a PDF can reuse from a document analyzed by
+    analyze_pages: ({content_hash: page text}, [page fragment, ...]) for
+    extract_pdf_pages(known=...) and analyze_pages(previous=...). Fragments of
+    another analyzer_version() are not reused; page texts are.
+    """
+    if not page_analysis or not page_offsets or raw_text is None:
+        return {}, []
+    fragments = page_analysis["pages"]
+    bounds = list(page_offsets) + [len(raw_text)]
+    texts = {fragment["content_hash"]: raw_text[bounds[i]:bounds[i + 1]] for i, fragment in enumerate(fragments)}
+    return texts, fragments if page_analysis.get("version") == analyzer_version() else []
+
+
+def _trace(run) -> dict:
+    return dict(run.as_dict(), analyzer_version=analyzer_version())
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _extend_part(part, fragment_part, offset):
+    """Append a fragment's (highlights, hits) to `part`, shifting the hits by the page's offset."""
+    highlights, hits = part
+    fragment_highlights, fragment_hits = fragment_part
+    for key, values in fragment_highlights.items():
+        highlights[key].extend(values)
+    hits.extend([start + offset, end + offset, key] for start, end, key in fragment_hits)
+
+
+# ---------- Near-duplicates ----------
+
+def analyze_changed_regions(raw_text: str, category: str, source: dict, minhash=None) -> dict:
+    """Analyze `raw_text` by reusing the analysis of a near-duplicate.
+
+    `source` holds the near-duplicate's raw_text, category, category_analysis
+    and term_counts. Only lines that were inserted or replaced relative to it
+    are parsed and run through the highlighter, for every category; the
+    source's results are merged with theirs:
+
+    - highlights: the source's values that still occur in the new text, plus
+      whatever the changed lines yield;
+    - highlight spans: the source's spans inside unchanged lines, shifted to
+      their new offsets, plus the spans found in the changed lines;
+    - key points: the best of the surviving source key points and the changed
+      sentences, scored from parses of just those sentences;
+    - term counts: the source's, minus those of the deleted or replaced lines
+      (which are parsed too), plus those of the changed lines;
+    - category scores: lexicon hits on the tokenized new text (no parse);
+    - overview: regenerated from the new text's header fields, with the
+      people and organizations of the source's entity spans that survived
+      plus those found in the changed lines.
+
+    A source without an analysis of every category or without term counts
+    (documents analyzed before those were stored) is not reused: the text is
+    analyzed in full. Returns the same fields as analyze_raw_text.
+    """
+    sources = source.get("category_analysis") or {}
+    if source.get("term_counts") is None or any(cat not in sources for cat in CATEGORIES):
+        return analyze_raw_text(raw_text, category, minhash=minhash)
+    with trace.collect() as run, regex_guard.budget() as scans:
+        analysis = _analyze_changed_regions(raw_text, category, source, minhash)
+    analysis["incomplete_scans"] = list(scans.cut_short)
+    analysis["trace"] = _trace(run)
+    return analysis
+
+
+# Highlight keys of the entities the overviews name (see ENTITY_KEYS in highlighter)
+NAME_KEYS = {"Person": "PERSON", "Company": "ORG"}
+
+
+def _analyze_changed_regions(raw_text, category, source, minhash):
+    old_text = source.get("raw_text") or ""
+    old_lines = old_text.splitlines()
+    new_lines = raw_text.splitlines()
+    old_starts = _line_starts(old_text)
+    new_starts = _line_starts(raw_text)
+    with trace.stage("diff"):
+        opcodes = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes()
+
+    # Changed lines are concatenated with their line breaks; `segments` maps
+    # offsets in changed_text back to raw_text: (changed_start, new_start).
+    # Deleted and replaced source lines make up removed_text.
+    pieces, removed, segments, position = [], [], [], 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag in ("replace", "insert"):
+            piece = raw_text[new_starts[j1]:new_starts[j2]]
+            segments.append((position, new_starts[j1]))
+            pieces.append(piece)
+            position += len(piece)
+        if tag in ("replace", "delete"):
+            removed.append(old_text[old_starts[i1]:old_starts[i2]])
+    changed_text = "".join(pieces)
+    removed_text = "".join(removed)
+    changed_starts = [changed_start for changed_start, _ in segments]
+    sources = source["category_analysis"]
+    lowered = raw_text.lower()
+    surviving = {
+        cat: [kp for kp in (sources[cat].get("key_points") or []) if kp in raw_text] for cat in CATEGORIES
+    }
+    survivors = list(dict.fromkeys(kp for kps in surviving.values() for kp in kps))
+
+    with memory_zone() as nlp:
+        with trace.stage("parse"):
+            changed_doc, removed_doc, *survivor_docs = nlp.pipe([changed_text, removed_text, *survivors])
+        with trace.stage("highlights"):
+            changed = extract_all_highlights(changed_text, doc=changed_doc) if changed_text.strip() else None
+            scores = category_scores(nlp.make_doc(raw_text))
+        if category == AUTO_CATEGORY:
+            category = detect_category(scores)
+
+        highlights_by_category, spans_by_category = {}, {}
+        for cat in CATEGORIES:
+            src = sources[cat]
+            highlights = {}
+            for key, value in (src.get("highlights") or {}).items():
+                kept = [v for v in str(value).split(", ") if v.strip() and v.lower() in lowered]
+                if kept:
+                    highlights[key] = kept
+            if changed:
+                for key, value in changed["highlights"][cat].items():
+                    highlights.setdefault(key, []).extend(value.split(", "))
+            highlights = clean_highlights(highlights)
+
+            spans = []
+            source_spans = src.get("highlight_spans") or []
+            source_starts = [span[0] for span in source_spans]
+            for tag, i1, i2, j1, j2 in opcodes:
+                # Lines compare equal without their line breaks; only shift blocks that are byte-identical
+                if tag == "equal" and old_text[old_starts[i1]:old_starts[i2]] == raw_text[new_starts[j1]:new_starts[j2]]:
+                    lo, hi, shift = old_starts[i1], old_starts[i2], new_starts[j1] - old_starts[i1]
+                    for start, end, key in source_spans[bisect.bisect_left(source_starts, lo):]:
+                        if start >= hi:
+                            break
+                        if end <= hi and key in highlights:
+                            spans.append([start + shift, end + shift, key])
+            for start, end, key in (changed["spans"][cat] if changed else []):
+                i = bisect.bisect_right(changed_starts, start) - 1
+                segment_end = changed_starts[i + 1] if i + 1 < len(segments) else len(changed_text)
+                if end <= segment_end:  # matches running across two changed blocks are dropped
+                    shift = segments[i][1] - segments[i][0]
+                    spans.append([start + shift, end + shift, key])
+            spans.sort(key=lambda s: (s[0], -s[1], s[2]))
+            highlights_by_category[cat] = highlights
+            spans_by_category[cat] = spans
+
+        with trace.stage("key_points"):
+            changed_sentences = split_sentences(changed_text)
+            sentence_scores = entity_scores(changed_text, changed_doc, changed_sentences)
+            for kp, doc in zip(survivors, survivor_docs):
+                sentence_scores.setdefault(kp, len(doc.ents))
+            key_points = rank_key_points_by_category(
+                {cat: list(dict.fromkeys(surviving[cat] + changed_sentences)) for cat in CATEGORIES}, sentence_scores,
+            )
+        with trace.stage("overview"):
+            # Surviving entity spans are the same in every category; take the general one's
+            names = [
+                (raw_text[start:end], NAME_KEYS[key])
+                for start, end, key in spans_by_category["general"] if key in NAME_KEYS
+            ]
+            names += [(ent.text, ent.label_) for ent in changed_doc.ents if ent.label_ in ("PERSON", "ORG")]
+            summaries = {
+                cat: generate_narrative_overview_spacy(raw_text, cat, entities=names) if raw_text.strip() else NO_OVERVIEW
+                for cat in CATEGORIES
+            }
+            insights = {cat: generate_insights(raw_text, cat) if raw_text.strip() else [] for cat in CATEGORIES}
+        summaries[category], fell_back = summary_backends.overview_or_fallback(raw_text, category, summaries[category])
+        with trace.stage("signatures"):
+            term_counts = Counter(source["term_counts"])
+            term_counts.subtract(hashed_term_counts(removed_doc))
+            term_counts.update(hashed_term_counts(changed_doc))
+        trace.count("tokens", len(changed_doc) + len(removed_doc))
+        trace.count("sentences", len(changed_sentences))
+        trace.count("entities", len(changed_doc.ents))
+        category_analysis = {
+            cat: {
+                "summary": summaries[cat],
+                "key_points": key_points[cat],
+                "highlights": highlights_by_category[cat],
+                "highlight_spans": spans_by_category[cat],
+                "insights": insights[cat],
+            }
+            for cat in CATEGORIES
+        }
+        return {
+            "raw_text": raw_text,
+            "category": category,
+            **category_analysis[category],
+            "category_analysis": category_analysis,
+            "category_scores": scores,
+            "term_counts": {bucket: count for bucket, count in term_counts.items() if count > 0},
+            "minhash": signature(raw_text) if minhash is None else minhash,
+            "summary_fallback": fell_back,
+        }
+
+
+def _line_starts(text: str) -> list:
+    """Offset of every line of text.splitlines() in `text`, plus len(text) as a sentinel."""
+    starts, position = [], 0
+    for line in text.splitlines(keepends=True):
+        starts.append(position)
+        position += len(line)
+    starts.append(position)
+    return starts
@@ -0,0 +1,148 @@
+# nlp_utils/regex_guard.py
+"""
+Regex scans with a CPU budget per document.
+
+Python's re cannot be interrupted, so one scan with heavy backtracking over a
+large text can hold a worker for minutes. finditer() here scans the text in
+windows of CHUNK_CHARS that end at a line break and checks the budget between
+windows. The cost of any single call is therefore bounded by the window size,
+not the document size. Windows overlap by OVERLAP_CHARS and a match is only
+taken from the window in which it starts before the overlap. The matches are
+the same as one pattern.finditer(text), unless a match spans more than
+OVERLAP_CHARS.
+
+Analyses open a budget() scope per document. Once the scope's scans have used
+BUDGET_SECONDS of CPU time, further scans stop early and the pattern is
+recorded in Budget.cut_short. The analysis finishes with what it found and
+reports the list as "incomplete_scans". Outside a scope, scans are not limited.
+
+Every scan is recorded in `stats` (per pattern name, this process), and scans
+slower than SLOW_SCAN_SECONDS are logged.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# CPU seconds of regex scanning per document; 0 turns the limit off
+BUDGET_SECONDS = float(os.environ.get("DOCMAGE_REGEX_BUDGET_SECONDS", 3.0))
+CHUNK_CHARS = int(os.environ.get("DOCMAGE_REGEX_CHUNK_CHARS", 16384))
+OVERLAP_CHARS = 1024
+SLOW_SCAN_SECONDS = 0.1
+
+_stats_lock = threading.Lock()
+# {pattern name: {"scans", "seconds", "max_seconds", "chars", "cut_short"}}
+stats = {}
+
+
+class Budget:
+    def __init__(self, seconds: float = None):
+        self.seconds = BUDGET_SECONDS if seconds is None else seconds
+        self.spent = 0.0
+        self.cut_short = []  # names of the patterns whose scans stopped early, in order
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.seconds) and self.spent >= self.seconds
+
+    def charge(self, seconds: float):
+        self.spent += seconds
+
+
+_budget = ContextVar("regex_budget", default=None)
+
+
+@contextmanager
+def budget(scope: Budget = None):
+    """
+    Charge the regex scans inside to `scope` (a new Budget if None); yields
+    it. Nested scopes share the outermost one, so a document's pages draw on
+    one budget. A generator re-enters its Budget around each step rather than
+    holding the scope open across yields.
+    """
+    current = _budget.get()
+    if current is not None:
+        yield current
+        return
+    scope = scope or Budget()
+    token = _budget.set(scope)
+    try:
+        yield scope
+    finally:
+        _budget.reset(token)
+
+
+def finditer(pattern, text: str, name: str = None):
+    """pattern.finditer(text), window by window, until the current budget runs out."""
+    name = name or pattern.pattern[:40]
+    scope = _budget.get()
+    length = len(text)
+    position, cut_short, charged = 0, False, 0.0
+    started = time.thread_time()
+    try:
+        while position < length:
+            if scope is not None and scope.exhausted:
+                cut_short = True
+                break
+            end = _window_end(text, position)
+            # Matches starting at or after `cutoff` are found again, with the text after them, by the next window
+            cutoff = length if end >= length else max(end - OVERLAP_CHARS, position + 1)
+            resume = cutoff
+            for match in pattern.finditer(text, position, end):
+                if match.start() >= cutoff:
+                    break
+                yield match
+                resume = max(cutoff, match.end())
+            position = resume
+            if scope is not None:
+                spent = time.thread_time() - started
+                scope.charge(spent - charged)
+                charged = spent
+    finally:
+        _record(name, time.thread_time() - started, length, cut_short, scope)
+
+
+def search(pattern, text: str, name: str = None):
+    """First match of finditer(), or None."""
+    matches = finditer(pattern, text, name)
+    try:
+        return next(matches, None)
+    finally:
+        matches.close()
+
+
+def _window_end(text, position):
+    end = position + CHUNK_CHARS
+    if end >= len(text):
+        return len(text)
+    # End at a line break if there is one nearby, so lines are not split
+    newline = text.find("\n", end, end + OVERLAP_CHARS)
+    return newline + 1 if newline != -1 else end
+
+
+def _record(name, seconds, chars, cut_short, scope):
+    with _stats_lock:
+        entry = stats.setdefault(name, {"scans": 0, "seconds": 0.0, "max_seconds": 0.0, "chars": 0, "cut_short": 0})
+        entry["scans"] += 1
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["chars"] += chars
+        entry["cut_short"] += cut_short
+    if cut_short and scope is not None and name not in scope.cut_short:
+        scope.cut_short.append(name)
+        logger.warning("Regex scan %r stopped: document budget of %gs CPU used up", name, scope.seconds)
+    elif seconds > SLOW_SCAN_SECONDS:
+        logger.warning("Slow regex scan %r: %.2fs over %d characters", name, seconds, chars)
+
+
+def stats_snapshot() -> dict:
+    """Copy of `stats`, with mean seconds per scan, slowest patterns first."""
+    with _stats_lock:
+        entries = {name: dict(entry) for name, entry in stats.items()}
+    for entry in entries.values():
+        entry["mean_seconds"] = entry["seconds"] / entry["scans"] if entry["scans"] else 0.0
+    return dict(sorted(entries.items(), key=lambda item: item[1]["seconds"], reverse=True))
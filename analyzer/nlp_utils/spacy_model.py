@@ -0,0 +1,88 @@
+# nlp_utils/spacy_model.py
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Name or path of the spaCy pipeline shared by the highlighter, summarizer and NER.
+MODEL_NAME = os.environ.get("DOCMAGE_SPACY_MODEL", "en_core_web_sm")
+
+# Request-scoped parses run in spaCy memory zones (spaCy >= 3.8), so strings and
+# lexemes first seen in a request are freed afterwards instead of growing the
+# shared vocab for the life of the worker. Set to 0 to turn them off.
+USE_MEMORY_ZONES = os.environ.get("DOCMAGE_SPACY_MEMORY_ZONES", "1") != "0"
+# Concurrent scopes share one zone, which closes when the last of them exits.
+# After this many scopes new ones wait for it to close, so it cannot stay open forever.
+ZONE_MAX_SCOPES = int(os.environ.get("DOCMAGE_ZONE_MAX_SCOPES", 64))
+
+
+@lru_cache(maxsize=None)
+def get_nlp():
+    """Load the spaCy pipeline on first use and share it across modules.
+
+    spaCy (and the model) is imported here rather than at module import time so
+    that `manage.py migrate/check/shell` and admin-only processes never pay for it.
+    """
+    import spacy
+    return spacy.load(MODEL_NAME)
+
+
+_zone_changed = threading.Condition()
+_zone = {"context": None, "active": 0, "scopes": 0, "draining": False}
+_thread = threading.local()
+
+
+@contextmanager
+def memory_zone():
+    """
+    Scope for parses whose Docs do not outlive it; yields the shared pipeline.
+
+    Strings and lexemes added to the vocab inside the scope are freed when it
+    ends, so nothing derived from a Doc (tokens, spans, Docs themselves) may be
+    used afterwards; plain str/int values copied out are fine. spaCy's zones
+    are global to the vocab and must not nest, so scopes are re-entrant per
+    thread and overlapping scopes in other threads join the open zone: it is
+    only closed once none of them is left. Long-lived vocab entries (the
+    primed tokenizer cache) are added before the first zone is opened.
+    """
+    nlp = get_nlp()
+    if not USE_MEMORY_ZONES or not hasattr(nlp, "memory_zone") or getattr(_thread, "depth", 0):
+        _thread.depth = getattr(_thread, "depth", 0) + 1
+        try:
+            yield nlp
+        finally:
+            _thread.depth -= 1
+        return
+
+    _load_long_lived_state()
+    with _zone_changed:
+        while _zone["draining"]:
+            _zone_changed.wait()
+        if _zone["active"] == 0:
+            _zone["context"] = nlp.memory_zone()
+            _zone["context"].__enter__()
+        _zone["active"] += 1
+        _zone["scopes"] += 1
+        if _zone["scopes"] >= ZONE_MAX_SCOPES:
+            _zone["draining"] = True
+    _thread.depth = 1
+    try:
+        yield nlp
+    finally:
+        _thread.depth = 0
+        with _zone_changed:
+            _zone["active"] -= 1
+            if _zone["active"] == 0:
+                context, _zone["context"] = _zone["context"], None
+                _zone.update(scopes=0, draining=False)
+                try:
+                    context.__exit__(None, None, None)
+                finally:
+                    _zone_changed.notify_all()
+
+
+@lru_cache(maxsize=None)
+def _load_long_lived_state():
+    # Anything cached across requests must add its strings outside a zone
+    from .warmup import load_models
+    load_models()
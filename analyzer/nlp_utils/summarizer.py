@@ -1,33 +1,51 @@
+import bisect
 import re
-import spacy
+from contextlib import nullcontext
 from typing import List, Dict
 from datetime import datetime
+from . import regex_guard, summary_backends
+from .field_index import FieldIndex
+from .spacy_model import get_nlp, memory_zone
 
-# Load spaCy model globally for performance
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    nlp = None  # Fallback if model is not available
+_NLP_UNAVAILABLE = False
+
+
+def _get_nlp():
+    """Shared spaCy pipeline, or None if the model is not installed."""
+    global _NLP_UNAVAILABLE
+    if _NLP_UNAVAILABLE:
+        return None
+    try:
+        return get_nlp()
+    except OSError:
+        _NLP_UNAVAILABLE = True  # Fallback if model is not available
+        return None
 
 # ---------------------------
 # Helper: Extract Patient Info
 # ---------------------------
-import re
-from datetime import datetime
-from typing import Dict
+DATE_VALUE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+AGE_VALUE = re.compile(r"(\d{1,3})")
+CRORE_VALUE = re.compile(r"([\d.]+ Cr)")
+PERCENT_VALUE = re.compile(r"([\d.%]+)")
+# The value within a few characters of the label: "LDL-C: 130", "LDL-C (mg/dL) 130"
+LDL_VALUE = re.compile(r"LDL[- ]?C[^\d\n]{0,40}(\d+)")
+NEXT_HEARING = re.compile(r"Next Hearing:\s*(.+)")
 
-def extract_patient_info(text: str) -> Dict[str, str]:
-    name_match = re.search(r"Patient Name:\s*(.+)", text)
-    dob_match = re.search(r"DOB:\s*(\d{4}-\d{2}-\d{2})", text)
-    age_match = re.search(r"Age:\s*(\d{1,3})", text)
 
-    name = name_match.group(1).strip() if name_match else "The patient"
+def extract_patient_info(text: str, index: FieldIndex = None) -> Dict[str, str]:
+    index = index or FieldIndex(text)
+    name = index.field("Patient Name")
+    dob = index.field("DOB", DATE_VALUE)
+    age_value = index.field("Age", AGE_VALUE)
+
+    name = name.strip() if name else "The patient"
     age = "unknown age"
-    dob_str = dob_match.group(1) if dob_match else "unknown DOB"
+    dob_str = dob or "unknown DOB"
 
-    if age_match:
-        age = age_match.group(1)
-    elif dob_match:
+    if age_value:
+        age = age_value
+    elif dob:
         dob = datetime.strptime(dob_str, "%Y-%m-%d")
         today = datetime.now()
         age = str(today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day)))
@@ -44,21 +62,28 @@ def extract_patient_info(text: str) -> Dict[str, str]:
 # ---------------------------
 # Generate Narrative Overview
 # ---------------------------
-def generate_narrative_overview_spacy(text: str, category: str) -> str:
+def generate_narrative_overview_spacy(text: str, category: str, doc=None, entities=None) -> str:
+    """`entities`, (text, label) pairs, stand in for doc.ents when the text was parsed in parts."""
     cat = (category or "default").lower()
-    doc = nlp(text) if nlp else None
+    if doc is None and entities is None and _get_nlp():
+        with memory_zone() as nlp:
+            return generate_narrative_overview_spacy(text, category, doc=nlp(text))
 
-    persons = list(set([ent.text for ent in doc.ents if ent.label_ == "PERSON"])) if doc else []
-    orgs = list(set([ent.text for ent in doc.ents if ent.label_ == "ORG"])) if doc else []
+    if entities is None:
+        entities = [(ent.text, ent.label_) for ent in doc.ents] if doc else []
+    persons = list(set([ent for ent, label in entities if label == "PERSON"]))
+    orgs = list(set([ent for ent, label in entities if label == "ORG"]))
+    # Fields and sections come from one pass over the lines, not a regex scan per field
+    index = FieldIndex(text) if cat in ("medical", "legal", "financial") else None
 
     if cat == "medical":
-        info = extract_patient_info(text)
+        info = extract_patient_info(text, index)
         hospital = next((o for o in orgs if "hospital" in o.lower()), "the medical facility")
         doctor = next((p for p in persons if "Dr." in p), "the attending physician")
-        complaints_match = re.search(r"Clinical Summary\s*(.*?)Impressions", text, re.DOTALL)
-        complaints = complaints_match.group(1).strip().replace("\n", " ") if complaints_match else "clinical symptoms"
-        impressions_match = re.search(r"Impressions\s*(.*?)Parameter", text, re.DOTALL)
-        impressions = impressions_match.group(1).strip().replace("\n", "; ") if impressions_match else "clinical concerns noted"
+        complaints = index.between("Clinical Summary", "Impressions")
+        complaints = complaints.strip().replace("\n", " ") if complaints else "clinical symptoms"
+        impressions = index.between("Impressions", "Parameter")
+        impressions = impressions.strip().replace("\n", "; ") if impressions else "clinical concerns noted"
 
         return (
             f"{info['name']}, a {info['age']}-year-old {info['gender']}, was evaluated at {hospital} under {doctor}. "
@@ -68,35 +93,35 @@ def generate_narrative_overview_spacy(text: str, category: str) -> str:
         )
 
     elif cat == "legal":
-        case_title = re.search(r"Case Title:\s*(.+)", text)
-        case_number = re.search(r"Case Number:\s*(.+)", text)
-        court = re.search(r"Jurisdiction:\s*(.+)", text)
+        case_title = index.field("Case Title")
+        case_number = index.field("Case Number")
+        court = index.field("Jurisdiction")
         judge = next((p for p in persons if "Justice" in p), "the presiding judge")
-        plaintiff = re.search(r"Plaintiff:\s*(.+)", text)
-        defendant = re.search(r"Defendant:\s*(.+)", text)
-        summary = re.search(r"Case Summary:\s*([\s\S]*?)\n[A-Z]", text)
-        summary_text = summary.group(1).strip().replace("\n", " ") if summary else "Details of the case are under review."
+        plaintiff = index.field("Plaintiff")
+        defendant = index.field("Defendant")
+        summary = index.block("Case Summary")
+        summary_text = summary.strip().replace("\n", " ") if summary else "Details of the case are under review."
 
         return (
-            f"{case_title.group(1) if case_title else 'A legal case'} (Case No. {case_number.group(1) if case_number else 'N/A'}) "
-            f"is being heard in {court.group(1) if court else 'the relevant court'} under {judge}. "
-            f"The dispute involves {plaintiff.group(1) if plaintiff else 'the plaintiff'} and {defendant.group(1) if defendant else 'the defendant'}. "
+            f"{case_title or 'A legal case'} (Case No. {case_number or 'N/A'}) "
+            f"is being heard in {court or 'the relevant court'} under {judge}. "
+            f"The dispute involves {plaintiff or 'the plaintiff'} and {defendant or 'the defendant'}. "
             f"Summary: {summary_text}"
         )
 
     elif cat == "financial":
-        company = re.search(r"Company:\s*(.+)", text)
-        period = re.search(r"Fiscal Period:\s*(.+)", text)
-        revenue = re.search(r"Revenue\s*\n\s*([\d.]+ Cr)", text)
-        net_income = re.search(r"Net Income\s*\n\s*([\d.]+ Cr)", text)
-        arr = re.search(r"ARR:\s*([\d.]+ Cr)", text)
-        margin = re.search(r"Gross Margin:\s*([\d.%]+)", text)
-        org_name = company.group(1) if company else "the company"
+        company = index.field("Company")
+        period = index.field("Fiscal Period")
+        revenue = index.after_line_ending("Revenue", CRORE_VALUE)
+        net_income = index.after_line_ending("Net Income", CRORE_VALUE)
+        arr = index.field("ARR", CRORE_VALUE)
+        margin = index.field("Gross Margin", PERCENT_VALUE)
+        org_name = company or "the company"
 
         return (
-            f"{org_name} reported financial results for {period.group(1) if period else 'the reporting period'}. "
-            f"Key metrics include Revenue of {revenue.group(1) if revenue else 'N/A'}, Net Income of {net_income.group(1) if net_income else 'N/A'}, "
-            f"ARR of {arr.group(1) if arr else 'N/A'}, and Gross Margin of {margin.group(1) if margin else 'N/A'}."
+            f"{org_name} reported financial results for {period or 'the reporting period'}. "
+            f"Key metrics include Revenue of {revenue or 'N/A'}, Net Income of {net_income or 'N/A'}, "
+            f"ARR of {arr or 'N/A'}, and Gross Margin of {margin or 'N/A'}."
         )
 
     elif cat == "general":
@@ -111,68 +136,124 @@ def generate_narrative_overview_spacy(text: str, category: str) -> str:
 # ---------------------------
 # Sentence Scoring
 # ---------------------------
-def score_sentence(sentence: str, category: str) -> int:
-    score = 0
-    if nlp:
-        doc = nlp(sentence)
-        score += len(doc.ents)
-    keywords = {
-        "medical": ["symptom", "diagnosis", "treatment", "patient", "clinical", "impression", "follow-up", "medication", "plan", "recommendation"],
-        "legal": ["case", "ruling", "plaintiff", "defendant", "contract", "compliance", "clause", "hearing", "jurisdiction"],
-        "financial": ["revenue", "profit", "loss", "quarter", "growth", "market", "cash", "margin", "income"]
+SENTENCE_KEYWORDS = {
+    "medical": ["symptom", "diagnosis", "treatment", "patient", "clinical", "impression", "follow-up", "medication", "plan", "recommendation"],
+    "legal": ["case", "ruling", "plaintiff", "defendant", "contract", "compliance", "clause", "hearing", "jurisdiction"],
+    "financial": ["revenue", "profit", "loss", "quarter", "growth", "market", "cash", "margin", "income"]
+}
+
+def keyword_score(sentence: str, category: str) -> int:
+    lowered = sentence.lower()
+    return 2 * sum(word in lowered for word in SENTENCE_KEYWORDS.get(category, []))
+
+def split_sentences(text: str) -> List[str]:
+    """Candidate key-point sentences: punctuation-split, more than three words."""
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    return [s for s in sentences if len(s.split()) > 3]
+
+
+def rank_key_points(text: str, category: str = None, doc=None, limit: int = 8) -> List[str]:
+    """The `limit` best sentences of `text`; `doc` is `text` parsed (see entity_scores)."""
+    sentences = split_sentences(text)
+    scores = entity_scores(text, doc, sentences)
+    return rank_scored_sentences([(s, scores[s]) for s in sentences], category, limit)
+
+
+def rank_key_points_by_category(candidates: Dict[str, List[str]], scores: Dict[str, int], limit: int = 8) -> Dict[str, List[str]]:
+    """rank_key_points for several categories at once ({category: sentences}), from their entity_scores."""
+    return {
+        category: rank_scored_sentences([(s, scores[s]) for s in sentences], category, limit)
+        for category, sentences in candidates.items()
     }
-    for word in keywords.get(category, []):
-        if word in sentence.lower():
-            score += 2
-    return score
+
+
+def entity_scores(text: str, doc, sentences: List[str] = None) -> Dict[str, int]:
+    """
+    {sentence: entity score} for split_sentences(text), or for `sentences`,
+    which must occur in `text` in that order. A sentence's score is the number
+    of doc.ents inside it: `doc` is `text` parsed once (or loaded from the doc
+    store), so no sentence is parsed again. Without a Doc every score is 0.
+    """
+    sentences = split_sentences(text) if sentences is None else sentences
+    if doc is None:
+        return dict.fromkeys(sentences, 0)
+    entities = [(ent.start_char, ent.end_char) for ent in doc.ents]
+    starts = [start for start, _ in entities]
+    scores, position = {}, 0
+    for sentence in sentences:
+        start = text.find(sentence, position)
+        end = start + len(sentence)
+        position = max(position, end)
+        if sentence in scores:
+            continue
+        score = 0
+        i = bisect.bisect_left(starts, start)
+        while start >= 0 and i < len(entities) and entities[i][0] < end:
+            score += entities[i][1] <= end
+            i += 1
+        scores[sentence] = score
+    return scores
+
+
+def rank_scored_sentences(scored, category: str = None, limit: int = 8) -> List[str]:
+    """rank_key_points for (sentence, entity score) pairs whose entity scores are already known."""
+    ranked = sorted(scored, key=lambda item: item[1] + keyword_score(item[0], category or "default"), reverse=True)
+    return [sentence for sentence, _ in ranked[:limit]]
 
 # ---------------------------
 # Main Summarizer
 # ---------------------------
-def summarize_structured_with_insights(text: str, category: str = None) -> Dict[str, object]:
+def summarize_structured_with_insights(text: str, category: str = None, doc=None) -> Dict[str, object]:
     if not text.strip():
         return {"overview": "No overview available.", "key_points": [], "insights": []}
 
-    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
-    sentences = [s for s in sentences if len(s.split()) > 3]
+    # One parse for the entity scores of every sentence and the overview's names
+    with memory_zone() if _get_nlp() else nullcontext() as nlp:
+        if doc is None and nlp is not None:
+            doc = nlp(text)
+        key_points = rank_key_points(text, category, doc)
+        overview = generate_narrative_overview_spacy(text, category, doc=doc, entities=None if doc else [])
+    overview = summary_backends.overview(text, category, overview)
 
-    ranked = sorted(sentences, key=lambda s: score_sentence(s, category or "default"), reverse=True)
-    key_points = ranked[:8]
+    return {
+        "overview": overview,
+        "key_points": key_points,
+        "insights": generate_insights(text, category)
+    }
 
-    overview = generate_narrative_overview_spacy(text, category)
 
+def generate_insights(text: str, category: str = None) -> List[str]:
+    """Keyword-triggered insights for a category; stored per category at analysis time (see pipeline)."""
     insights = []
+    lowered = text.lower()
     cat = (category or "default").lower()
     if cat == "financial":
-        if "growth" in text.lower():
+        if "growth" in lowered:
             insights.append("Revenue growth observed, possibly driven by subscriptions or renewals.")
-        if "margin" in text.lower():
+        if "margin" in lowered:
             insights.append("Margin improvements may reflect cost optimization.")
-        if "cash flow" in text.lower():
+        if "cash flow" in lowered:
             insights.append("Positive cash flow indicates financial stability.")
     elif cat == "medical":
-        if "ldl" in text.lower() and re.search(r"LDL[- ]?C.*?(\\d+)", text):
-            ldl_val = int(re.search(r"LDL[- ]?C.*?(\\d+)", text).group(1))
+        ldl = regex_guard.search(LDL_VALUE, text, "LDL") if "ldl" in lowered else None
+        if ldl:
+            ldl_val = int(ldl.group(1))
             if ldl_val > 100:
                 insights.append(f"LDL level ({ldl_val} mg/dL) is above target; consider intensifying statin therapy.")
-        if "gerd" in text.lower() or "reflux" in text.lower():
+        if "gerd" in lowered or "reflux" in lowered:
             insights.append("GERD suspected; PPI trial and lifestyle changes recommended.")
-        if "follow-up" in text.lower():
+        if "follow-up" in lowered:
             insights.append("Follow-up scheduled; monitor symptoms and adjust treatment as needed.")
     elif cat == "legal":
-        if "confidentiality" in text.lower():
+        if "confidentiality" in lowered:
             insights.append("Confidentiality clause is a key point of contention.")
-        if "force majeure" in text.lower():
+        if "force majeure" in lowered:
             insights.append("Force majeure defense may be challenged based on context.")
-        if "next hearing" in text.lower():
-            next_hearing = re.search(r"Next Hearing:\s*(.+)", text)
+        if "next hearing" in lowered:
+            next_hearing = regex_guard.search(NEXT_HEARING, text, "Next_Hearing")
             if next_hearing:
                 insights.append(f"Next hearing scheduled for {next_hearing.group(1)}.")
     elif cat == "general":
         insights.append("Document covers general information; no domain-specific insights detected.")
 
-    return {
-        "overview": overview,
-        "key_points": key_points,
-        "insights": insights
-    }
+    return insights
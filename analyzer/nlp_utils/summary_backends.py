@@ -0,0 +1,194 @@
+# nlp_utils/summary_backends.py
+"""
+Where a document's overview comes from.
+
+The analyses always build the field-based narrative overview
+(generate_narrative_overview_spacy) for every category, and then ask the
+configured backend for the overview of the document's own category, passing
+the narrative in as `heuristic`:
+
+- "heuristic" (default): returns it unchanged.
+- "local": summarizes the text with a local model in a pool of CPU worker
+  processes with dynamic batching (see summary_pool). If the model does not
+  answer within DOCMAGE_SUMMARIZER_TIMEOUT seconds, fails, or returns nothing,
+  the heuristic overview is used instead and the fallback is counted.
+
+DOCMAGE_SUMMARIZER_MODEL names the model of the "local" backend: "stub" (a
+tiny extractive stand-in, "stub:0.5" for one that takes 0.5 s per batch) or
+the directory of a transformers sequence-to-sequence checkpoint, which is
+loaded with local_files_only and never downloaded.
+
+The model is loaded once per deployment, not once per process: the NLP
+server runs the pool and loads the model before it accepts connections, and
+every other process sends its texts to the server's socket
+(DOCMAGE_SUMMARIZER_SOCKET, by default DOCMAGE_NLP_SOCKET), where they join
+the same batches. Without a socket a process starts a pool of its own on
+first use.
+"""
+import logging
+import os
+import socket
+import struct
+import threading
+
+from . import trace
+from .summary_pool import SummaryModelError, SummaryPool
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZER = os.environ.get("DOCMAGE_SUMMARIZER", "heuristic")
+MODEL = os.environ.get("DOCMAGE_SUMMARIZER_MODEL", "")
+WORKERS = int(os.environ.get("DOCMAGE_SUMMARIZER_WORKERS", 1))
+THREADS = int(os.environ.get("DOCMAGE_SUMMARIZER_THREADS", 1))  # intra-op threads per worker
+MAX_BATCH = int(os.environ.get("DOCMAGE_SUMMARIZER_MAX_BATCH", 8))
+MAX_WAIT_MS = float(os.environ.get("DOCMAGE_SUMMARIZER_MAX_WAIT_MS", 20))
+MAX_INPUT_TOKENS = int(os.environ.get("DOCMAGE_SUMMARIZER_MAX_INPUT_TOKENS", 512))
+MAX_NEW_TOKENS = int(os.environ.get("DOCMAGE_SUMMARIZER_MAX_NEW_TOKENS", 128))
+TIMEOUT = float(os.environ.get("DOCMAGE_SUMMARIZER_TIMEOUT", 10))
+# Unix socket of the server whose pool summarizes for this process (see nlp_server); empty: a pool of its own
+SOCKET = os.environ.get("DOCMAGE_SUMMARIZER_SOCKET", os.environ.get("DOCMAGE_NLP_SOCKET", ""))
+HEADER = struct.Struct("!I")  # frame length, as in nlp_client
+
+
+class HeuristicBackend:
+    name = "heuristic"
+
+    def overview(self, text: str, category: str, heuristic: str) -> str:
+        return self.overview_or_fallback(text, category, heuristic)[0]
+
+    def overview_or_fallback(self, text: str, category: str, heuristic: str) -> tuple:
+        """(overview, fell_back): fell_back is True when `heuristic` stands in for a model summary."""
+        return heuristic, False
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class LocalModelBackend(HeuristicBackend):
+    def __init__(self, model=MODEL, timeout=TIMEOUT, socket_path=SOCKET, **pool_options):
+        self.model = model
+        self.name = f"local.{os.path.basename(model.rstrip('/')) or model}"
+        self.timeout = timeout
+        self.socket_path = socket_path
+        self.pool_options = {
+            "workers": WORKERS, "threads": THREADS, "max_batch": MAX_BATCH, "max_wait": MAX_WAIT_MS / 1000,
+            "max_input_tokens": MAX_INPUT_TOKENS, "max_new_tokens": MAX_NEW_TOKENS, **pool_options,
+        }
+        self.fallbacks = 0
+        self._pool, self._pool_pid = None, None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> SummaryPool:
+        # A forked process (NLP server worker, gunicorn worker) starts a pool of its own
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = SummaryPool(self.model, **self.pool_options)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def summarize(self, text: str, timeout: float) -> str:
+        """The model's summary of `text`, from the server's pool or this process's; raises TimeoutError or SummaryModelError."""
+        if not self.socket_path:
+            return self.pool.summarize(text, timeout)
+        import srsly  # msgpack, as in nlp_client
+        body = srsly.msgpack_dumps({"id": 1, "op": "summarize", "args": {"text": text}})
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            try:
+                sock.connect(self.socket_path)
+                sock.sendall(HEADER.pack(len(body)) + body)
+                reply = sock.makefile("rb")
+                header = reply.read(HEADER.size)
+                frame = srsly.msgpack_loads(reply.read(HEADER.unpack(header)[0])) if len(header) == HEADER.size else {}
+            except socket.timeout:
+                raise TimeoutError() from None
+            except OSError as exc:
+                raise SummaryModelError(f"Summarization server at {self.socket_path} unreachable: {exc}") from exc
+        if "result" not in frame:
+            raise SummaryModelError(frame.get("error") or "Summarization server closed the connection.")
+        return frame["result"]
+
+    def overview_or_fallback(self, text: str, category: str, heuristic: str) -> tuple:
+        with trace.stage("model_summary"):
+            try:
+                summary = self.summarize(text, self.timeout).strip()
+            except TimeoutError:
+                logger.warning("Summarization model gave no answer in %gs; using the heuristic overview", self.timeout)
+                summary = ""
+            except SummaryModelError as exc:
+                logger.warning("Summarization model failed (%s); using the heuristic overview", exc)
+                summary = ""
+        if not summary:
+            self.fallbacks += 1
+            trace.count("summary_fallbacks", 1)
+            return heuristic, True
+        return summary, False
+
+    def warm_up(self):
+        """Start this process's pool and wait until its workers have loaded the model."""
+        pool = self.pool
+        pool.summarize("Warm-up. The model loads here.", timeout=pool.load_timeout)
+
+    def stats(self) -> dict:
+        if self.socket_path:
+            pool = {"server": self.socket_path}
+        else:
+            pool = self._pool.pool_stats() if self._pool is not None and self._pool_pid == os.getpid() else {}
+        return {"backend": self.name, "fallbacks": self.fallbacks, **pool}
+
+
+BACKENDS = {"heuristic": HeuristicBackend, "local": LocalModelBackend}
+
+_backend = None
+
+
+def get_backend():
+    """The DOCMAGE_SUMMARIZER backend of this process, created on first use."""
+    global _backend
+    if _backend is None:
+        if SUMMARIZER not in BACKENDS:
+            raise ValueError(f"DOCMAGE_SUMMARIZER must be one of {sorted(BACKENDS)}, not {SUMMARIZER!r}")
+        if SUMMARIZER == "local" and not MODEL:
+            raise ValueError('DOCMAGE_SUMMARIZER=local needs DOCMAGE_SUMMARIZER_MODEL ("stub" or a checkpoint directory)')
+        _backend = BACKENDS[SUMMARIZER]()
+    return _backend
+
+
+def serve_pool():
+    """
+    For the process that runs the shared pool (the NLP server): make this
+    process's backend summarize with a pool of its own, whatever the socket
+    settings, and load the model before returning it. None unless
+    DOCMAGE_SUMMARIZER is "local".
+    """
+    global _backend
+    if SUMMARIZER != "local":
+        return None
+    get_backend()  # validates the settings
+    _backend = LocalModelBackend(socket_path="")
+    _backend.warm_up()
+    return _backend
+
+
+def use_server(socket_path: str):
+    """Send this process's texts to the pool of the server at `socket_path` (e.g. an NLP server worker's parent)."""
+    global _backend
+    if SUMMARIZER == "local":
+        _backend = LocalModelBackend(socket_path=socket_path)
+
+
+def overview(text: str, category: str, heuristic: str) -> str:
+    """The overview of `text` for `category` from the configured backend; `heuristic` is the narrative overview."""
+    return overview_or_fallback(text, category, heuristic)[0]
+
+
+def overview_or_fallback(text: str, category: str, heuristic: str) -> tuple:
+    """
+    overview() plus whether it fell back to `heuristic` because the model gave
+    no (usable) answer. Such an analysis is not the backend's result: callers
+    neither cache it nor keep it as final (see Document.summary_fallback).
+    """
+    if not text.strip():
+        return heuristic, False
+    return get_backend().overview_or_fallback(text, category, heuristic)
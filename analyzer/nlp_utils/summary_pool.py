@@ -0,0 +1,269 @@
+# nlp_utils/summary_pool.py
+"""
+A pool of CPU worker processes that run a summarization model, with dynamic batching.
+
+Each worker process loads the model once (load_model(spec)) and runs one
+batch at a time. A thread per worker feeds it: it takes the oldest queued
+request, then waits up to `max_wait` seconds for more, up to `max_batch`,
+and sends them as one generate() call. Under load the queue grows while the
+workers are busy, so batches fill up without waiting; when idle, a request
+waits at most `max_wait` for company.
+
+Inputs are cut to `max_input_tokens` and outputs to `max_new_tokens` by the
+model. Callers wait on a Future with their own timeout (see
+summary_backends) and cancel it if they give up: a request still queued is
+then dropped, one already running has its result discarded. A batch that
+takes longer than `batch_timeout`, or a worker that dies, fails that batch's
+requests and the worker is replaced.
+
+Workers are spawned, not forked, so they never inherit the caller's threads,
+sockets or spaCy pipeline, and the model's libraries are only imported there.
+"""
+import atexit
+import logging
+import multiprocessing
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Seconds before loading a model that failed to load is tried again
+LOAD_RETRY_SECONDS = 30
+
+
+class SummaryModelError(RuntimeError):
+    """The model failed a batch, took too long, or its worker exited."""
+
+
+# ---------- Models (loaded in the worker processes) ----------
+
+class StubModel:
+    """
+    A tiny local stand-in for a summarization model, for tests and benchmarks:
+    the leading sentences of each input, up to max_new_tokens words. `delay`
+    seconds of "compute" are spent once per batch, so batching pays off as it
+    does with a real model.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def generate(self, texts, max_input_tokens, max_new_tokens):
+        if self.delay:
+            time.sleep(self.delay)
+        summaries = []
+        for text in texts:
+            words = text.split()[:max_input_tokens]
+            sentences = re.split(r"(?<=[.!?])\s+", " ".join(words))
+            summary = []
+            for sentence in sentences:
+                if summary and len(summary) + len(sentence.split()) > max_new_tokens:
+                    break
+                summary.extend(sentence.split())
+            summaries.append(" ".join(summary[:max_new_tokens]))
+        return summaries
+
+
+class TransformersModel:
+    """A local sequence-to-sequence checkpoint (e.g. a distilled BART or T5 directory); never downloads."""
+
+    def __init__(self, path: str, threads: int = 1):
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(path, local_files_only=True).eval()
+
+    def generate(self, texts, max_input_tokens, max_new_tokens):
+        inputs = self.tokenizer(
+            list(texts), truncation=True, max_length=max_input_tokens, padding=True, return_tensors="pt",
+        )
+        with self.torch.inference_mode():
+            output = self.model.generate(**inputs, max_new_tokens=max_new_tokens, num_beams=1)
+        return self.tokenizer.batch_decode(output, skip_special_tokens=True)
+
+
+def load_model(spec: str, threads: int = 1):
+    """"stub", "stub:<seconds per batch>", or the path of a local transformers checkpoint."""
+    if spec == "stub" or spec.startswith("stub:"):
+        return StubModel(delay=float(spec.partition(":")[2] or 0))
+    return TransformersModel(spec, threads=threads)
+
+
+def _worker_main(conn, spec, threads, max_input_tokens, max_new_tokens):
+    try:
+        model = load_model(spec, threads)
+    except Exception as exc:
+        conn.send(("error", f"Could not load summarization model {spec!r}: {type(exc).__name__}: {exc}"))
+        return
+    conn.send(("ready", None))
+    while True:
+        try:
+            texts = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send(("ok", model.generate(texts, max_input_tokens, max_new_tokens)))
+        except Exception as exc:
+            conn.send(("error", f"{type(exc).__name__}: {exc}"))
+
+
+# ---------- Pool (in the calling process) ----------
+
+class SummaryPool:
+    def __init__(self, spec, workers=1, max_batch=8, max_wait=0.02, max_input_tokens=512,
+                 max_new_tokens=128, threads=1, batch_timeout=60.0, load_timeout=300.0):
+        self.spec = spec
+        self.worker_count = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_input_tokens = max_input_tokens
+        self.max_new_tokens = max_new_tokens
+        self.threads = threads
+        self.batch_timeout = batch_timeout
+        self.load_timeout = load_timeout
+        self.stats = {"requests": 0, "batches": 0, "batched_requests": 0, "errors": 0, "worker_restarts": 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._context = multiprocessing.get_context("spawn")
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"docmage-summary-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        # Before multiprocessing stops the daemon workers, so their exit is not reported as a failure
+        atexit.register(self.close)
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._count("requests")
+        self._queue.put((future, text))
+        return future
+
+    def summarize(self, text: str, timeout: float) -> str:
+        """The model's summary of `text`; raises TimeoutError or SummaryModelError."""
+        future = self.submit(text)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def pool_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "queued": self._queue.qsize(),
+            "mean_batch_size": round(self.stats["batched_requests"] / batches, 2) if batches else 0.0,
+        }
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    # ----- Worker threads -----
+
+    def _run(self):
+        process = conn = None
+        load_error, retry_at = None, 0.0
+        while not self._closed:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            # Requests whose callers gave up while queued are dropped here
+            batch = [(future, text) for future, text in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                if process is None:
+                    if load_error and time.monotonic() < retry_at:
+                        raise load_error  # a model that failed to load is not retried for every batch
+                    try:
+                        process, conn = self._spawn()
+                    except Exception as exc:
+                        if not isinstance(exc, SummaryModelError):
+                            exc = SummaryModelError(f"Could not start a summarization worker: {exc!r}")
+                        load_error, retry_at = exc, time.monotonic() + LOAD_RETRY_SECONDS
+                        raise exc
+                    load_error = None
+                conn.send([text for _, text in batch])
+                if not conn.poll(self.batch_timeout):
+                    raise SummaryModelError(f"Summarization batch took over {self.batch_timeout:g}s.")
+                kind, value = conn.recv()
+                if kind != "ok":
+                    raise SummaryModelError(value)
+            except (SummaryModelError, EOFError, OSError) as exc:
+                if self._closed:
+                    break
+                if not isinstance(exc, SummaryModelError):
+                    exc = SummaryModelError(f"Summarization worker exited: {exc!r}")
+                logger.warning("Summarization batch of %d failed: %s", len(batch), exc)
+                self._count("errors", len(batch))
+                for future, _ in batch:
+                    future.set_exception(exc)
+                if process is not None:
+                    # Stuck or gone: the next batch gets a fresh worker
+                    process = conn = self._stop(process, conn)
+                    self._count("worker_restarts")
+                continue
+            self._count("batches")
+            self._count("batched_requests", len(batch))
+            for (future, _), summary in zip(batch, value):
+                future.set_result(summary)
+        self._stop(process, conn)
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # another thread's shutdown; this one finishes its batch first
+                break
+            batch.append(item)
+        return batch
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.spec, self.threads, self.max_input_tokens, self.max_new_tokens),
+            name="docmage-summary-worker", daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        if not parent_conn.poll(self.load_timeout):
+            self._stop(process, parent_conn)
+            raise SummaryModelError(f"Summarization model {self.spec!r} did not load in {self.load_timeout:g}s.")
+        kind, value = parent_conn.recv()
+        if kind != "ready":
+            self._stop(process, parent_conn)
+            raise SummaryModelError(value)
+        return process, parent_conn
+
+    @staticmethod
+    def _stop(process, conn):
+        if conn is not None:
+            conn.close()
+        if process is not None:
+            process.terminate()
+            process.join(timeout=5)
+        return None
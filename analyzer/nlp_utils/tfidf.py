@@ -0,0 +1,17 @@
+# nlp_utils/tfidf.py
+import os
+import zlib
+from collections import Counter
+
+# Width of the hashed term space; changing it requires `manage.py compact_similarity`.
+HASH_DIM = int(os.environ.get("DOCMAGE_SIMILARITY_DIM", 1024))
+
+
+def hashed_term_counts(doc) -> dict:
+    """Sparse {bucket: count} of a parsed Doc's content lemmas (JSON-friendly str keys)."""
+    counts = Counter()
+    for token in doc:
+        if token.is_alpha and not token.is_stop and len(token) > 1:
+            term = (token.lemma_ or token.text).lower()
+            counts[zlib.crc32(term.encode("utf-8")) % HASH_DIM] += 1
+    return {str(bucket): count for bucket, count in counts.items()}
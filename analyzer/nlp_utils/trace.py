@@ -0,0 +1,92 @@
+# nlp_utils/trace.py
+"""
+What one analysis run spent its time on, for the "slowest runs" admin view.
+
+Analyses open a collect() scope and wrap their stages in stage(name); the
+scope's Trace sums the seconds per stage name, keeps counts (tokens,
+sentences, entities) and samples resident memory at the end of each stage.
+Nested scopes share the outermost one, as analyze_file does around
+analyze_raw_text. Outside a scope, stage() and count() do nothing.
+
+Trace.as_dict() is plain JSON: analyses return it as their "trace" value,
+through the NLP server too, and the caller stores it (see analyzer.traces).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ..memory import rss_bytes
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}  # {stage name: seconds}, in the order first run
+        self.counts = {}
+        self.peak_rss = rss_bytes()
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": time.perf_counter() - self.started,
+            "stages": dict(self.stages),
+            "counts": dict(self.counts),
+            "peak_rss_mb": self.peak_rss / (1024 * 1024),
+        }
+
+
+_trace = ContextVar("analysis_trace", default=None)
+
+
+@contextmanager
+def collect():
+    """Trace the stages inside; yields the Trace (the outer one if nested)."""
+    current = _trace.get()
+    if current is not None:
+        yield current
+        return
+    run = Trace()
+    token = _trace.set(run)
+    try:
+        yield run
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    run = _trace.get()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.stages[name] = run.stages.get(name, 0.0) + time.perf_counter() - started
+        run.peak_rss = max(run.peak_rss, rss_bytes())
+
+
+def count(name: str, n: int):
+    run = _trace.get()
+    if run is not None:
+        run.counts[name] = run.counts.get(name, 0) + n
+
+
+def merge(first: dict, then: dict) -> dict:
+    """
+    One trace of two runs in sequence, e.g. a view's extraction and the NLP
+    server's analysis. Other keys (such as the analyzer version) come from `then`.
+    """
+    stages = dict(first["stages"])
+    for name, seconds in then["stages"].items():
+        stages[name] = stages.get(name, 0.0) + seconds
+    counts = dict(first["counts"])
+    for name, n in then["counts"].items():
+        counts[name] = counts.get(name, 0) + n
+    return dict(
+        then,
+        seconds=first["seconds"] + then["seconds"],
+        stages=stages,
+        counts=counts,
+        peak_rss_mb=max(first["peak_rss_mb"], then["peak_rss_mb"]),
+    )
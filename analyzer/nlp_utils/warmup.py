@@ -0,0 +1,96 @@
+# nlp_utils/warmup.py
+import gc
+import logging
+import threading
+import time
+
+from .spacy_model import get_nlp
+from . import lexicons
+
+logger = logging.getLogger(__name__)
+
+_STATE = {"ready": False, "seconds": None, "started": False}
+_lock = threading.Lock()
+
+
+def load_models():
+    """The spaCy pipeline, the compiled category lexicons and a primed tokenizer cache.
+
+    Run before the first memory zone (spacy_model.memory_zone): whatever is
+    added to the vocab here is kept for the life of the process.
+    """
+    nlp = get_nlp()
+    lexicons.current()
+    # The tokenizer caches nothing inside memory zones, so cache the most common words now
+    words = sorted(nlp.Defaults.stop_words)
+    nlp.make_doc(" ".join(words + [word.title() for word in words]))
+    return nlp
+
+
+def warm_up(freeze: bool = True, models: bool = True) -> float:
+    """Load everything the request path would otherwise build lazily.
+
+    Meant to run once in the gunicorn master (preload_app) before workers are
+    forked: the spaCy pipeline, the category lexicons and the PDF/text
+    libraries end up in memory pages the workers share copy-on-write. With
+    `freeze`, the surviving objects are moved to the permanent GC generation
+    so collections in the workers do not touch (and un-share) those pages.
+    With `models=False` (analysis served by the NLP server) spaCy is not loaded.
+
+    Returns the warm-up duration in seconds.
+    """
+    _STATE["started"] = True
+    started = time.perf_counter()
+
+    if models:
+        nlp = load_models()
+        # One tiny parse so lazily-initialised pipeline internals are allocated now.
+        nlp("Warm-up: Patient Name: Jane Doe, BP 120/80 mmHg, Revenue of 10 Cr.")
+
+    # Heavy libraries only imported on first use (see spacy_model.get_nlp)
+    import fitz  # noqa: F401  PyMuPDF
+    import docx  # noqa: F401
+    from . import pdf_generator  # noqa: F401  ReportLab
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+
+    _STATE["seconds"] = time.perf_counter() - started
+    _STATE["ready"] = True
+    return _STATE["seconds"]
+
+
+def start_in_background(models: bool = True) -> bool:
+    """
+    Run warm_up() (without `freeze`) in a daemon thread, unless a warm-up has
+    already run or started in this process; True if this call started it.
+
+    For servers without gunicorn.conf.py's hooks (runserver, ASGI servers,
+    gunicorn with another config): the first /ready/ probe, or startup with
+    DOCMAGE_WARM_UP_ON_START, starts it, and the probe reports 200 once done.
+    """
+    with _lock:
+        if _STATE["started"]:
+            return False
+        _STATE["started"] = True
+    threading.Thread(target=_warm_up_in_background, args=(models,), name="docmage-warm-up", daemon=True).start()
+    return True
+
+
+def _warm_up_in_background(models):
+    try:
+        seconds = warm_up(freeze=False, models=models)
+    except Exception:
+        logger.exception("DocMage warm-up failed; the next /ready/ probe retries it")
+        _STATE["started"] = False
+        return
+    logger.info("DocMage warm-up finished in %.2fs", seconds)
+
+
+def is_ready() -> bool:
+    return _STATE["ready"]
+
+
+def warm_up_seconds():
+    return _STATE["seconds"]
@@ -0,0 +1,49 @@
+"""Generated documents for soak and load tests, in the shape of real uploads."""
+import string
+
+TEMPLATES = {
+    "medical": (
+        "Patient Name: {name}\nDOB: {date}\nConsultant: Dr. {surname}\n"
+        "Clinical Summary\nThe patient reported {word} and {word} for {n} weeks. "
+        "BP {n}/{n} mmHg, HR {n} bpm. Started {word} {n} mg daily.\n"
+        "Impressions\n{word} syndrome, rule out {word}.\nParameter\nFollow-up in {n} weeks."
+    ),
+    "legal": (
+        "Case Title: {surname} vs {word} Ltd\nCase Number: {code}\nJurisdiction: {word} High Court\n"
+        "Case Summary:\nThe plaintiff alleges breach of the {word} clause signed on {date}. "
+        "The defendant claims force majeure.\nNext Hearing: {date}"
+    ),
+    "financial": (
+        "Company: {word} Technologies\nFiscal Period: Q{q} FY{year}\n"
+        "Revenue grew {n}% on {word} subscriptions; gross margin was {n}.{n}%.\n"
+        "Revenue\n {n}.{n} Cr\nNet Income\n {n}.{n} Cr\nARR: {n}.{n} Cr"
+    ),
+    "general": (
+        "{name} wrote about {word}, {word} and {word} on {date}. "
+        "Reference {code} covers the {word} project and its {n} milestones."
+    ),
+}
+
+
+
+def generate_document(rng, category=None) -> str:
+    """A document of `category` (random if None) with fresh words, names and numbers from `rng`."""
+    def word():
+        # Mostly unseen tokens, as user uploads are: names, codes, typos
+        return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+    template = TEMPLATES[category] if category else rng.choice(list(TEMPLATES.values()))
+    fields = {
+        "name": f"{word().title()} {word().title()}",
+        "surname": word().title(),
+        "date": f"{rng.randint(1950, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "code": f"{rng.randint(2000, 2025)}-{word().upper()}-{rng.randint(1000, 999999)}",
+        "q": rng.randint(1, 4),
+        "year": rng.randint(2015, 2030),
+    }
+    # Every {word} and {n} placeholder gets its own value
+    parts = template.split("{word}")
+    text = parts[0] + "".join(word() + part for part in parts[1:])
+    parts = text.split("{n}")
+    text = parts[0] + "".join(str(rng.randint(1, 250)) + part for part in parts[1:])
+    return text.format(**fields)
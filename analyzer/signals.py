@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from . import aggregates
+from .exports import remove_summary_pdfs
+from .models import Document
+
+
+@receiver(pre_delete, sender=Document)
+def remove_from_aggregates(sender, instance, **kwargs):
+    """Take a deleted document out of the corpus aggregates, in the deletion's transaction."""
+    # As stored: the instance being deleted may be stale or loaded with only some fields
+    stored = Document.objects.filter(pk=instance.pk).only('category', 'uploaded_at', 'raw_text', 'highlight_spans').first()
+    if stored is not None:
+        aggregates.update(removed=[aggregates.snapshot(stored)])
+
+
+@receiver(pre_delete, sender=Document)
+def remove_summary_files(sender, instance, **kwargs):
+    """Delete a deleted document's rendered summary PDFs once the deletion commits."""
+    doc_id = instance.pk
+    transaction.on_commit(lambda: remove_summary_pdfs([doc_id]))
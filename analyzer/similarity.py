@@ -0,0 +1,171 @@
+"""
+"Related documents": hashed TF-IDF vectors in an append-only, memory-mapped matrix.
+
+Files under settings.DOCMAGE_SIMILARITY_DIR:
+  vectors.f32  one L2-normalised float32 row of HASH_DIM values per document
+  ids.i64      the Document id of each row, same order
+  df.i64       document frequency of every hashed term (for IDF weights)
+
+Rows are weighted with the IDF known when they were appended; compaction
+re-weights everything with the current IDF and drops deleted documents.
+Queries are one matrix-vector product over the mapped rows.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from .nlp_utils.tfidf import HASH_DIM
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+DF_FILE = "df.i64"
+ROW_BYTES = HASH_DIM * 4
+
+
+def _store_dir():
+    path = settings.DOCMAGE_SIMILARITY_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _locked():
+    """Exclusive lock serialising appends and compaction across worker processes."""
+    with open(os.path.join(_store_dir(), ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_df(directory):
+    path = os.path.join(directory, DF_FILE)
+    if os.path.exists(path):
+        return np.fromfile(path, dtype=np.int64)
+    return np.zeros(HASH_DIM, dtype=np.int64)
+
+
+def _idf(df, total):
+    return np.log((1.0 + total) / (1.0 + df)) + 1.0
+
+
+def _dense_counts(term_counts):
+    counts = np.zeros(HASH_DIM, dtype=np.float32)
+    for bucket, count in (term_counts or {}).items():
+        counts[int(bucket)] = count
+    return counts
+
+
+def _weigh(counts, idf):
+    vector = (np.log1p(counts) * idf).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _write_atomic(path, array):
+    tmp = f"{path}.tmp"
+    array.tofile(tmp)
+    os.replace(tmp, path)
+
+
+# ---------- Writing ----------
+
+def add_document(doc_id, term_counts):
+    """Append one document's vector (no-op for documents without terms)."""
+    counts = _dense_counts(term_counts)
+    if not counts.any():
+        return
+    directory = _store_dir()
+    with _locked():
+        ids_path = os.path.join(directory, IDS_FILE)
+        rows = os.path.getsize(ids_path) // 8 if os.path.exists(ids_path) else 0
+        df = _read_df(directory)
+        df += counts > 0
+        vector = _weigh(counts, _idf(df, rows + 1))
+        # Vector first, id second: readers size the matrix from ids.i64, so a
+        # half-finished append is never visible.
+        with open(os.path.join(directory, VECTORS_FILE), "ab") as f:
+            f.write(vector.tobytes())
+        with open(ids_path, "ab") as f:
+            f.write(np.int64(doc_id).tobytes())
+        _write_atomic(os.path.join(directory, DF_FILE), df)
+
+
+def rebuild(documents):
+    """
+    Compaction: rewrite the matrix from `(id, term_counts)` pairs with fresh IDF
+    weights, dropping documents that no longer exist. Streams twice over the
+    input (document frequencies, then vectors), so memory stays at one row.
+    """
+    directory = _store_dir()
+    with _locked():
+        df = np.zeros(HASH_DIM, dtype=np.int64)
+        total = 0
+        for _, term_counts in documents():
+            counts = _dense_counts(term_counts)
+            if counts.any():
+                df += counts > 0
+                total += 1
+        idf = _idf(df, total)
+
+        vectors_tmp = os.path.join(directory, VECTORS_FILE + ".tmp")
+        ids_tmp = os.path.join(directory, IDS_FILE + ".tmp")
+        with open(vectors_tmp, "wb") as vectors, open(ids_tmp, "wb") as ids:
+            for doc_id, term_counts in documents():
+                counts = _dense_counts(term_counts)
+                if counts.any():
+                    vectors.write(_weigh(counts, idf).tobytes())
+                    ids.write(np.int64(doc_id).tobytes())
+        os.replace(vectors_tmp, os.path.join(directory, VECTORS_FILE))
+        os.replace(ids_tmp, os.path.join(directory, IDS_FILE))
+        _write_atomic(os.path.join(directory, DF_FILE), df)
+    return total
+
+
+# ---------- Reading ----------
+
+_MAPPED = {"key": None, "vectors": None, "ids": None, "rows": None}
+
+
+def _mapped():
+    """(vectors, ids, {id: row}) for the current files, remapped only when they change."""
+    directory = _store_dir()
+    ids_path = os.path.join(directory, IDS_FILE)
+    vectors_path = os.path.join(directory, VECTORS_FILE)
+    if not os.path.exists(ids_path):
+        return None, None, {}
+    stat = os.stat(ids_path)
+    key = (stat.st_ino, stat.st_size)
+    if _MAPPED["key"] != key:
+        n = min(stat.st_size // 8, os.path.getsize(vectors_path) // ROW_BYTES)
+        if n == 0:
+            return None, None, {}
+        ids = np.fromfile(ids_path, dtype=np.int64, count=n)
+        vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(n, HASH_DIM))
+        # Later rows win: a re-analysed document's newest vector is the live one
+        _MAPPED.update(key=key, vectors=vectors, ids=ids, rows={int(i): r for r, i in enumerate(ids)})
+    return _MAPPED["vectors"], _MAPPED["ids"], _MAPPED["rows"]
+
+
+def related(doc_id, k=5):
+    """[(document_id, cosine similarity), ...] for the `k` documents most similar to `doc_id`."""
+    vectors, ids, rows = _mapped()
+    if vectors is None or doc_id not in rows:
+        return []
+    scores = vectors @ vectors[rows[doc_id]]
+    scores[ids == doc_id] = -1.0
+    # Over-fetch: a re-analysed document can still have a stale row until compaction
+    candidates = min(2 * k, len(scores))
+    top = np.argpartition(-scores, candidates - 1)[:candidates]
+    top = top[np.argsort(-scores[top])]
+    results, seen = [], set()
+    for r in top:
+        doc = int(ids[r])
+        if scores[r] > 0 and doc not in seen and rows[doc] == r:
+            results.append((doc, float(scores[r])))
+            seen.add(doc)
+    return results[:k]
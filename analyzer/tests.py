@@ -1,3 +1,527 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+
+class ImportTimeBudgetTests(SimpleTestCase):
+    """Loading the URLconf must stay cheap: no NLP/PDF libraries at import time."""
+
+    # Cumulative microseconds allowed for `import analyzer.urls` in a cold interpreter.
+    URLCONF_BUDGET_US = 1_000_000
+    HEAVY_MODULES = ("spacy", "fitz", "pymupdf", "docx", "reportlab", "thinc", "torch", "transformers")
+
+    def _importtime(self):
+        code = (
+            "import django; django.setup(); "
+            "import analyzer.urls"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="smart_doc_analyzer.settings")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        timings = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                timings[name.strip()] = int(cumulative)
+        return timings
+
+    def test_urlconf_does_not_import_heavy_dependencies(self):
+        timings = self._importtime()
+        heavy = sorted(name for name in timings if name.split(".")[0] in self.HEAVY_MODULES)
+        self.assertEqual(heavy, [], f"URLconf import pulled in heavy modules: {heavy[:10]}")
+
+    def test_urlconf_import_within_budget(self):
+        timings = self._importtime()
+        self.assertIn("analyzer.urls", timings)
+        self.assertLess(timings["analyzer.urls"], self.URLCONF_BUDGET_US)
+
+
+class SummarizerBackendTests(SimpleTestCase):
+    """The local-model summarizer backend, with the stub model (no checkpoint, no network)."""
+
+    def test_input_tokens_are_capped(self):
+        from analyzer.nlp_utils.summary_pool import StubModel
+        self.assertEqual(StubModel().generate(["one two three four. five six."], 3, 10), ["one two three"])
+
+    def test_concurrent_requests_are_batched(self):
+        from analyzer.nlp_utils.summary_pool import SummaryPool
+        pool = SummaryPool("stub:0.2", max_batch=4, max_wait=0.1)
+        self.addCleanup(pool.close)
+        pool.summarize("Warm-up.", timeout=60)
+        futures = [pool.submit(f"Request {i}. It has two sentences.") for i in range(4)]
+        self.assertEqual([f.result(10) for f in futures], [f"Request {i}. It has two sentences." for i in range(4)])
+        self.assertEqual((pool.stats["batches"], pool.stats["batched_requests"]), (2, 5))
+
+    def test_timeout_falls_back_to_heuristic_overview(self):
+        from analyzer.nlp_utils.summary_backends import LocalModelBackend
+        backend = LocalModelBackend(model="stub:5", timeout=0.2)
+        self.addCleanup(lambda: backend._pool.close())
+        self.assertEqual(backend.overview("Some text to summarize.", "general", "Heuristic overview."), "Heuristic overview.")
+        self.assertEqual(backend.fallbacks, 1)
+        # Marked, so the result is neither cached nor kept as the model's
+        self.assertEqual(
+            backend.overview_or_fallback("Some text to summarize.", "general", "Heuristic overview."),
+            ("Heuristic overview.", True),
+        )
+
+
+class OverviewFieldTests(SimpleTestCase):
+    """FieldIndex lookups find what the per-field regex searches they replaced found."""
+
+    TEXTS = {
+        "medical": [
+            "Patient Name: Asha Rao\nDOB: 1980-02-03\nClinical Summary: chest pain for 3 days\nImpressions: GERD.\nParameter Value",
+            "Clinical Summary chest pain, nausea Impressions GERD, anxiety Parameter LDL-C 130",
+            "Clinical Summary\nchest discomfort, no impressions recorded\n" * 50,
+        ],
+        "legal": [
+            "Case Title: A v. B\nCase Number: 12\nCase Summary: The parties dispute\nthe clause.\nNext Hearing: May",
+            "see Case Summary:\nthe parties dispute the clause\nand the hearing is pending\n" * 20,
+        ],
+        "financial": [
+            "Company: Acme\nTotal Revenue\n\n  45.0 Cr\nRevenue\n50 Cr\nNet Income\n4.5 Cr\nGross Margin: 61%",
+            "Revenue:\n45 Cr\nRevenue Growth\n4 Cr\nRevenue\nn/a\nQ3 Revenue  \n 7 Cr\nARR: 9.5 Cr",
+            "Revenue" + "\n" * 2000,
+        ],
+    }
+
+    def _lookups(self, index, category):
+        from analyzer.nlp_utils.summarizer import AGE_VALUE, CRORE_VALUE, DATE_VALUE, PERCENT_VALUE
+        return {
+            "medical": lambda: [
+                index.field("Patient Name"), index.field("DOB", DATE_VALUE), index.field("Age", AGE_VALUE),
+                index.between("Clinical Summary", "Impressions"), index.between("Impressions", "Parameter"),
+            ],
+            "legal": lambda: [
+                index.field("Case Title"), index.field("Case Number"), index.field("Jurisdiction"),
+                index.field("Plaintiff"), index.field("Defendant"), index.block("Case Summary"),
+            ],
+            "financial": lambda: [
+                index.field("Company"), index.field("Fiscal Period"),
+                index.after_line_ending("Revenue", CRORE_VALUE), index.after_line_ending("Net Income", CRORE_VALUE),
+                index.field("ARR", CRORE_VALUE), index.field("Gross Margin", PERCENT_VALUE),
+            ],
+        }[category]()
+
+    def test_lookups_match_legacy_searches(self):
+        import random
+        import re
+        from analyzer.management.commands.bench_overview import LEGACY_PATTERNS
+        from analyzer.nlp_utils.field_index import FieldIndex
+        from analyzer.sample_documents import generate_document
+
+        rng = random.Random(0)
+        for category, texts in self.TEXTS.items():
+            for text in texts + [generate_document(rng, category) for _ in range(20)]:
+                legacy = [re.search(pattern, text, flags) for pattern, flags in LEGACY_PATTERNS[category]]
+                legacy = [match.group(1).strip() if match else None for match in legacy]
+                indexed = [value.strip() if value else None for value in self._lookups(FieldIndex(text), category)]
+                self.assertEqual(indexed, legacy, text[:80])
+
+
+class FastTierLatencyTests(SimpleTestCase):
+    """analyze_fast stays interactive on a 10 KB paste (README, Fast tier)."""
+
+    # Median over the runs, best of ROUNDS: the README's p99 figures vary too much on shared machines to assert
+    MEDIAN_BUDGET_MS = 50
+    RUNS = 30
+    ROUNDS = 3
+
+    def test_financial_paste_within_budget(self):
+        import random
+        import statistics
+        import time
+        from analyzer.nlp_utils.pipeline import analyze_fast
+        from analyzer.nlp_utils.spacy_model import get_nlp
+        from analyzer.sample_documents import generate_document
+
+        try:
+            get_nlp()
+        except OSError:
+            self.skipTest("spaCy model not installed")
+        rng = random.Random(0)
+        texts = []
+        for _ in range(self.RUNS):
+            parts = []
+            while sum(map(len, parts)) < 10240:
+                parts.append(generate_document(rng, "financial"))
+            texts.append("\n\n".join(parts)[:10240])
+        analyze_fast(texts[0], "financial")  # lexicons and tokenizer cache
+        medians = []
+        for _ in range(self.ROUNDS):
+            latencies = []
+            for text in texts:
+                started = time.perf_counter()
+                analyze_fast(text, "financial")
+                latencies.append((time.perf_counter() - started) * 1000)
+            medians.append(statistics.median(latencies))
+        self.assertLess(min(medians), self.MEDIAN_BUDGET_MS)
+
+
+class LexiconMatcherTests(SimpleTestCase):
+    """The token trie compiled from the JSON sources matches what a PhraseMatcher on LOWER matched."""
+
+    def _phrase_matches(self, nlp, sources, doc):
+        # The PhraseMatcher the trie replaced, with its hyphen/space variants
+        from spacy.matcher import PhraseMatcher
+        matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        for category, source in sources.items():
+            for subcategory, keywords in source["labels"].items():
+                patterns = []
+                for keyword in keywords:
+                    patterns.append(nlp.make_doc(keyword))
+                    if "-" in keyword:
+                        patterns.append(nlp.make_doc(keyword.replace("-", " ")))
+                    if " " in keyword:
+                        patterns.append(nlp.make_doc(keyword.replace(" ", "-")))
+                matcher.add(f"{category}/{subcategory}", patterns)
+        strings = nlp.vocab.strings
+        return sorted((*strings[match_id].split("/", 1), start, end) for match_id, start, end in matcher(doc))
+
+    def test_matches_equal_phrase_matcher(self):
+        import random
+        from analyzer.nlp_utils import lexicons
+        from analyzer.nlp_utils.spacy_model import get_nlp
+        from analyzer.sample_documents import generate_document
+
+        try:
+            nlp = get_nlp()
+        except OSError:
+            self.skipTest("spaCy model not installed")
+        sources = lexicons.load_sources()
+        matcher = lexicons.LexiconMatcher({
+            category: lexicons.compile_category(source["labels"], nlp) for category, source in sources.items()
+        })
+        keywords = [keyword for source in sources.values() for words in source["labels"].values() for keyword in words]
+        self.assertTrue(any("-" in keyword for keyword in keywords) and any(" " in keyword for keyword in keywords))
+        # Every keyword as written, upper-cased, and with hyphens and spaces swapped; run together, so
+        # that terms overlap and one keyword's tokens start or end another's
+        variants = []
+        for keyword in keywords:
+            variants += [keyword, keyword.upper(), keyword.replace("-", " "), keyword.replace(" ", "-")]
+        rng = random.Random(0)
+        texts = [" ".join(variants), "-".join(variants), ", ".join(reversed(variants))]
+        for category in ("general", *lexicons.LEXICON_CATEGORIES):
+            texts += [generate_document(rng, category) for _ in range(10)]
+            texts.append(" ".join(generate_document(rng, category) + " " + rng.choice(keywords) for _ in range(20)))
+        for text in texts:
+            doc = nlp.make_doc(text)
+            self.assertEqual(sorted(matcher(doc)), self._phrase_matches(nlp, sources, doc), text[:80])
+
+
+class AggregateDeltaTests(TestCase):
+    """The deltas applied on upload, category change, re-analysis and deletion add up to a full rebuild."""
+
+    def _stored(self):
+        from analyzer.models import CategoryDayCount, HighlightTermCount
+        return (
+            sorted(HighlightTermCount.objects.values_list('category', 'day', 'subcategory', 'term', 'documents', 'mentions')),
+            sorted(CategoryDayCount.objects.values_list('category', 'day', 'documents')),
+        )
+
+    def assertMatchesRebuild(self, step):
+        from analyzer import aggregates
+        from analyzer.models import Document
+        maintained = self._stored()
+        with transaction.atomic():
+            aggregates.rebuild(Document.objects.all())
+            rebuilt = self._stored()
+            transaction.set_rollback(True)
+        self.assertEqual(maintained, rebuilt, step)
+        return maintained
+
+    def test_deltas_match_rebuild(self):
+        import random
+        from analyzer import aggregates
+        from analyzer.models import Document
+        from analyzer.nlp_utils import doc_store
+        from analyzer.nlp_utils.pipeline import analyze_raw_text
+        from analyzer.nlp_utils.spacy_model import get_nlp
+        from analyzer.sample_documents import generate_document
+
+        try:
+            get_nlp()
+        except OSError:
+            self.skipTest("spaCy model not installed")
+        # Keep test texts out of the doc store
+        patcher = mock.patch.object(doc_store, "DOC_STORE", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        rng = random.Random(0)
+        documents = []
+        for i, category in enumerate(("financial", "legal", "medical", "financial", "general")):
+            analysis = analyze_raw_text(generate_document(rng, category), category)
+            analysis.pop("trace")
+            document = Document.objects.create(title=f"Document {i}", file=f"documents/{i}.pdf", **analysis)
+            # Two upload days
+            document.uploaded_at = timezone.now() - timedelta(days=i % 2)
+            Document.objects.filter(pk=document.pk).update(uploaded_at=document.uploaded_at)
+            documents.append(document)
+        aggregates.record(documents)
+        terms, days = self.assertMatchesRebuild("record")
+        self.assertTrue(terms)
+        self.assertEqual(sum(count for _, _, count in days), len(documents))
+
+        # Stored by an older analysis with fewer matches, so that re-analyzing changes the counts
+        stale = documents[0]
+        spans = stale.highlight_spans
+        self.assertGreater(len(stale.highlight_spans), 1)
+        previous = aggregates.snapshot(stale)
+        stale.highlight_spans = stale.highlight_spans[::2]
+        stale.save(update_fields=['highlight_spans'])
+        aggregates.update(removed=[previous], added=[aggregates.snapshot(stale)])
+        self.assertMatchesRebuild("update")
+
+        response = self.client.post(
+            reverse('set_document_category', args=[documents[1].pk]), {'category': 'financial'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertMatchesRebuild("set_document_category")
+
+        call_command("reanalyze", stdout=StringIO())
+        self.assertMatchesRebuild("reanalyze")
+        self.assertEqual(Document.objects.get(pk=stale.pk).highlight_spans, spans)
+
+        documents[2].delete()
+        Document.objects.only('id').get(pk=documents[3].pk).delete()
+        terms, days = self.assertMatchesRebuild("delete")
+        self.assertEqual(sum(count for _, _, count in days), len(documents) - 2)
+
+
+class PageMergeTests(SimpleTestCase):
+    """A new version of a PDF analyzed from the previous version's page fragments, as if analyzed in full."""
+
+    FIELDS = ("highlights", "highlight_spans", "key_points", "summary", "insights", "category_scores", "term_counts")
+
+    def test_one_changed_page_matches_full_analysis(self):
+        import hashlib
+        import random
+        from analyzer.nlp_utils import doc_store
+        from analyzer.nlp_utils.pipeline import analyze_pages, analyze_raw_text, previous_pages
+        from analyzer.nlp_utils.spacy_model import get_nlp
+        from analyzer.sample_documents import generate_document
+
+        try:
+            get_nlp()
+        except OSError:
+            self.skipTest("spaCy model not installed")
+        patcher = mock.patch.object(doc_store, "DOC_STORE", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        rng = random.Random(0)
+
+        def page(category):
+            # Key-point sentences are split per page: end each page at a sentence end, as the whole text does
+            text = generate_document(rng, category) + "\nEnd of this page.\n"
+            return hashlib.sha1(text.encode("utf-8")).hexdigest(), text
+
+        for category in ("general", "medical", "legal", "financial"):
+            pages = [page(category) for _ in range(4)]
+            first = analyze_pages(pages, category)
+            pages[2] = page(category)
+            merged = analyze_pages(
+                pages, category,
+                previous=previous_pages(first["raw_text"], first["page_offsets"], first["page_analysis"])[1],
+            )
+            self.assertEqual(merged["page_analysis"]["reused"], 3)
+            full = analyze_raw_text("".join(text for _, text in pages), category)
+            self.assertEqual(merged["raw_text"], full["raw_text"])
+            for field in self.FIELDS:
+                self.assertEqual(merged[field], full[field], f"{category}: {field}")
+            self.assertEqual(merged["category_analysis"], full["category_analysis"], category)
+
+
+class RegexGuardTests(SimpleTestCase):
+    """Scans window by window find what one pattern.finditer finds, and stop once the budget is used up."""
+
+    def _patterns(self):
+        from analyzer.nlp_utils import highlighter, lexicons, summarizer
+        return {
+            "Duration": highlighter.DURATION_RE,
+            "Dosage": highlighter.DOSAGE_RE,
+            "Vitals": highlighter.VITALS_RE,
+            "Effective_Date": highlighter.EFFECTIVE_RE,
+            "Expiry_Date": highlighter.EXPIRY_RE,
+            "Clauses": highlighter._clause_line_re(lexicons.current()),
+            "Revenue": highlighter.REVENUE_RE,
+            "Expenditure": highlighter.EXPENDITURE_RE,
+            "Money": highlighter.MONEY_RE,
+            "Percentages": highlighter.PERCENT_RE,
+            "LDL": summarizer.LDL_VALUE,
+            "Next_Hearing": summarizer.NEXT_HEARING,
+        }
+
+    def _texts(self):
+        import random
+        from analyzer.sample_documents import generate_document
+        rng = random.Random(0)
+        text = "\n".join(generate_document(rng, category) for category in ("general", "medical", "legal", "financial") * 5)
+        # Also windows that cannot end at a line break
+        return [text, text.replace("\n", " ")]
+
+    def test_windows_match_one_scan(self):
+        from analyzer.nlp_utils import regex_guard
+        with mock.patch.object(regex_guard, "CHUNK_CHARS", 300), mock.patch.object(regex_guard, "OVERLAP_CHARS", 100):
+            for text in self._texts():
+                self.assertGreater(len(text), 10 * regex_guard.CHUNK_CHARS)
+                for name, pattern in self._patterns().items():
+                    expected = [(m.span(), m.group()) for m in pattern.finditer(text)]
+                    if any(len(group) > regex_guard.OVERLAP_CHARS for _, group in expected):
+                        # Not guaranteed (e.g. Next_Hearing runs to the end of its line); only in the one-line text
+                        self.assertNotIn("\n", text, name)
+                        continue
+                    windowed = [(m.span(), m.group()) for m in regex_guard.finditer(pattern, text, name)]
+                    self.assertEqual(windowed, expected, name)
+
+    def test_exhausted_budget_stops_scans(self):
+        import re
+        from analyzer.nlp_utils import doc_store, regex_guard
+        from analyzer.nlp_utils.pipeline import analyze_raw_text
+        from analyzer.nlp_utils.spacy_model import get_nlp
+
+        text = self._texts()[0]
+        with self.assertLogs(regex_guard.logger, "WARNING"), mock.patch.object(regex_guard, "CHUNK_CHARS", 300), \
+                regex_guard.budget(regex_guard.Budget(1e-9)) as scope:
+            found = list(regex_guard.finditer(re.compile(r"\w+"), text))
+        self.assertLess(len(found), len(text.split()))
+        self.assertEqual(scope.cut_short, [r"\w+"])
+
+        try:
+            get_nlp()
+        except OSError:
+            self.skipTest("spaCy model not installed")
+        with self.assertLogs(regex_guard.logger, "WARNING"), mock.patch.object(doc_store, "DOC_STORE", ""), \
+                mock.patch.object(regex_guard, "BUDGET_SECONDS", 1e-9):
+            analysis = analyze_raw_text(text, "legal")
+        self.assertTrue(analysis["incomplete_scans"])
+        with mock.patch.object(doc_store, "DOC_STORE", ""):
+            self.assertEqual(analyze_raw_text(text, "legal")["incomplete_scans"], [])
+
+
+class MetricParserTests(SimpleTestCase):
+    """Amounts, fiscal periods and search conditions normalized as the metrics table stores them."""
+
+    AMOUNTS = [
+        ("45.2 Cr", (452_000_000.0, "INR")),
+        ("$3.1 bn", (3_100_000_000.0, "USD")),
+        ("₹1,20,000", (120_000.0, "INR")),
+        ("Rs. 12 lakh", (1_200_000.0, "INR")),
+        ("EUR 5 million", (5_000_000.0, "EUR")),
+        ("1,234.5", (1234.5, "")),
+        ("12k", (12_000.0, "")),
+        ("abc", None),
+    ]
+    PERIODS = [
+        ("Q3 FY2025", ("FY2024-25", "Q3")),
+        ("FY 2024-25", ("FY2024-25", "")),
+        ("2024-25", ("FY2024-25", "")),
+        ("FY25", ("FY2024-25", "")),
+        ("FY2024-2025 Q1", ("FY2024-25", "Q1")),
+        ("Fiscal Period: Q4 FY2015", ("FY2014-15", "Q4")),
+        ("no period", None),
+    ]
+    CONDITIONS = [
+        ("revenue > 45.2 Cr in FY2024-25", ("revenue", "gt", 452_000_000.0, "INR", "FY2024-25", "")),
+        ("net profit <= $5 million", ("net_income", "lte", 5_000_000.0, "USD", "", "")),
+        ("revenue > 100", ("revenue", "gt", 100.0, None, "", "")),
+        ("gross_margin > 40 in Q3 FY2025", ("gross_margin", "gt", 40.0, "%", "FY2024-25", "Q3")),
+        ("temp > 101 F", ("temperature", "gt", 38.33, "°C", "", "")),
+        ("temperature >= 38.5", ("temperature", "gte", 38.5, "°C", "", "")),
+        ("dosage > 1 g", ("dosage", "gt", 1000.0, "mg", "", "")),
+        ("dose = 500 mcg", ("dosage", "exact", 0.5, "mg", "", "")),
+        ("dosage < 20", ("dosage", "lt", 20.0, "mg", "", "")),
+        ("bp systolic >= 140", ("bp_systolic", "gte", 140.0, "mmHg", "", "")),
+        ("HR > 100", ("heart_rate", "gt", 100.0, "bpm", "", "")),
+        ("spo2 < 92", ("spo2", "lt", 92.0, "%", "", "")),
+    ]
+    INVALID_CONDITIONS = [
+        ("", "Expected '<metric> <op> <value>"),
+        ("revenue", "Expected '<metric> <op> <value>"),
+        ("height > 3", "Unknown metric"),
+        ("revenue > lots", "Expected an amount"),
+        ("temp > hot", "Expected a temperature"),
+        ("revenue > 5 Cr in someday", "Expected a fiscal period"),
+        ("hr > fast", "Expected a number"),
+    ]
+
+    def test_parse_amount(self):
+        from analyzer.nlp_utils.metrics import parse_amount
+        for value, expected in self.AMOUNTS:
+            with self.subTest(value=value):
+                self.assertEqual(parse_amount(value), expected)
+
+    def test_parse_period(self):
+        from analyzer.nlp_utils.metrics import parse_period
+        for value, expected in self.PERIODS:
+            with self.subTest(value=value):
+                self.assertEqual(parse_period(value), expected)
+
+    def test_parse_condition(self):
+        from analyzer.nlp_utils.metrics import parse_condition
+        keys = ("metric", "lookup", "value", "unit", "period", "quarter")
+        for condition, expected in self.CONDITIONS:
+            with self.subTest(condition=condition):
+                self.assertEqual(parse_condition(condition), dict(zip(keys, expected)))
+        for condition, message in self.INVALID_CONDITIONS:
+            with self.subTest(condition=condition), self.assertRaisesMessage(ValueError, message):
+                parse_condition(condition)
+
+    def test_extracted_values_match_conditions(self):
+        from analyzer.nlp_utils.metrics import extract_metrics
+        metrics = extract_metrics("Fiscal Period: FY2024-25\nRevenue: ₹45.2 Cr\nTemp 101.3 F\nParacetamol 1 g")
+        self.assertEqual(
+            [(m["metric"], m["value"], m["unit"], m["period"]) for m in metrics],
+            [("revenue", 452_000_000.0, "INR", "FY2024-25"), ("temperature", 38.5, "°C", ""), ("dosage", 1000.0, "mg", "")],
+        )
+
+
+class MetricSearchTests(TestCase):
+    """/metrics/search/ answers a condition from the metrics table, and 400 with the parse error otherwise."""
+
+    def setUp(self):
+        from analyzer.metrics import index_metrics
+        from analyzer.models import Document
+        index_metrics([
+            Document.objects.create(
+                title=f"Report {revenue}", file=f"documents/{revenue}.pdf",
+                raw_text=f"Fiscal Period: FY2024-25\nRevenue: ₹{revenue} Cr\n",
+            )
+            for revenue in (45.2, 120)
+        ])
+
+    def test_matching_documents(self):
+        response = self.client.get(reverse('metric_search'), {'q': 'revenue > 100 Cr in FY2024-25'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['title'], row['value'], row['unit']) for row in response.json()['results']],
+            [("Report 120", 1_200_000_000.0, "INR")],
+        )
+
+    def test_invalid_query(self):
+        for query, message in (
+            ({}, "Expected '<metric> <op> <value>"),
+            ({'q': 'revenue > lots'}, "Expected an amount"),
+            ({'q': 'height > 3'}, "Unknown metric"),
+            ({'q': 'revenue > <b>1</b>'}, "got '<b>1</b>'"),
+            ({'q': 'revenue > 1', 'limit': 'all'}, "limit must be an integer"),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('metric_search'), query)
+                self.assertContains(response, message, status_code=400)
+                self.assertTrue(response['Content-Type'].startswith('text/plain'))
@@ -0,0 +1,67 @@
+"""
+Paged raw text for the detail page.
+
+A page is either a PDF page (Document.page_offsets, stored at extraction) or,
+for other documents, a window of about TEXT_PAGE_CHARS characters ending at a
+line break. Highlights are marked up from the stored Document.highlight_spans,
+so serving a page never re-runs the highlighter.
+"""
+import bisect
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+TEXT_PAGE_CHARS = 20_000
+
+
+def page_starts(doc):
+    """Start offset of every page of `doc.raw_text` (at least one page)."""
+    text = doc.raw_text or ""
+    if doc.page_offsets:
+        return list(doc.page_offsets)
+    starts, start = [], 0
+    while True:
+        starts.append(start)
+        end = start + TEXT_PAGE_CHARS
+        if end >= len(text):
+            return starts
+        newline = text.rfind("\n", start, end)
+        start = newline + 1 if newline > start else end
+
+
+def page_bounds(doc, number):
+    """(start, end, page count) of 1-based page `number`; raises IndexError if out of range."""
+    starts = page_starts(doc)
+    if not 1 <= number <= len(starts):
+        raise IndexError(number)
+    end = starts[number] if number < len(starts) else len(doc.raw_text or "")
+    return starts[number - 1], end, len(starts)
+
+
+def render_marked_text(text, spans, start, end):
+    """
+    HTML-escaped text[start:end] with each highlight span wrapped in
+    <mark title="Key">. `spans` are [start, end, key] sorted by start; spans
+    overlapping an earlier one, or crossing the page boundary, are skipped.
+    """
+    parts, position = [], start
+    first = bisect.bisect_left(spans, start, key=lambda span: span[0])
+    for span_start, span_end, key in spans[first:]:
+        if span_start >= end:
+            break
+        if span_start < position or span_end > end:
+            continue
+        parts.append(escape(text[position:span_start]))
+        parts.append(f'<mark title="{escape(key.replace("_", " "))}">{escape(text[span_start:span_end])}</mark>')
+        position = span_end
+    parts.append(escape(text[position:end]))
+    return mark_safe("".join(parts))
+
+
+def render_page(doc, number, spans=None):
+    """{'page', 'pages', 'html'} for 1-based page `number` of `doc` (highlights: `spans` or the stored ones)."""
+    start, end, pages = page_bounds(doc, number)
+    if spans is None:
+        spans = doc.highlight_spans
+    html = render_marked_text(doc.raw_text or "", spans or [], start, end)
+    return {"page": number, "pages": pages, "html": html}
@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from .models import AnalysisTrace
+
+# Percentiles of the run time reported per category and doc type
+PERCENTILES = (50, 90, 99)
+
+
+def trace_for(document, run: dict, analysis: dict, source: str) -> AnalysisTrace:
+    """
+    Unsaved AnalysisTrace of `document` from the "trace" of an analysis
+    result (`run`, popped by the caller: it is not a Document field) and the
+    other fields of the result.
+    """
+    counts = run["counts"]
+    raw_text = analysis.get("raw_text", document.raw_text) or ""
+    page_offsets = analysis.get("page_offsets", document.page_offsets)
+    return AnalysisTrace(
+        document=document,
+        source=source,
+        category=analysis.get("category", document.category),
+        doc_type=document.doc_type,
+        analyzer_version=run.get("analyzer_version", ""),
+        seconds=run["seconds"],
+        stages=run["stages"],
+        text_length=len(raw_text),
+        page_count=len(page_offsets) if page_offsets else 1,
+        sentence_count=counts.get("sentences", 0),
+        entity_count=counts.get("entities", 0),
+        match_count=len(analysis.get("highlight_spans") or ()),
+        peak_rss_mb=run.get("peak_rss_mb"),
+    )
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return None
+    rank = max(1, -(-p * len(values) // 100))  # ceil(p / 100 * n)
+    return values[rank - 1]
+
+
+def percentile_summary(traces=None) -> list:
+    """
+    One row per (category, doc_type): runs, the PERCENTILES and max of seconds,
+    median text length and peak memory. Computed in Python, as SQLite has no
+    percentile aggregate; pass a filtered queryset to bound the work.
+    """
+    traces = AnalysisTrace.objects.all() if traces is None else traces
+    groups = defaultdict(lambda: ([], [], []))
+    for category, doc_type, seconds, text_length, peak_rss_mb in traces.values_list(
+        'category', 'doc_type', 'seconds', 'text_length', 'peak_rss_mb',
+    ).iterator():
+        group = groups[category, doc_type]
+        group[0].append(seconds)
+        group[1].append(text_length)
+        if peak_rss_mb is not None:
+            group[2].append(peak_rss_mb)
+    rows = []
+    for (category, doc_type), (seconds, lengths, memory) in sorted(groups.items()):
+        seconds.sort()
+        lengths.sort()
+        rows.append({
+            'category': category,
+            'doc_type': doc_type,
+            'runs': len(seconds),
+            'percentiles': [percentile(seconds, p) for p in PERCENTILES],
+            'max': seconds[-1],
+            'median_length': percentile(lengths, 50),
+            'max_rss_mb': max(memory) if memory else None,
+        })
+    return rows
@@ -6,8 +6,18 @@ urlpatterns = [
     path('upload/', views.upload_document, name='upload_document'),
     path('documents/', views.document_list, name='document_list'),
     path('documents/<int:doc_id>/', views.document_detail, name='document_detail'),
+    path('documents/<int:doc_id>/text/', views.document_text_page, name='document_text_page'),
+    path('documents/<int:doc_id>/category/', views.set_document_category, name='set_document_category'),
     path('analyze-text/', views.analyze_text, name='analyze_text'),  # ✅ Add this line
+    path('analyze-text/stream/', views.analyze_text_stream, name='analyze_text_stream'),
     path('download-summary/<int:doc_id>/', views.download_summary_pdf, name='download_summary_pdf'),
+    path('export/summaries.zip', views.export_summaries, name='export_summaries'),
+    path('export/analysis.ndjson', views.export_analysis, name='export_analysis'),
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('metrics/search/', views.metric_search, name='metric_search'),
+    path('ready/', views.readiness, name='readiness'),
+    path('cache/analysis/', views.analysis_cache_stats, name='analysis_cache_stats'),
+    path('summarizer/', views.summarizer_stats, name='summarizer_stats'),
 
 
 ]
@@ -1,15 +1,39 @@
+from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import DocumentForm, TextAnalysisForm
 from .models import Document
-from .nlp_utils.extract_text import extract_text
-from .nlp_utils.summarizer import summarize_structured_with_insights
-from .nlp_utils.highlighter import extract_highlights, CATEGORY_LABELS
-from django.http import FileResponse, Http404
-from .nlp_utils.pdf_generator import generate_summary_pdf
+from . import aggregates, analysis_cache
+from .dedup import find_near_duplicates, index_minhash
+from .metrics import filter_metrics, index_metrics
+from .exports import filter_documents, iter_analysis_batches, ndjson_lines, remove_summary_pdfs, stream_summary_zip, summary_job
+from .nlp_client import (
+    analyze_raw_text, analyze_changed_regions, analyze_fast, analyze_pages, analyze_sections, iter_analysis_sections,
+    extract_highlights, summarize_structured_with_insights,
+)
+from .nlp_utils.extract_text import extract_pdf_pages, extract_text_pages
+from .nlp_utils.summarizer import generate_insights
+from .nlp_utils import lexicons, summary_backends, trace
+from .nlp_utils.minhash import signature
+from .nlp_utils.pipeline import AUTO_CATEGORY, FAST_TIER, previous_pages
+from .nlp_utils.warmup import is_ready, start_in_background, warm_up_seconds
+from .text_pages import render_page
+from .traces import trace_for
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
 from django.utils.text import slugify
 from itertools import chain
 from django.conf import settings
-import os
+from django.db import transaction
+import json
+import time
+
+# What re-analysis reuses from a previous version or near-duplicate of an upload
+REUSE_FIELDS = (
+    'raw_text', 'category', 'key_points', 'highlights', 'highlight_spans', 'category_analysis',
+    'term_counts', 'page_offsets', 'page_analysis',
+)
 
 
 def home(request):
@@ -21,53 +45,191 @@ def upload_document(request):
         form = DocumentForm(request.POST, request.FILES)
         if form.is_valid():
             document = form.save()
-            file_path = document.file.path
+            previous = form.cleaned_data.get('previous_version')
+            if previous:
+                previous = Document.objects.only(*REUSE_FIELDS).get(pk=previous.pk)
+            pages = None
+            with trace.collect() as run:
+                with trace.stage("extract"):
+                    if document.doc_type == 'pdf':
+                        # Pages whose content is unchanged from the previous version are not extracted again
+                        known_pages = previous_pages(
+                            previous.raw_text, previous.page_offsets, previous.page_analysis,
+                        )[0] if previous else {}
+                        pages = extract_pdf_pages(document.file.path, known_pages)
+                        raw_text = "".join(text for _, text in pages)
+                    else:
+                        raw_text, page_offsets = extract_text_pages(document.file.path, document.doc_type)
+                with trace.stage("near_duplicates"):
+                    minhash = signature(raw_text)
+                    near_duplicates = find_near_duplicates(minhash, exclude_id=document.id)
+            extracted = run.as_dict()
+            source = near_duplicates[0][0] if near_duplicates else None
+            if source:
+                messages.info(
+                    request,
+                    f'"{document.title}" is a near-duplicate of #{source.id} "{source.title}" '
+                    f'({near_duplicates[0][1]:.0%} similar).'
+                )
+
+            category = AUTO_CATEGORY if form.detect_category else document.category
+            if previous:
+                source = previous
+            elif source and form.cleaned_data.get('reuse_near_duplicate'):
+                source = Document.objects.only(*REUSE_FIELDS).get(pk=source.pk)
+            else:
+                source = None
 
-            raw_text = extract_text(file_path, document.doc_type)
-            structured_summary = summarize_structured_with_insights(raw_text, document.category)
-            highlights = extract_highlights(raw_text, document.category)
+            if pages is not None:
+                # Page fragments cover every category, so any source that has them is reusable
+                fragments = previous_pages(source.raw_text, source.page_offsets, source.page_analysis)[1] if source else []
+                analysis = analyze_pages(pages, category, previous=fragments, minhash=minhash)
+                reused = analysis['page_analysis']['reused']
+                if reused:
+                    messages.info(
+                        request,
+                        f'Re-analyzed {len(pages) - reused} of {len(pages)} pages; '
+                        f'the other {reused} are unchanged from #{source.id}.'
+                    )
+            else:
+                if source:
+                    # Sources analyzed before every category and term counts were stored are analyzed in full
+                    analysis = analyze_changed_regions(raw_text, category, {
+                        'raw_text': source.raw_text,
+                        'category': source.category,
+                        'category_analysis': source.category_analysis,
+                        'term_counts': source.term_counts,
+                    }, minhash=minhash)
+                else:
+                    analysis = analyze_raw_text(raw_text, category, minhash=minhash)
+                analysis['page_offsets'] = page_offsets
 
-            document.raw_text = raw_text
-            document.summary = structured_summary.get("overview", "")
-            document.key_points = structured_summary.get("key_points", [])
-            document.highlights = highlights
-            document.save(update_fields=['raw_text', 'summary', 'key_points', 'highlights'])
+            # The analysis may have run in the NLP server: its trace starts after the extraction
+            analysis_trace = trace_for(document, trace.merge(extracted, analysis.pop('trace')), analysis, 'upload')
+            started = time.perf_counter()
+            for field, value in analysis.items():
+                setattr(document, field, value)
+            with transaction.atomic():
+                document.save(update_fields=list(analysis))
+                index_minhash([document])
+                index_metrics([document])
+                aggregates.record([document])
+            from . import similarity  # numpy, imported on first use
+            similarity.add_document(document.id, document.term_counts)
+            analysis_trace.stages['save'] = time.perf_counter() - started
+            analysis_trace.seconds += analysis_trace.stages['save']
+            analysis_trace.save()
 
             return redirect('document_list')
     else:
-        form = DocumentForm()
+        # "Upload a new version" on a document's page preselects it
+        form = DocumentForm(initial={'previous_version': request.GET.get('previous_version')})
     return render(request, 'analyzer/upload.html', {'form': form})
 
 
 def document_list(request):
-    documents = Document.objects.all().order_by('-uploaded_at')
+    # Only what the list shows: the rows also hold the text and every stored analysis
+    documents = Document.objects.only('id', 'title', 'category', 'doc_type', 'uploaded_at').order_by('-uploaded_at')
     return render(request, 'analyzer/list.html', {'documents': documents})
 
 
 def document_detail(request, doc_id):
-    doc = get_object_or_404(Document, id=doc_id)
-    raw_text = doc.raw_text or extract_text(doc.file.path, doc.doc_type)
-    highlights = doc.highlights or extract_highlights(raw_text, doc.category)
+    # incomplete_scans is shown on the page; the other per-page and similarity columns are not read here
+    doc = get_object_or_404(Document.objects.defer('page_analysis', 'term_counts', 'minhash'), id=doc_id)
+    from . import similarity  # numpy, imported on first use
+    related_scores = dict(similarity.related(doc.id, k=5))
+    related_documents = sorted(
+        Document.objects.filter(id__in=related_scores).only('id', 'title', 'category'),
+        key=lambda d: related_scores[d.id], reverse=True,
+    )
+    if doc.raw_text is None:
+        # Uploaded before raw text was stored: extract once and keep it
+        doc.raw_text, doc.page_offsets = extract_text_pages(doc.file.path, doc.doc_type)
+        doc.save(update_fields=['raw_text', 'page_offsets'])
+    raw_text = doc.raw_text
+
+    # ?category= shows the analysis stored for another category (nothing is recomputed)
+    categories = doc.category_analysis or {}
+    category = request.GET.get('category')
+    if category not in categories:
+        category = doc.category
+    stored = categories.get(category)
+    spans = stored['highlight_spans'] if stored else None
+    highlights = (stored or {}).get('highlights') or doc.highlights or extract_highlights(raw_text, doc.category)
 
-    structured_summary = summarize_structured_with_insights(raw_text, doc.category)
-    overview = structured_summary.get("overview", "")
-    key_points = structured_summary.get("key_points", [])
+    # Stored at upload; only documents analyzed before that are summarized here
+    if stored:
+        overview, key_points = stored['summary'], stored['key_points']
+    elif doc.summary is not None:
+        overview, key_points = doc.summary, doc.key_points or []
+    else:
+        structured_summary = summarize_structured_with_insights(raw_text, doc.category)
+        overview = structured_summary.get("overview", "")
+        key_points = structured_summary.get("key_points", [])
+
+    if stored and 'insights' in stored:
+        insights = stored['insights']
+    else:
+        # Analyzed before insights were stored: the only case that scans the text on a view
+        insights = generate_insights(raw_text, category) if raw_text.strip() else []
 
     formatted_highlights = {key.replace("_", " "): value for key, value in highlights.items()}
-    all_category_keys = list(chain.from_iterable(CATEGORY_LABELS[cat].keys() for cat in CATEGORY_LABELS))
+    category_labels = lexicons.labels()  # as currently published: lexicons reload without a restart
+    all_category_keys = list(chain.from_iterable(labels.keys() for labels in category_labels.values()))
 
     return render(request, 'analyzer/detail.html', {
         'document': doc,
-        'raw_text': raw_text,
+        'category': category,
+        'category_tabs': [
+            (value, label, (doc.category_scores or {}).get(value))
+            for value, label in Document.CATEGORY_CHOICES if value in categories
+        ],
+        'text_page': render_page(doc, 1, spans=spans),
         'highlights': formatted_highlights,
         'overview': overview,
         'key_points': key_points,
-        'insights': structured_summary.get("insights", []),
-        'category_labels': CATEGORY_LABELS,
+        'insights': insights,
+        'category_labels': category_labels,
+        'related_documents': related_documents,
         'all_category_keys': [k.replace("_", " ") for k in all_category_keys]
     })
 
 
+@gzip_page
+def document_text_page(request, doc_id):
+    """One page of a document's raw text as highlighted HTML: ?page=N (1-based)&category=..."""
+    doc = get_object_or_404(
+        Document.objects.only('raw_text', 'page_offsets', 'highlight_spans', 'category_analysis'), id=doc_id
+    )
+    stored = (doc.category_analysis or {}).get(request.GET.get('category'))
+    try:
+        page = render_page(doc, int(request.GET.get('page', 1)), spans=stored['highlight_spans'] if stored else None)
+    except (ValueError, IndexError):
+        raise Http404("No such page")
+    return JsonResponse(page)
+
+
+@require_POST
+def set_document_category(request, doc_id):
+    """Make another category's stored analysis the document's own, without re-analyzing."""
+    doc = get_object_or_404(Document, id=doc_id)
+    category = request.POST.get('category')
+    stored = (doc.category_analysis or {}).get(category)
+    if stored is None:
+        return HttpResponseBadRequest("No stored analysis for that category")
+    previous = aggregates.snapshot(doc)
+    doc.category = category
+    for field, value in stored.items():
+        setattr(doc, field, value)
+    with transaction.atomic():
+        doc.save(update_fields=['category', *stored])
+        aggregates.update(removed=[previous], added=[aggregates.snapshot(doc)])
+    # Summary PDFs rendered for the old category are never reused (see summary_pdf_path)
+    remove_summary_pdfs([doc.id])
+    messages.info(request, f'Category changed to {doc.get_category_display()}.')
+    return redirect('document_detail', doc_id=doc.id)
+
+
 def analyze_text(request):
     result = None
     if request.method == 'POST':
@@ -75,17 +237,26 @@ def analyze_text(request):
         if form.is_valid():
             text = form.cleaned_data['text']
             category = form.cleaned_data['category']
-            highlights = extract_highlights(text, category)
-            structured_summary = summarize_structured_with_insights(text, category)
+            # A cached full analysis beats the fast tier; fast results are cheaper to redo than to cache
+            analysis = analysis_cache.get(text, category)
+            if analysis is None and form.cleaned_data['tier'] == FAST_TIER:
+                analysis = analyze_fast(text, category)
+            elif analysis is None:
+                analysis = analyze_sections(text, category)
+                # One cut short by the regex budget, or whose summarizer fell back, may complete on a less busy worker
+                if not analysis.get("incomplete_scans") and not analysis.get("summary_fallback"):
+                    analysis_cache.put(text, category, analysis)
 
-            formatted_highlights = {key.replace("_", " "): value for key, value in highlights.items()}
+            formatted_highlights = {key.replace("_", " "): value for key, value in analysis["highlights"].items()}
 
             result = {
                 'text': text,
                 'highlights': formatted_highlights,
-                'overview': structured_summary.get("overview", ""),
-                'key_points': structured_summary.get("key_points", []),
-                'insights': structured_summary.get("insights", []),
+                'overview': analysis["overview"],
+                'key_points': analysis["key_points"],
+                'insights': analysis["insights"],
+                'skipped': analysis.get("skipped"),
+                'incomplete_scans': analysis.get("incomplete_scans"),
                 'category': category
             }
     else:
@@ -94,32 +265,176 @@ def analyze_text(request):
     return render(request, 'analyzer/analyze_text.html', {'form': form, 'result': result})
 
 
+@require_POST
+def analyze_text_stream(request):
+    """
+    Server-Sent Events variant of analyze_text: one event per section as soon
+    as it is computed (see iter_analysis_sections), then a `done` event. A
+    cached analysis is sent at once; a completed one is cached unless a regex
+    scan was cut short. The fast tier sends its sections at once too,
+    followed by a `skipped` event.
+    """
+    form = TextAnalysisForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    text = form.cleaned_data['text']
+    category = form.cleaned_data['category']
+    tier = form.cleaned_data['tier']
+
+    def events():
+        # Sections known up front: a cached analysis, or the fast tier's (which is not cached)
+        ready = analysis_cache.get(text, category)
+        if ready is None and tier == FAST_TIER:
+            ready = analyze_fast(text, category)
+        sections = iter(ready.items()) if ready is not None else iter_analysis_sections(text, category)
+        analysis = {}
+        try:
+            for section, value in sections:
+                if section != 'progress':
+                    analysis[section] = value
+                if section == 'highlights':
+                    value = {key.replace("_", " "): v for key, v in value.items()}
+                yield f"event: {section}\ndata: {json.dumps(value)}\n\n"
+            if ready is None and not analysis.get("incomplete_scans") and not analysis.get("summary_fallback"):
+                analysis_cache.put(text, category, analysis)
+            yield "event: done\ndata: {}\n\n"
+        except Exception:
+            yield 'event: error\ndata: "Analysis failed."\n\n'
+            raise
+        finally:
+            # Also runs when the server closes the response early because the
+            # client disconnected: the remaining sections are never computed.
+            if ready is None:
+                sections.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
+
+
 
 
 
 def download_summary_pdf(request, doc_id):
+    # ReportLab is only needed here; importing it lazily keeps URLconf loading light.
+    from .nlp_utils.pdf_generator import render_summary_job
+
     doc = get_object_or_404(Document, id=doc_id)
-    raw_text = doc.raw_text or extract_text(doc.file.path, doc.doc_type)
-
-    structured_summary = summarize_structured_with_insights(raw_text, doc.category)
-    overview = structured_summary.get("overview", "No overview available.")
-    key_points = structured_summary.get("key_points", [])
-
-    highlights_dict = doc.highlights or extract_highlights(raw_text, doc.category) or {}
-    formatted_highlights = {k.replace("_", " "): v for k, v in highlights_dict.items()}
-
-    output_path = f"media/summaries/{doc.title}_summary.pdf"
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    generate_summary_pdf(
-        title=doc.title,
-        summary=overview,  # narrative overview
-        output_path=output_path,
-        category=doc.category,
-        highlights=formatted_highlights,
-        tool_name="DocMage - Smart Document Analyzer",
-        paragraphs=[overview],
-        bullets=key_points
-    )
+    output_path, _ = render_summary_job(summary_job(doc))
+    remove_summary_pdfs([doc.id], keep=output_path)
 
     return FileResponse(open(output_path, 'rb'), as_attachment=True, filename=f"{doc.title}_summary.pdf")
+
+
+def export_summaries(request):
+    """ZIP of summary PDFs, filtered by ?category=&from=YYYY-MM-DD&to=YYYY-MM-DD&ids=1,2,3"""
+    date_from = parse_date(request.GET.get('from', ''))
+    date_to = parse_date(request.GET.get('to', ''))
+    try:
+        ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return HttpResponseBadRequest("ids must be a comma-separated list of integers")
+
+    documents = filter_documents(request.GET.get('category'), date_from, date_to, ids)
+    response = StreamingHttpResponse(stream_summary_zip(documents), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="docmage_summaries.zip"'
+    return response
+
+
+def export_analysis(request):
+    """NDJSON stream of every document's analysis; ?since=<ISO timestamp> for incremental pulls."""
+    since = None
+    if request.GET.get('since'):
+        since_at = parse_datetime(request.GET['since'])
+        if since_at is None:
+            return HttpResponseBadRequest("since must be an ISO 8601 timestamp")
+        since = (since_at, 0)
+
+    def lines():
+        for batch in iter_analysis_batches(since=since):
+            yield from ndjson_lines(batch)
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
+def dashboard(request):
+    """
+    Corpus overview from the aggregate tables only (see analyzer.aggregates):
+    documents per category and the most frequent highlight terms of one
+    category over the last ?days= (default 30). ?category= (default medical).
+    """
+    try:
+        days = min(max(1, int(request.GET.get('days', 30))), 3660)
+    except ValueError:
+        days = 30
+    category = request.GET.get('category')
+    if category not in dict(Document.CATEGORY_CHOICES):
+        category = 'medical'
+    first_day = aggregates.since(days)
+    counts = aggregates.documents_per_category(first_day)
+    return render(request, 'analyzer/dashboard.html', {
+        'days': days,
+        'category': category,
+        'categories': Document.CATEGORY_CHOICES,
+        'documents_per_category': [(label, counts.get(value, 0)) for value, label in Document.CATEGORY_CHOICES],
+        'top_terms': {
+            subcategory.replace('_', ' '): terms
+            for subcategory, terms in aggregates.top_terms(category, first_day).items()
+        },
+    })
+
+
+def metric_search(request):
+    """
+    Documents with a metric matching ?q=, e.g. "revenue > 100 Cr in FY2024-25"
+    or "bp systolic > 140", with the matching values; ?limit= (default 100).
+    """
+    try:
+        limit = min(max(1, int(request.GET.get('limit', 100))), 1000)
+    except ValueError:
+        return HttpResponseBadRequest("limit must be an integer", content_type='text/plain; charset=utf-8')
+    try:
+        metrics = filter_metrics(request.GET.get('q', ''))
+    except ValueError as exc:
+        # The message quotes the query: plain text, not HTML
+        return HttpResponseBadRequest(str(exc), content_type='text/plain; charset=utf-8')
+    rows = metrics.select_related('document').only(
+        'document__title', 'document__category', 'metric', 'value', 'unit', 'period', 'quarter', 'text',
+    ).order_by('document_id', 'id')[:limit]
+    return JsonResponse({'results': [
+        {
+            'document_id': row.document_id,
+            'title': row.document.title,
+            'category': row.document.category,
+            'metric': row.metric,
+            'value': row.value,
+            'unit': row.unit,
+            'period': row.period,
+            'quarter': row.quarter,
+            'text': row.text,
+        }
+        for row in rows
+    ]})
+
+
+def analysis_cache_stats(request):
+    """Hit/miss/eviction counters of the analyze_text result cache (this worker process)."""
+    return JsonResponse(analysis_cache.stats())
+
+
+def summarizer_stats(request):
+    """The summarizer backend of this worker process, with its pool's request, batch and fallback counts."""
+    return JsonResponse(summary_backends.get_backend().stats())
+
+
+def readiness(request):
+    """Load-balancer probe: 200 once the NLP warm-up has finished, 503 before."""
+    ready = is_ready()
+    if not ready:
+        # Servers without gunicorn.conf.py's warm-up hooks: the first probe starts it
+        start_in_background(models=not settings.DOCMAGE_NLP_SOCKET)
+    return JsonResponse(
+        {"ready": ready, "warm_up_seconds": warm_up_seconds()},
+        status=200 if ready else 503,
+    )
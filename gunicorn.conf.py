@@ -0,0 +1,50 @@
+# gunicorn.conf.py -- picked up automatically by `gunicorn smart_doc_analyzer.wsgi`
+import os
+
+# Load Django (and, in when_ready, the NLP models) once in the master so the
+# forked workers share those pages copy-on-write instead of each loading spaCy.
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+# Threaded workers keep heart-beating while a long response (e.g. a ZIP export) streams;
+# a sync worker would be killed after `timeout` seconds mid-download.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+# Backstop against slow leaks: restart a worker after this many requests (0 = never).
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+# Recycle a worker once its resident memory passes this many MB (0 = never). It
+# stops accepting connections, finishes the ones in flight and is replaced by a
+# fresh fork of the warmed-up master. Not a gunicorn setting, hence upper case.
+MAX_WORKER_RSS_MB = int(os.environ.get("DOCMAGE_MAX_WORKER_RSS_MB", 0))
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked.
+    # With an NLP server configured the workers never parse, so spaCy is not loaded.
+    from django.conf import settings
+    from analyzer.nlp_utils.warmup import warm_up
+    seconds = warm_up(models=not settings.DOCMAGE_NLP_SOCKET)
+    server.log.info("DocMage warm-up finished in %.2fs", seconds)
+
+
+def post_worker_init(worker):
+    # Without preload_app the master never warmed up; warm each worker instead
+    # so /ready/ still only reports ready once the models are loaded.
+    from django.conf import settings
+    from analyzer.nlp_utils.warmup import is_ready, warm_up
+    if not is_ready():
+        warm_up(freeze=False, models=not settings.DOCMAGE_NLP_SOCKET)
+
+
+def post_request(worker, req, environ, resp):
+    if MAX_WORKER_RSS_MB and worker.alive:
+        from analyzer.memory import rss_mb
+        rss = rss_mb()
+        if rss > MAX_WORKER_RSS_MB:
+            worker.log.warning(
+                "Worker %s at %.0f MB RSS (limit %d MB); recycling after in-flight requests.",
+                worker.pid, rss, MAX_WORKER_RSS_MB,
+            )
+            worker.alive = False
@@ -89,5 +89,39 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # WhiteNoise settings
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Caches. "analysis" holds analyze_text results (analyzer/analysis_cache.py): TIMEOUT is the TTL in
+# seconds; MAX_ENTRIES bounds it, culling the least recently used 1/CULL_FREQUENCY when full. Point
+# DOCMAGE_ANALYSIS_CACHE_BACKEND at e.g. django.core.cache.backends.redis.RedisCache to share it
+# between workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analysis': {
+        'BACKEND': os.environ.get('DOCMAGE_ANALYSIS_CACHE_BACKEND', 'analyzer.cache_backends.CountingLocMemCache'),
+        'LOCATION': os.environ.get('DOCMAGE_ANALYSIS_CACHE_LOCATION', 'docmage-analysis'),
+        'TIMEOUT': int(os.environ.get('DOCMAGE_ANALYSIS_CACHE_TTL', 24 * 60 * 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DOCMAGE_ANALYSIS_CACHE_ENTRIES', 1000)),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Processes used to render summary PDFs for bulk ZIP exports
+DOCMAGE_EXPORT_WORKERS = int(os.environ.get('DOCMAGE_EXPORT_WORKERS', 2))
+
+# Memory-mapped TF-IDF matrix behind "Related documents" (see analyzer/similarity.py)
+DOCMAGE_SIMILARITY_DIR = os.environ.get('DOCMAGE_SIMILARITY_DIR', os.path.join(BASE_DIR, 'var', 'similarity'))
+
+# Optional NLP server (`manage.py nlp_server`, analyzer/nlp_server.py). When set, web workers send
+# analysis to the server on this Unix socket instead of loading spaCy themselves.
+DOCMAGE_NLP_SOCKET = os.environ.get('DOCMAGE_NLP_SOCKET', '')
+DOCMAGE_NLP_TIMEOUT = float(os.environ.get('DOCMAGE_NLP_TIMEOUT', 120))
+
+# Start the NLP warm-up in a background thread when Django starts, for servers that do not run
+# gunicorn.conf.py's hooks (runserver, ASGI servers). Off by default: management commands would load spaCy too.
+DOCMAGE_WARM_UP_ON_START = os.environ.get('DOCMAGE_WARM_UP_ON_START', '') == '1'